@@ -1,7 +1,7 @@
 """
 Analysis of Tolkien Gateway infobox structure
 
-This script scans all infobox_*.txt files and analyzes:
+This script scans all infobox records (corpus store or infobox_*.txt files) and analyzes:
 - Template types used ({{Infobox character}}, {{Album}}, etc.)
 - Fields (parameters) of each template
 - Fields COMMON vs SPECIFIC to each type
@@ -9,52 +9,67 @@ This script scans all infobox_*.txt files and analyzes:
 - Unmapped fields (which could cause issues in RDF)
 
 Result: detailed HTML report + CSV files
+
+The records are parsed in chunks of CHUNK_SIZE spread over --workers processes
+(default: all CPUs); each chunk returns an InfoboxStats (counters per template
+and field) and the reports are generated from their merge.
 """
 
+import argparse
 import os
 import re
-import json
-from collections import defaultdict
-from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import wikitextparser as wtp
 
+from infobox_store import iter_infobox_texts
+
+CHUNK_SIZE = 500
+EXAMPLES = 2
+
+_BR_RE = re.compile(r'<br\s*/?>')
+_TAG_RE = re.compile(r'</?[^>]+>')
+_INFOBOX_START_RES = [
+    re.compile(r'\{\{\s*infobox'),
+    re.compile(r'\{\{\s*\w+\s+infobox'),
+]
+_TEMPLATE_START_RE = re.compile(r'\{\{(\w+)')
+# Lookahead so that overlapping pairs ("{{{") are all counted, as a char-by-char scan would.
+_BRACES_RE = re.compile(r'(?=(\{\{|\}\}))')
+
 
 def clean_value(v):
     """Minimal cleanup for analysis."""
-    v = re.sub(r'<br\s*/?>', ' ', v)
-    v = re.sub(r'</?[^>]+>', '', v)
+    v = _BR_RE.sub(' ', v)
+    v = _TAG_RE.sub('', v)
     return v.strip()
 
 
 def extract_infobox_block(wikitext):
     """Extracts the raw {{Infobox ...}} or {{Type infobox ...}} block."""
     lower = wikitext.lower()
-    patterns = [
-        r'\{\{\s*infobox',
-        r'\{\{\s*\w+\s+infobox',
-    ]
     start = -1
-    for pattern in patterns:
-        match = re.search(pattern, lower)
+    for pattern in _INFOBOX_START_RES:
+        match = pattern.search(lower)
         if match:
             start = match.start()
             break
     
     if start == -1:
-        match = re.search(r'\{\{(\w+)', wikitext)
+        match = _TEMPLATE_START_RE.search(wikitext)
         if match:
             start = match.start()
         else:
             return None
     
     count = 0
-    for i in range(start, len(wikitext)):
-        if wikitext[i:i+2] == '{{':
+    for match in _BRACES_RE.finditer(wikitext, start):
+        if match.group(1) == '{{':
             count += 1
-        elif wikitext[i:i+2] == '}}':
+        else:
             count -= 1
             if count == 0:
-                return wikitext[start:i+2]
+                return wikitext[start:match.start() + 2]
     return None
 
 
@@ -88,26 +103,47 @@ def parse_infobox(text):
     return (name, fields)
 
 
-def analyze_infoboxes():
-    """Scans all data/infoboxes and builds statistics."""
-    input_dir = "data/infoboxes"
-    
-    template_types = defaultdict(list) 
-    template_stats = defaultdict(lambda: {
-        'count': 0,
-        'fields': defaultdict(int),  
-        'examples': []
-    })
-    all_fields = set()
-    
-    files = [f for f in os.listdir(input_dir) 
-             if f.startswith("infobox_") and f.endswith(".txt")]
-    
-    print(f"Analyzing {len(files)} infobox files...\n")
-    
-    for filename in sorted(files):
-        with open(os.path.join(input_dir, filename), "r", encoding="utf-8") as f:
-            lines = f.readlines()
+class InfoboxStats:
+    """Mergeable counters: records per template, field occurrences per template, first examples."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.fields = {}
+        self.examples = {}
+
+    def add(self, entity_name, template, fields):
+        self.counts[template] += 1
+        self.fields.setdefault(template, Counter()).update(fields.keys())
+        examples = self.examples.setdefault(template, [])
+        if len(examples) < EXAMPLES:
+            examples.append(entity_name)
+
+    def merge(self, other):
+        """Adds the counters of `other`, a chunk that comes after this one."""
+        self.counts.update(other.counts)
+        for template, fields in other.fields.items():
+            self.fields.setdefault(template, Counter()).update(fields)
+        for template, names in other.examples.items():
+            examples = self.examples.setdefault(template, [])
+            examples.extend(names[:EXAMPLES - len(examples)])
+        return self
+
+    def all_fields(self) -> set:
+        return set().union(*self.fields.values())
+
+    def template_stats(self) -> dict:
+        """{template: {'count', 'fields', 'examples'}} as used by the report functions."""
+        return {
+            template: {'count': count, 'fields': self.fields[template], 'examples': self.examples[template]}
+            for template, count in self.counts.items()
+        }
+
+
+def analyze_chunk(records) -> InfoboxStats:
+    """Statistics of a list of (key, text) infobox records."""
+    stats = InfoboxStats()
+    for _key, text in records:
+        lines = text.splitlines(keepends=True)
         
         if not lines:
             continue
@@ -124,18 +160,38 @@ def analyze_infoboxes():
             continue
         
         template_normalized = template_name.replace("infobox ", "").title()
-        if not template_normalized.startswith("Infobox"):
-            template_normalized = template_normalized
-        
-        template_stats[template_normalized]['count'] += 1
-        if len(template_stats[template_normalized]['examples']) < 2:
-            template_stats[template_normalized]['examples'].append(entity_name)
-        
-        for field in fields.keys():
-            template_stats[template_normalized]['fields'][field] += 1
-            all_fields.add(field)
+        stats.add(entity_name, template_normalized, fields)
+    return stats
+
+
+def iter_chunks(records, size=CHUNK_SIZE):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_infoboxes(input_dir="data/infoboxes", workers=None):
+    """Scans all data/infoboxes and builds statistics."""
+    workers = workers or os.cpu_count() or 1
+    stats = InfoboxStats()
     
-    return template_stats, all_fields
+    print(f"Analyzing infobox records from {input_dir} ({workers} processes)...\n")
+    
+    chunks = iter_chunks(iter_infobox_texts(input_dir))
+    if workers == 1:
+        for chunk in chunks:
+            stats.merge(analyze_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_stats in pool.map(analyze_chunk, chunks):
+                stats.merge(chunk_stats)
+    
+    return stats.template_stats(), stats.all_fields()
 
 
 def load_property_map():
@@ -345,9 +401,17 @@ def print_summary(template_stats):
         print()
 
 
-if __name__ == "__main__":
-    template_stats, all_fields = analyze_infoboxes()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Structure analysis of the infobox corpus.")
+    parser.add_argument("--workers", type=int, default=None, help="parsing processes (default: all CPUs)")
+    args = parser.parse_args(argv)
+
+    template_stats, all_fields = analyze_infoboxes(workers=args.workers)
     print_summary(template_stats)
     generate_report(template_stats, all_fields)
 
 
+if __name__ == "__main__":
+    main()
+
+
@@ -0,0 +1,75 @@
+"""
+Benchmark of the ways to load the merged KG.
+Times rdflib Turtle parsing of data/rdf/kg_full.ttl against N-Triples parsing
+of the same graph and the binary snapshot (rebuilt into an rdflib Graph, and
+opened as a read-only memory-mapped index), and checks all loads agree.
+"""
+
+import os
+import tempfile
+import time
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from graph_snapshot import SnapshotIndex, is_current, load_snapshot, snapshot_path, write_snapshot
+
+INPUT_TTL = "data/rdf/kg_full.ttl"
+REPEATS = 3
+
+
+def parse(path: str, format: str) -> Graph:
+    graph = Graph()
+    graph.parse(path, format=format)
+    return graph
+
+
+def open_index(path) -> int:
+    with SnapshotIndex(path) as index:
+        return len(index)
+
+
+def time_load(loader, *args) -> tuple:
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = loader(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    if not os.path.exists(INPUT_TTL):
+        print(f"Missing input: {INPUT_TTL}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        nt_path = os.path.join(tmp, "kg_full.nt")
+        snap_path = snapshot_path(INPUT_TTL)
+        reference = parse(INPUT_TTL, "turtle")
+        reference.serialize(destination=nt_path, format="nt", encoding="utf-8")
+        if not is_current(INPUT_TTL):
+            snap_path = os.path.join(tmp, "kg_full.kgsnap")
+            write_snapshot(reference, snap_path, namespaces=reference.namespaces(), source=INPUT_TTL)
+
+        ttl_time, _ = time_load(parse, INPUT_TTL, "turtle")
+        nt_time, nt_graph = time_load(parse, nt_path, "nt")
+        snap_time, snap_graph = time_load(load_snapshot, snap_path)
+        index_time, index_len = time_load(open_index, snap_path)
+
+        print(f"Graph: {len(reference)} triples (best of {REPEATS} runs)")
+        for label, path, seconds in [
+            ("Turtle", INPUT_TTL, ttl_time),
+            ("N-Triples", nt_path, nt_time),
+            ("Snapshot -> Graph", snap_path, snap_time),
+            ("Snapshot index (mmap)", snap_path, index_time),
+        ]:
+            size_kb = os.path.getsize(path) / 1024
+            print(f"  - {label}: {seconds:.3f}s ({size_kb:.0f} KB, {ttl_time / seconds:.1f}x vs Turtle)")
+        same = isomorphic(nt_graph, reference) and isomorphic(snap_graph, reference) and index_len == len(reference)
+        print(f"  - Identical triples: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of the infobox parsers used by rdf_maker.py.
+Times the fast template tokenizer against the full wikitextparser path over
+every infobox record of data/infoboxes, and reports how often the fast path
+had to fall back and whether both paths produced identical arguments.
+"""
+
+import time
+
+from infobox_store import iter_infobox_texts
+from rdf_maker import (
+    INPUT_DIR,
+    _REF_RE,
+    _extract_infobox_block,
+    _parse_infobox_wtp,
+    _tokenize_template,
+    parse_infobox_text,
+)
+
+REPEATS = 3
+
+
+def load_infobox_texts(input_dir: str = INPUT_DIR) -> list[str]:
+    texts = []
+    for _key, full_text in iter_infobox_texts(input_dir):
+        if full_text:
+            texts.append("\n".join(full_text.split("\n")[1:]))
+    return texts
+
+
+def parse_reference(text: str):
+    cleaned = _REF_RE.sub("", text)
+    return _parse_infobox_wtp(_extract_infobox_block(cleaned) or cleaned)
+
+
+def time_parser(parser, texts: list[str]) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for text in texts:
+            parser(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    texts = load_infobox_texts()
+    if not texts:
+        print(f"No infobox files found in {INPUT_DIR}")
+        return
+
+    fallbacks = 0
+    mismatches = []
+    for text in texts:
+        block = _extract_infobox_block(_REF_RE.sub("", text))
+        if block is None or _tokenize_template(block) is None:
+            fallbacks += 1
+        if parse_infobox_text(text) != parse_reference(text):
+            mismatches.append(text.split("\n", 1)[0][:80])
+
+    wtp_time = time_parser(parse_reference, texts)
+    fast_time = time_parser(parse_infobox_text, texts)
+
+    print(f"Infoboxes: {len(texts)} (best of {REPEATS} runs)")
+    print(f"  - wikitextparser: {wtp_time:.3f}s ({1000 * wtp_time / len(texts):.3f} ms/file)")
+    print(f"  - fast tokenizer: {fast_time:.3f}s ({1000 * fast_time / len(texts):.3f} ms/file)")
+    print(f"  - Speedup: {wtp_time / fast_time:.1f}x")
+    print(f"  - Fallbacks to wikitextparser: {fallbacks}")
+    print(f"  - Mismatching results: {len(mismatches)}")
+    for head in mismatches[:10]:
+        print(f"      {head}")
+
+
+if __name__ == "__main__":
+    main()
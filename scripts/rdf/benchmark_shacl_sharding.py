@@ -0,0 +1,133 @@
+"""
+Benchmark of sharded SHACL validation (validate_final.py --workers N) against
+the single-process run, on data/rdf/kg_full.ttl scaled to SCALES copies of its
+instances (schema triples kept once), and checks both report the same results.
+
+Besides the measured wall time of each mode, it times every shard of the
+sharded run one after the other in this process: the setup (subgraphs and
+their N-Triples) plus the slowest shard and the pool start is the wall time
+the sharded run would take with one free CPU per worker.
+
+--materialized adds the RDFS closure of materialize_rdfs.py to each graph and
+validates without pyshacl's inference, as validate_final.py does in the
+pipeline (kg_inferred.nt current); otherwise pyshacl runs its RDFS inference.
+
+Usage: python scripts/rdf/benchmark_shacl_sharding.py [--scales 1 2 4] [--workers 2 4] [--materialized]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rdflib import Graph, Literal, RDF, URIRef
+
+from materialize_rdfs import ONTOLOGY_FILE, rdfs_closure
+from shacl_validation import (
+    INFERENCE,
+    _SCHEMA_PREDICATES,
+    _validate_shard,
+    neighbourhood,
+    run_validation,
+    shape_predicates,
+    shard_focus_nodes,
+    validate_sharded,
+)
+
+DATA_FILE = "data/rdf/kg_full.ttl"
+SHAPES_FILE = "data/rdf/tolkien-shapes.ttl"
+SCALES = (1, 2, 4)
+WORKERS = (2, 4)
+
+
+def scaled(data: Graph, copies: int) -> Graph:
+    """`copies` copies of the instance triples of `data`, instance IRIs suffixed by the copy number."""
+    schema = set(data.objects(None, RDF.type)) | set(data.predicates())
+    for pred in _SCHEMA_PREDICATES:
+        for s, _p, o in data.triples((None, pred, None)):
+            schema.update((s, o))
+
+    def rename(term, copy):
+        if copy == 0 or not isinstance(term, URIRef) or term in schema:
+            return term
+        return URIRef(f"{term}__{copy}")
+
+    graph = Graph()
+    for s, p, o in data:
+        if p in _SCHEMA_PREDICATES:
+            graph.add((s, p, o))
+            continue
+        for copy in range(copies):
+            graph.add((rename(s, copy), p, o if isinstance(o, Literal) else rename(o, copy)))
+    return graph
+
+
+def _noop():
+    return None
+
+
+def critical_path(data: Graph, shapes: Graph, workers: int, inference: str = INFERENCE) -> float:
+    """Setup + slowest shard + pool start: the sharded wall time with one free CPU per worker."""
+    start = time.perf_counter()
+    shards = shard_focus_nodes(data, shapes, workers)
+    shapes_nt = shapes.serialize(format="nt")
+    predicates = shape_predicates(shapes, data)
+    subgraphs = [neighbourhood(data, shard, predicates).serialize(format="nt") for shard in shards]
+    setup = time.perf_counter() - start
+
+    slowest = 0.0
+    for shard, data_nt in zip(shards, subgraphs):
+        start = time.perf_counter()
+        _validate_shard(data_nt, shapes_nt, {str(node) for node in shard}, inference)
+        slowest = max(slowest, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        [pool.submit(_noop).result() for _ in range(workers)]
+    return setup + slowest + time.perf_counter() - start
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single-process vs sharded SHACL validation.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="copies of kg_full to validate")
+    parser.add_argument("--workers", type=int, nargs="+", default=list(WORKERS), help="shard counts to time")
+    parser.add_argument("--materialized", action="store_true", help="add the RDFS closure, no pyshacl inference")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(DATA_FILE):
+        print(f"Missing input: {DATA_FILE}")
+        return
+    base = Graph().parse(DATA_FILE)
+    shapes = Graph().parse(SHAPES_FILE)
+    ontology = Graph().parse(ONTOLOGY_FILE)
+    inference = "none" if args.materialized else INFERENCE
+    print(f"CPUs: {os.cpu_count()}, inference: {inference}")
+
+    run_validation(base, shapes)  # warm-up: the first validation of a process pays pyshacl's setup
+
+    for copies in args.scales:
+        data = scaled(base, copies)
+        if args.materialized:
+            for triple in rdfs_closure(data, ontology):
+                data.add(triple)
+        single_time, reference = timed(run_validation, data, shapes, inference)
+        print(f"\nx{copies}: {len(data)} triples, {len(reference)} results")
+        print(f"  - single process: {single_time:.2f}s")
+        for workers in args.workers:
+            sharded_time, results = timed(validate_sharded, data, shapes, workers, inference=inference)
+            estimate = critical_path(data, shapes, workers, inference)
+            print(
+                f"  - {workers} workers: {sharded_time:.2f}s measured ({single_time / sharded_time:.2f}x), "
+                f"{estimate:.2f}s with {workers} free CPUs ({single_time / estimate:.2f}x), "
+                f"same results: {results == reference}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Incremental reader for the METW cards file (data/rdf/cards.json).
+The file is one object {set id: set}, each set holding its metadata and a
+"cards" object {card id: card}. Instead of json.load on the whole file, the
+reader walks the two outer objects itself over a buffer of CHUNK_SIZE
+characters and decodes one set field or one card at a time with
+json.JSONDecoder.raw_decode, so memory is bounded by the largest card.
+
+iter_cards yields (card_set, card_id, card) where card_set is a dict of the
+set fields (id, name, imageBaseUrl, ...); it is the same object for every card
+of a set, so the image base URLs are read once per set, and itertools.groupby
+on it splits the stream per set. The cards of a set are streamed when its
+imageBaseUrl comes before its "cards" key; otherwise they are held until the
+set closes, so card_set has every field of the set before its cards are
+yielded.
+"""
+
+import json
+
+CARDS_JSON = "data/rdf/cards.json"
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (not consumed), "" at end of file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in {self.f.name}, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next JSON value, reading more of the file until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """Yields the keys of the object starting here; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+
+def iter_cards(path: str = CARDS_JSON):
+    """Yields (card_set, card_id, card) for every card of the file, in file order."""
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f)
+        for set_id in reader.members():
+            if reader.peek() != "{":
+                reader.value()
+                continue
+            card_set = {"id": set_id}
+            held = []
+            for field in reader.members():
+                if field != "cards" or reader.peek() != "{":
+                    card_set[field] = reader.value()
+                    continue
+                stream = "imageBaseUrl" in card_set
+                for card_id in reader.members():
+                    card = reader.value()
+                    if not isinstance(card, dict):
+                        continue
+                    if stream:
+                        yield card_set, card_id, card
+                    else:
+                        held.append((card_id, card))
+            for card_id, card in held:
+                yield card_set, card_id, card
+
+
+def image_base_url(card_set: dict) -> str:
+    """English image base URL of the set, else its first one, else ""."""
+    base_urls = card_set.get("imageBaseUrl") or {}
+    return base_urls.get("en") or next(iter(base_urls.values()), "")
@@ -2,54 +2,176 @@
 Comparison of infoboxes between data/infoboxes/ and data/infoboxes_old_data/
 
 This script:
-- Counts the number of data/infoboxes in each folder
-- Extracts page titles ("--- Title ---" part)
-- Compares titles to find similarities/differences
-- Displays a detailed report
+- Hashes every infobox record of both corpora (sha1 of the record text, the
+  same hash the corpus store keeps in its sha1 column)
+- Reports new, deleted and modified pages (same title, different content)
+- Optionally (--fields) diffs the parsed infobox arguments of modified pages
+- Writes a detailed text report and a machine-readable change set
+  (data/rdf/infobox_changes.json) with the titles and KG resource IRIs of the
+  changed pages; rdf_maker.py --changes parses only those pages again and
+  takes the others from its page cache
+
+A corpus store (infoboxes.sqlite) is read through its sha1 column. For a
+directory of .txt files, the hashes are cached in .infobox_hashes.json
+({file name: [mtime_ns, size, title, sha1]}); only files whose modification
+time or size changed are read again, by a pool of worker processes.
+
+Usage: python scripts/rdf/compare_infoboxes.py [--old DIR] [--new DIR] [--fields] [--workers N]
 """
 
+import argparse
+import json
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
 
+from infobox_store import InfoboxStore, content_hash, store_path, title_from_text
 
-def extract_page_title(infobox_file):
-    """
-    Extract page title from infobox file content.
-    Format: --- Page Title ---
-    """
+CURRENT_DIR = "data/infoboxes"
+OLD_DIR = "data/infoboxes_old_data"
+REPORT_FILE = "infobox_comparison_report.txt"
+CHANGESET_FILE = "data/rdf/infobox_changes.json"
+HASH_CACHE = ".infobox_hashes.json"
+CHUNK_SIZE = 500
+
+
+def _hash_files(paths):
+    """[(path, title, sha1)] for a chunk of infobox files."""
+    hashed = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        hashed.append((path, title_from_text(text), content_hash(text)))
+    return hashed
+
+
+def _load_hash_cache(directory):
     try:
-        with open(infobox_file, "r", encoding="utf-8") as f:
-            first_line = f.readline().strip()
-            match = re.match(r"^---\s+(.+?)\s+---$", first_line)
-            if match:
-                return match.group(1)
-    except Exception as e:
-        print(f"Error reading {infobox_file}: {e}")
-    return None
+        with open(os.path.join(directory, HASH_CACHE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
 
-def get_infoboxes_from_directory(directory):
+def _save_hash_cache(directory, cache):
+    path = os.path.join(directory, HASH_CACHE)
+    try:
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        print(f"Hash cache not saved ({path}): {e}")
+
+
+def get_infoboxes_from_directory(directory, workers=None):
     """
-    Fetches all infobox files from a directory.
-    Returns a dictionary {filename: page_title}
+    Hashes every infobox record of a corpus directory.
+    Returns a dictionary {page_title: (sha1, key)}, where key is the file name,
+    or the page title when the directory holds a corpus store.
     """
-    infoboxes = {}
-
     if not os.path.exists(directory):
         print(f"Directory not found: {directory}")
-        return infoboxes
+        return {}
+
+    if os.path.exists(store_path(directory)):
+        with InfoboxStore(store_path(directory)) as store:
+            hashes = store.hashes()
+        print(f"  - {directory}: {len(hashes)} pages from the corpus store")
+        return {title: (sha1, title) for title, sha1 in hashes.items()}
 
-    for filename in os.listdir(directory):
-        if filename.startswith("infobox_") and filename.endswith(".txt"):
-            filepath = os.path.join(directory, filename)
-            title = extract_page_title(filepath)
-            if title:
-                infoboxes[filename] = title
+    cache = _load_hash_cache(directory)
+    entries = {}
+    stale = []
+    for entry in os.scandir(directory):
+        if not (entry.name.startswith("infobox_") and entry.name.endswith(".txt")):
+            continue
+        stat = entry.stat()
+        cached = cache.get(entry.name)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            entries[entry.name] = cached
+        else:
+            entries[entry.name] = [stat.st_mtime_ns, stat.st_size, None, None]
+            stale.append(entry.path)
 
+    if stale:
+        chunks = [stale[i : i + CHUNK_SIZE] for i in range(0, len(stale), CHUNK_SIZE)]
+        if workers == 1 or len(chunks) == 1:
+            results = list(map(_hash_files, chunks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_hash_files, chunks))
+        for hashed in results:
+            for path, title, sha1 in hashed:
+                entries[os.path.basename(path)][2:] = [title, sha1]
+        entries = {name: entry for name, entry in entries.items() if entry[3]}
+        _save_hash_cache(directory, entries)
+    elif len(entries) != len(cache):
+        _save_hash_cache(directory, entries)
+    print(f"  - {directory}: {len(entries)} files, {len(stale)} hashed, {len(entries) - len(stale)} from cache")
+
+    infoboxes = {}
+    for filename in sorted(entries):
+        _mtime, _size, title, sha1 = entries[filename]
+        if title:
+            infoboxes[title] = (sha1, filename)
     return infoboxes
 
 
-def compare_infoboxes():
+def read_record(directory, key):
+    """Text of one record: latest store row when key is a title, else the file."""
+    if os.path.exists(store_path(directory)):
+        with InfoboxStore(store_path(directory)) as store:
+            row = store.latest(key)
+        return row[3] if row else ""
+    with open(os.path.join(directory, key), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def field_diff(old_text, new_text):
+    """Differences of the parsed infobox template and arguments of two records (empty when equal)."""
+    from rdf_maker import parse_infobox_text
+
+    old_template, old_args = parse_infobox_text(old_text.split("\n", 1)[-1])
+    new_template, new_args = parse_infobox_text(new_text.split("\n", 1)[-1])
+    diff = {}
+    if old_template != new_template:
+        diff["template"] = [old_template, new_template]
+    added = {k: v for k, v in new_args.items() if k not in old_args}
+    removed = {k: v for k, v in old_args.items() if k not in new_args}
+    changed = {k: [old_args[k], v] for k, v in new_args.items() if k in old_args and old_args[k] != v}
+    for name, fields in (("added", added), ("removed", removed), ("changed", changed)):
+        if fields:
+            diff[name] = dict(sorted(fields.items()))
+    return diff
+
+
+def write_change_set(change_set, path=CHANGESET_FILE):
+    from rdf_maker import to_res_iri
+
+    change_set["subjects"] = {
+        kind: [str(to_res_iri(title)) for title in change_set[kind]]
+        for kind in ("added", "removed", "modified")
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(change_set, f, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def _print_titles(heading, titles):
+    if not titles:
+        return
+    print(f"\n{heading} ({len(titles)}):")
+    for title in titles[:20]:
+        print(f"  - {title}")
+    if len(titles) > 20:
+        print(f"  ... and {len(titles) - 20} others")
+
+
+def compare_infoboxes(current_dir=CURRENT_DIR, old_dir=OLD_DIR, fields=False, workers=None):
     """
     Compare data/infoboxes between the two folders.
     """
@@ -57,25 +179,26 @@ def compare_infoboxes():
     print("INFOBOX COMPARISON")
     print("=" * 80)
 
-    current_dir = "data/infoboxes"
-    old_dir = "data/infoboxes_old_data"
-
-    current_infoboxes = get_infoboxes_from_directory(current_dir)
-    old_infoboxes = get_infoboxes_from_directory(old_dir)
+    print("\nHASHING:")
+    current_infoboxes = get_infoboxes_from_directory(current_dir, workers)
+    old_infoboxes = get_infoboxes_from_directory(old_dir, workers)
 
     print("\nSTATISTICS:")
     print(f"  - Current data/infoboxes ({current_dir}): {len(current_infoboxes)}")
     print(f"  - Old data/infoboxes ({old_dir}): {len(old_infoboxes)}")
 
-    current_titles = set(current_infoboxes.values())
-    old_titles = set(old_infoboxes.values())
+    current_titles = set(current_infoboxes)
+    old_titles = set(old_infoboxes)
 
     common_titles = current_titles & old_titles
-    only_current = current_titles - old_titles
-    only_old = old_titles - current_titles
+    only_current = sorted(current_titles - old_titles)
+    only_old = sorted(old_titles - current_titles)
+    modified = sorted(t for t in common_titles if current_infoboxes[t][0] != old_infoboxes[t][0])
 
     print("\nCOMPARISON:")
     print(f"  - Common titles: {len(common_titles)}")
+    print(f"  - Modified (content changed): {len(modified)}")
+    print(f"  - Unchanged: {len(common_titles) - len(modified)}")
     print(f"  - Only in {current_dir}: {len(only_current)}")
     print(f"  - Only in {old_dir}: {len(only_old)}")
 
@@ -84,47 +207,79 @@ def compare_infoboxes():
         similarity = (len(common_titles) / total) * 100
         print(f"  - Similarity rate: {similarity:.1f}%")
 
-    if only_current:
-        print(f"\nNEW PAGES IN {current_dir.upper()} ({len(only_current)}):")
-        for title in sorted(only_current)[:20]:
-            print(f"  - {title}")
-        if len(only_current) > 20:
-            print(f"  ... and {len(only_current) - 20} others")
+    _print_titles(f"NEW PAGES IN {current_dir.upper()}", only_current)
+    _print_titles(f"PAGES ONLY IN {old_dir.upper()}", only_old)
+    _print_titles("MODIFIED PAGES", modified)
 
-    if only_old:
-        print(f"\nPAGES ONLY IN {old_dir.upper()} ({len(only_old)}):")
-        for title in sorted(only_old)[:20]:
-            print(f"  - {title}")
-        if len(only_old) > 20:
-            print(f"  ... and {len(only_old) - 20} others")
+    field_changes = {}
+    if fields:
+        for title in modified:
+            diff = field_diff(
+                read_record(old_dir, old_infoboxes[title][1]),
+                read_record(current_dir, current_infoboxes[title][1]),
+            )
+            if diff:
+                field_changes[title] = diff
+        print(f"\nFIELD CHANGES: {len(field_changes)} of {len(modified)} modified pages changed infobox fields")
 
     print("\n" + "=" * 80)
     print("SUMMARY:")
     print(f"  - Pages to fetch (not present): {len(only_current)}")
+    print(f"  - Pages to rebuild (new or modified): {len(only_current) + len(modified)}")
     print(f"  - Total coverage: {len(current_titles | old_titles)} pages")
     print("=" * 80 + "\n")
 
-    report_file = "infobox_comparison_report.txt"
-    with open(report_file, "w", encoding="utf-8") as f:
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
         f.write("DETAILED COMPARISON REPORT\n")
         f.write("=" * 80 + "\n\n")
 
         f.write(f"NEW PAGES ({len(only_current)}):\n")
-        for title in sorted(only_current):
+        for title in only_current:
             f.write(f"  {title}\n")
 
         f.write(f"\n\nDELETED PAGES ({len(only_old)}):\n")
-        for title in sorted(only_old):
+        for title in only_old:
+            f.write(f"  {title}\n")
+
+        f.write(f"\n\nMODIFIED PAGES ({len(modified)}):\n")
+        for title in modified:
             f.write(f"  {title}\n")
+            for kind, changes in field_changes.get(title, {}).items():
+                if kind == "template":
+                    f.write(f"    template: {changes[0]} -> {changes[1]}\n")
+                    continue
+                for name, value in changes.items():
+                    f.write(f"    {kind} {name}: {value!r}\n")
 
         f.write(f"\n\nCOMMON PAGES ({len(common_titles)}):\n")
         for title in sorted(common_titles):
             f.write(f"  {title}\n")
 
-    print(f"OK. Detailed report saved: {report_file}\n")
+    print(f"OK. Detailed report saved: {REPORT_FILE}")
 
+    change_set = {
+        "old": old_dir,
+        "new": current_dir,
+        "added": only_current,
+        "removed": only_old,
+        "modified": modified,
+    }
+    if fields:
+        change_set["fields"] = field_changes
+    write_change_set(change_set)
+    print(f"OK. Change set saved: {CHANGESET_FILE}\n")
+    return change_set
 
-if __name__ == "__main__":
-    compare_infoboxes()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two infobox corpora by content hash.")
+    parser.add_argument("--old", default=OLD_DIR, help=f"old corpus directory (default {OLD_DIR})")
+    parser.add_argument("--new", default=CURRENT_DIR, help=f"current corpus directory (default {CURRENT_DIR})")
+    parser.add_argument("--fields", action="store_true", help="diff the parsed infobox fields of modified pages")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    compare_infoboxes(args.new, args.old, fields=args.fields, workers=args.workers)
 
+
+if __name__ == "__main__":
+    main()
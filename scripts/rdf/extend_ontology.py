@@ -1,80 +1,73 @@
 """
 Automatic extension of the Tolkien ontology
-Adds all missing properties detected in the RDF
+Adds all missing properties detected in the RDF, as owl:ObjectProperty when
+(nearly) all their values are IRIs and as owl:DatatypeProperty otherwise
 """
 
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, OWL, XSD
 
-ontology = Graph()
-ontology.parse("data/rdf/tolkien-kg-ontology.ttl", format="turtle")
+from graph_cache import load_graph, save_graph
+from predicate_census import kg_properties, predicate_census
 
-data = Graph()
-data.parse("data/rdf/all_infoboxes.ttl", format="turtle")
+ONTOLOGY_FILE = "data/rdf/tolkien-kg-ontology.ttl"
+DATA_FILE = "data/rdf/all_infoboxes.ttl"
 
 KG_ONT = Namespace("http://tolkien-kg.org/ontology/")
-ontology.bind("kg-ont", KG_ONT)
-ontology.bind("owl", OWL)
-ontology.bind("rdfs", RDFS)
-ontology.bind("xsd", XSD)
 
-used_props = set()
-defined_props = set()
 
-for s, p, o in data.triples((None, None, None)):
-    if str(p).startswith("http://tolkien-kg.org/ontology/"):
-        used_props.add(str(p))
+def undefined_properties(used_props: set, ontology: Graph) -> list:
+    defined_props = set()
 
-for s in ontology.subjects(RDF.type, OWL.ObjectProperty):
-    defined_props.add(str(s))
-for s in ontology.subjects(RDF.type, OWL.DatatypeProperty):
-    defined_props.add(str(s))
+    for s in ontology.subjects(RDF.type, OWL.ObjectProperty):
+        defined_props.add(str(s))
+    for s in ontology.subjects(RDF.type, OWL.DatatypeProperty):
+        defined_props.add(str(s))
 
-undefined = sorted(used_props - defined_props)
+    return sorted(used_props - defined_props)
 
-print(f"🔍 Missing properties: {len(undefined)}\n")
 
-for prop_uri in undefined:
-    prop = URIRef(prop_uri)
-    local_name = prop_uri.split("/")[-1]
-    
-    ontology.add((prop, RDF.type, OWL.DatatypeProperty))
-    ontology.add((prop, RDFS.label, Literal(local_name.replace("_", " ").title())))
-    ontology.add((prop, RDFS.comment, Literal(f"Property automatically extracted from data/infoboxes.")))
-    ontology.add((prop, RDFS.range, XSD.string))
-    
-    print(f"  ✅ Added: {local_name}")
+def main():
+    ontology = load_graph(ONTOLOGY_FILE, copy=True)
+    census = predicate_census(DATA_FILE)
+    used_props = kg_properties(census)
 
-output_file = "data/rdf/tolkien-kg-ontology.ttl"
-ontology.serialize(destination=output_file, format="turtle")
+    ontology.bind("kg-ont", KG_ONT)
+    ontology.bind("owl", OWL)
+    ontology.bind("rdfs", RDFS)
+    ontology.bind("xsd", XSD)
 
-print(f"\n📄 Ontology updated: {output_file}")
-print(f"📊 Total triples: {len(ontology)}\n")
+    undefined = undefined_properties(used_props, ontology)
 
-print("🔍 Revalidating...")
-ontology2 = Graph()
-ontology2.parse(output_file, format="turtle")
+    print(f"🔍 Missing properties: {len(undefined)}\n")
 
-data2 = Graph()
-data2.parse("data/rdf/all_infoboxes.ttl", format="turtle")
+    for prop_uri in undefined:
+        prop = URIRef(prop_uri)
+        local_name = prop_uri.split("/")[-1]
 
-used2 = set()
-defined2 = set()
+        kind = census[prop_uri].proposed_kind
 
-for s, p, o in data2.triples((None, None, None)):
-    if str(p).startswith("http://tolkien-kg.org/ontology/"):
-        used2.add(str(p))
+        ontology.add((prop, RDF.type, OWL.ObjectProperty if kind == "ObjectProperty" else OWL.DatatypeProperty))
+        ontology.add((prop, RDFS.label, Literal(local_name.replace("_", " ").title())))
+        ontology.add((prop, RDFS.comment, Literal(f"Property automatically extracted from data/infoboxes.")))
+        if kind == "DatatypeProperty":
+            ontology.add((prop, RDFS.range, XSD.string))
 
-for s in ontology2.subjects(RDF.type, OWL.ObjectProperty):
-    defined2.add(str(s))
-for s in ontology2.subjects(RDF.type, OWL.DatatypeProperty):
-    defined2.add(str(s))
+        print(f"  ✅ Added: {local_name} ({kind})")
 
-still_undefined = used2 - defined2
+    save_graph(ontology, ONTOLOGY_FILE)
 
-if still_undefined:
-    print(f"❌ Still {len(still_undefined)} properties not defined!")
-else:
-    print("✅✅✅ ALL properties are now defined!\n")
+    print(f"\n📄 Ontology updated: {ONTOLOGY_FILE}")
+    print(f"📊 Total triples: {len(ontology)}\n")
 
+    print("🔍 Revalidating...")
+    still_undefined = undefined_properties(used_props, load_graph(ONTOLOGY_FILE))
 
+    if still_undefined:
+        print(f"❌ Still {len(still_undefined)} properties not defined!")
+    else:
+        print("✅✅✅ ALL properties are now defined!\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Approximate name matching against the label index of label_index.py.
+Exact normalized matches are tried first; the other names are compared only
+with the labels that share a selective token or enough character q-grams with
+them (blocking), so a batch costs about one index lookup per name instead of
+one comparison per label.
+
+A candidate label is scored with the IDF-weighted Dice coefficient of both
+token sets, so rare name tokens outweigh "the" or "of" and word order does not
+matter ("Tom, Bert, and William"). Tokens of at least FUZZY_TOKEN_LENGTH
+characters that start alike and have a difflib ratio of TOKEN_SIMILARITY count
+as shared, by that ratio ("Enedhwaith"); names equal up to spaces score 1.
+When every token of one side is shared with the other (a surname or epithet
+the label lacks, "Camellia (Sackville) Baggins" / "camellia sackville", or a
+name followed by its qualifier, "Boromir (Steward)" / "boromir steward of
+gondor"), the score is raised to CONTAINMENT_SCORE + (1 - CONTAINMENT_SCORE) *
+Dice. The floor is well below THRESHOLD: containment alone does not accept a
+candidate, the shared tokens must also carry half the weight.
+
+Candidates are rejected when the shared tokens are only STOPWORDS or EPITHETS
+("Saruman the White" / "the white"), or when they miss the head of the name:
+its first token that is neither, taken before any parenthesis ("in (King of
+Durin's Folk)" / "king of durins folk"). Containment does not count when
+    - the qualifier of the name, in parentheses or after "of", is left out
+      ("Finduilas of Dol Amroth" / "finduilas")
+    - a label with one informative token leaves out anything but stopwords
+      and trailing epithets ("Gandalf the Grey" / "gandalf", but not "Adrahil
+      I", "Black Trolls" or "Andrast Coast"), and the same for a name with
+      one informative token ("Dagorlad" / "battle of dagorlad")
+    - a numeral is left out while numbered labels exist ("Durin VIII").
+
+Labels naming several subjects resolve to the smallest IRI, as exact matches
+do. The best candidate is accepted when its score reaches THRESHOLD and the
+best candidate naming another subject trails it by at least MARGIN.
+
+Usage: python scripts/rdf/fuzzy_match.py name [name ...]
+"""
+
+import math
+import re
+import sys
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
+
+from graph_cache import load_graph
+from label_index import LabelMatcher, build_label_index
+
+DATA_FILE = "data/rdf/all_infoboxes.ttl"
+
+THRESHOLD = 0.85
+MARGIN = 0.05
+QGRAM = 3
+MIN_GRAM_OVERLAP = 0.6
+TOKEN_SIMILARITY = 0.9
+FUZZY_TOKEN_LENGTH = 6
+MAX_TOKEN_BLOCK = 50
+MAX_GRAM_BLOCK = 300
+CONTAINMENT_SCORE = 0.7
+MIN_CONTAINED_LENGTH = 5
+
+STOPWORDS = frozenset(
+    "a an and at by de del der des di die du el en for from in la las le les los of on the to un une von y".split()
+)
+EPITHETS = frozenset(
+    "black blue brown dark elder fair gold golden gray great green grey high king lady little lord old prince "
+    "princess queen red silver steward tall white wise young younger".split()
+)
+_NUMERAL_RE = re.compile(r"^(?=[ivxl])l?x{0,3}(?:ix|iv|v?i{0,3})$")
+
+Match = namedtuple("Match", "name status score label uri runner_up")
+
+EXACT = "exact"
+FUZZY = "fuzzy"
+AMBIGUOUS = "ambiguous"
+BELOW_THRESHOLD = "below_threshold"
+NO_CANDIDATE = "no_candidate"
+
+
+def informative(token: str) -> bool:
+    return token not in STOPWORDS and token not in EPITHETS
+
+
+def is_numeral(token: str) -> bool:
+    return bool(_NUMERAL_RE.match(token))
+
+
+def qgrams(key: str, q: int = QGRAM) -> set:
+    padded = f" {key} "
+    return {padded[i:i + q] for i in range(max(len(padded) - q + 1, 1))}
+
+
+class FuzzyMatcher(LabelMatcher):
+    """LabelMatcher with a token / q-gram blocking index for approximate matches."""
+
+    def __init__(self, labels: dict, threshold: float = THRESHOLD, margin: float = MARGIN):
+        super().__init__(labels)
+        self.threshold = threshold
+        self.margin = margin
+        self._tokens = {}
+        self._grams = {}
+        self._gram_counts = {}
+        self._numbered = set()
+        for label in labels:
+            tokens = label.split()
+            if len(tokens) > 1 and is_numeral(tokens[-1]):
+                self._numbered.add(" ".join(tokens[:-1]))
+            for token in set(tokens):
+                self._tokens.setdefault(token, []).append(label)
+            grams = qgrams(label)
+            self._gram_counts[label] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(label)
+        total = len(labels) + 1
+        self._idf = {token: math.log(total / len(keys)) + 1.0 for token, keys in self._tokens.items()}
+        self._unseen_idf = math.log(total) + 1.0
+
+    def candidates(self, key: str) -> set:
+        """Labels sharing a selective token or at least MIN_GRAM_OVERLAP of their q-grams with `key`."""
+        found = set()
+        for token in set(key.split()):
+            block = self._tokens.get(token, ())
+            if len(block) <= MAX_TOKEN_BLOCK:
+                found.update(block)
+        grams = qgrams(key)
+        shared = Counter()
+        for gram in grams:
+            block = self._grams.get(gram, ())
+            if len(block) <= MAX_GRAM_BLOCK:
+                shared.update(block)
+        for label, count in shared.items():
+            if count >= MIN_GRAM_OVERLAP * min(len(grams), self._gram_counts[label]):
+                found.add(label)
+        return found
+
+    def _weight(self, token: str) -> float:
+        return self._idf.get(token, self._unseen_idf)
+
+    def _token_similarity(self, token: str, other: str) -> float:
+        if token == other:
+            return 1.0
+        if token[0] != other[0] or min(len(token), len(other)) < FUZZY_TOKEN_LENGTH:
+            return 0.0
+        ratio = SequenceMatcher(None, token, other).ratio()
+        return ratio if ratio >= TOKEN_SIMILARITY else 0.0
+
+    def _absorbs(self, key: str, label: str, matched: dict, extra: set) -> bool:
+        """
+        Whether `label`, all of whose tokens `key` shares (`matched`: key token -> label token), may leave
+        the `extra` tokens of `key` out; called both ways round.
+        """
+        if label in self._numbered and any(map(is_numeral, extra)):
+            return False
+        core = [t for t in label.split() if informative(t)]
+        if len(core) != 1:
+            return len(core) > 1
+        tokens = key.split()
+        position = min(i for i, t in enumerate(tokens) if matched.get(t) == core[0])
+        # a one-word label only takes stopwords and trailing epithets: "Gandalf the Grey", not "Black Trolls"
+        return all(t in STOPWORDS or (t in EPITHETS and i > position) for i, t in enumerate(tokens) if t in extra)
+
+    def head(self, name: str) -> tuple:
+        """
+        (head token, qualifier tokens) of a name: the head is its first token before any parenthesis that is
+        not a stopword or epithet (else its first token), the qualifier the non-stopwords in parentheses
+        or after "of" ("Finduilas of Dol Amroth").
+        """
+        before, _paren, after = name.partition("(")
+        tokens = self.key(before).split() or self.key(name).split()
+        head = next((t for t in tokens if informative(t)), tokens[0] if tokens else "")
+        qualifier = self.key(after.split(")", 1)[0]).split()
+        if "of" in tokens:
+            qualifier += tokens[tokens.index("of") + 1:]
+        return head, {t for t in qualifier if t not in STOPWORDS}
+
+    def score(self, key: str, label: str, head: tuple = None) -> float:
+        """
+        IDF-weighted Dice coefficient of both token sets, near-identical tokens counting by similarity,
+        raised to CONTAINMENT_SCORE when one side's tokens are all shared; 0 for a rejected candidate.
+        `head` is the (head token, qualifier tokens) of the name.
+        """
+        if key.replace(" ", "") == label.replace(" ", ""):
+            return 1.0
+        tokens = set(key.split())
+        label_tokens = set(label.split())
+        total = sum(map(self._weight, tokens)) + sum(map(self._weight, label_tokens))
+        shared = 0.0
+        matched = {}
+        for token in tokens:
+            similarity, other = max((self._token_similarity(token, other), other) for other in label_tokens)
+            if similarity:
+                shared += similarity * (self._weight(token) + self._weight(other)) / 2
+                matched[token] = other
+        if not any(informative(token) for token in matched):
+            return 0.0
+        head, qualifier = head or (None, ())
+        if head is not None and head not in matched:
+            return 0.0
+        dice = 2 * shared / total if total else 0.0
+
+        extra = tokens - set(matched)
+        if qualifier and not any(t in matched and not is_numeral(t) for t in qualifier):
+            contained = ""  # the qualifier would be ignored: "Finduilas of Dol Amroth" / "finduilas"
+        elif label_tokens <= set(matched.values()):
+            contained = label if self._absorbs(key, label, matched, extra) else ""
+        elif not extra:
+            inverse = {other: token for token, other in matched.items()}
+            contained = key if qualifier or self._absorbs(label, key, inverse, label_tokens - set(inverse)) else ""
+        else:
+            contained = ""
+        if len(contained.replace(" ", "")) >= MIN_CONTAINED_LENGTH:
+            return CONTAINMENT_SCORE + (1 - CONTAINMENT_SCORE) * dice
+        return dice
+
+    def match(self, name: str) -> Match:
+        key = self.key(name)
+        if not key:
+            return Match(name, NO_CANDIDATE, 0.0, None, None, None)
+        if key in self.labels:
+            return Match(name, EXACT, 1.0, key, min(self.labels[key]), None)
+
+        head = self.head(name)
+        best = {}
+        for label in self.candidates(key):
+            score = self.score(key, label, head)
+            uri = min(self.labels[label])
+            if uri not in best or (-score, label) < (-best[uri][0], best[uri][1]):
+                best[uri] = (score, label)
+        if not best or max(score for score, _label in best.values()) == 0.0:
+            return Match(name, NO_CANDIDATE, 0.0, None, None, None)
+
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], item[1][1], item[0]))
+        uri, (score, label) = ranked[0]
+        runner_up = ranked[1][1][0] if len(ranked) > 1 else None
+        if score < self.threshold:
+            status = BELOW_THRESHOLD
+        elif runner_up is not None and score - runner_up < self.margin:
+            status = AMBIGUOUS
+        else:
+            status = FUZZY
+        return Match(name, status, round(score, 3), label, uri, runner_up and round(runner_up, 3))
+
+    def resolve_many(self, names) -> dict:
+        """{name: Match} for every distinct non-empty name of the batch."""
+        return {name: self.match(name) for name in set(names) if name}
+
+
+def accepted(match: Match) -> bool:
+    return match is not None and match.status in (EXACT, FUZZY)
+
+
+def main():
+    matcher = FuzzyMatcher(build_label_index(load_graph(DATA_FILE)))
+    for name in sys.argv[1:]:
+        m = matcher.match(name)
+        print(f"{m.status:<16} {m.score:5.3f}  {name} -> {m.label} ({m.uri})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Process-wide cache of parsed RDF graphs shared by the pipeline stages.
+load_graph() parses a Turtle file once and hands the same Graph to every later
+caller while the file is unchanged (same mtime and size); save_graph() writes a
+graph and registers it as the parsed content of its file, so the next stage of
+a single-process build (run_pipeline.py --in-process) never re-parses it.
+A Turtle file with a current binary snapshot (graph_snapshot.py) is loaded
+from the snapshot instead of being parsed.
+
+Cached graphs are shared: a stage that modifies a loaded graph must ask for
+load_graph(path, copy=True), and a saved graph must not be modified afterwards.
+"""
+
+import os
+
+from rdflib import Graph
+
+from graph_snapshot import is_current, load_snapshot, snapshot_path
+
+_GRAPHS = {}
+
+
+def _stamp(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def copy_graph(graph: Graph) -> Graph:
+    clone = Graph()
+    for prefix, namespace in graph.namespaces():
+        clone.bind(prefix, namespace, override=True)
+    clone.addN((s, p, o, clone) for s, p, o in graph)
+    return clone
+
+
+def load_graph(path, copy: bool = False, format: str = "turtle") -> Graph:
+    """Parsed graph of a file, parsed at most once per process while the file is unchanged."""
+    key = os.path.abspath(path)
+    stamp = _stamp(key)
+    cached = _GRAPHS.get(key)
+    if cached is None or cached[0] != stamp:
+        if format == "turtle" and is_current(key):
+            graph = load_snapshot(snapshot_path(key))
+        else:
+            graph = Graph()
+            graph.parse(key, format=format)
+        cached = (stamp, graph)
+        _GRAPHS[key] = cached
+    return copy_graph(cached[1]) if copy else cached[1]
+
+
+def cached_graph(path):
+    """The cached graph of a file if it is still current, without loading anything."""
+    key = os.path.abspath(path)
+    cached = _GRAPHS.get(key)
+    if cached is None or not os.path.exists(key) or cached[0] != _stamp(key):
+        return None
+    return cached[1]
+
+
+def fix_schema_prefix(path):
+    """rdflib rebinds schema.org as schema1 when schema is taken; restore the schema prefix."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if "@prefix schema1:" in content:
+        content = content.replace("@prefix schema1:", "@prefix schema:")
+        content = content.replace("schema1:", "schema:")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def save_graph(graph: Graph, path, format: str = "turtle"):
+    """Serialize a graph and keep it as the cached parse of the written file."""
+    graph.serialize(destination=str(path), format=format)
+    if format == "turtle":
+        fix_schema_prefix(path)
+    key = os.path.abspath(path)
+    _GRAPHS[key] = (_stamp(key), graph)
+
+
+def forget(path=None):
+    """Drop one cached graph, or all of them."""
+    if path is None:
+        _GRAPHS.clear()
+    else:
+        _GRAPHS.pop(os.path.abspath(path), None)
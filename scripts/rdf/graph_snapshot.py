@@ -0,0 +1,234 @@
+"""
+Compact binary snapshot of an RDF graph (written next to kg_full.ttl as kg_full.kgsnap).
+Layout: magic, JSON header, term dictionary (uint64 offsets + UTF-8 blob) and the
+triples as sorted uint32 (s, p, o) id arrays, all memory-mappable. A snapshot
+records the sha256 of the Turtle file it was written with, so graph_cache only
+uses it while that file is unchanged.
+
+    write_snapshot(triples, path, namespaces, source)  triples: any (s, p, o) iterable
+    load_snapshot(path) -> rdflib Graph
+    SnapshotIndex(path)  read-only, mmap-backed, no Graph built
+"""
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from rdflib import BNode, Graph, Literal, URIRef
+
+MAGIC = b"TKGSNAP\x01"
+SNAPSHOT_SUFFIX = ".kgsnap"
+
+
+def snapshot_path(ttl_path) -> Path:
+    return Path(ttl_path).with_suffix(SNAPSHOT_SUFFIX)
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_term(term) -> str:
+    if isinstance(term, Literal):
+        extra = f"@{term.language}" if term.language else (str(term.datatype) if term.datatype else "")
+        return f"L{extra}\x00{term}"
+    return f"{'B' if isinstance(term, BNode) else 'U'}\x00{term}"
+
+
+def decode_term(text: str):
+    head, value = text.split("\x00", 1)
+    kind = head[0]
+    if kind == "U":
+        return URIRef(value)
+    if kind == "B":
+        return BNode(value)
+    extra = head[1:]
+    if extra.startswith("@"):
+        return Literal(value, lang=extra[1:])
+    return Literal(value, datatype=URIRef(extra) if extra else None)
+
+
+def _align(f, boundary: int = 8):
+    pad = -f.tell() % boundary
+    if pad:
+        f.write(b"\0" * pad)
+
+
+def write_snapshot(triples, path, namespaces=(), source=None) -> int:
+    """Write (s, p, o) triples to a snapshot; source is the Turtle file it mirrors. Returns the triple count."""
+    term_ids = {}
+    terms = []
+    rows = set()
+    for triple in triples:
+        ids = []
+        for term in triple[:3]:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(terms)
+                terms.append(term)
+            ids.append(term_id)
+        rows.add(tuple(ids))
+
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for term in terms:
+        blob += encode_term(term).encode("utf-8")
+        offsets.append(len(blob))
+    flat = array("I")
+    for row in sorted(rows):
+        flat.extend(row)
+
+    header = {
+        "terms": len(terms),
+        "triples": len(rows),
+        "byteorder": sys.byteorder,
+        "namespaces": [[prefix, str(ns)] for prefix, ns in namespaces],
+        "source_sha256": file_sha256(source) if source else None,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header_bytes = json.dumps(header).encode("utf-8")
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        _align(f)
+        f.write(offsets.tobytes())
+        f.write(blob)
+        _align(f)
+        f.write(flat.tobytes())
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class SnapshotIndex:
+    """Read-only, memory-mapped view of a snapshot; terms are decoded on demand."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"Not a graph snapshot: {self.path}")
+        (header_len,) = struct.unpack_from("<I", self._mm, 8)
+        self.header = json.loads(self._mm[12:12 + header_len].decode("utf-8"))
+        if self.header["byteorder"] != sys.byteorder:
+            raise ValueError(f"Snapshot written on a {self.header['byteorder']}-endian machine: {self.path}")
+        n_terms = self.header["terms"]
+        pos = 12 + header_len
+        pos += -pos % 8
+        view = memoryview(self._mm)
+        self._offsets = view[pos:pos + 8 * (n_terms + 1)].cast("Q")
+        self._blob_at = pos + 8 * (n_terms + 1)
+        pos = self._blob_at + self._offsets[n_terms]
+        pos += -pos % 8
+        self._triples = view[pos:pos + 12 * self.header["triples"]].cast("I")
+        self._decoded = {}
+        self._ids = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._offsets.release()
+        self._triples.release()
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self.header["triples"]
+
+    @property
+    def namespaces(self) -> list:
+        return self.header["namespaces"]
+
+    def term(self, term_id: int):
+        term = self._decoded.get(term_id)
+        if term is None:
+            start = self._blob_at + self._offsets[term_id]
+            end = self._blob_at + self._offsets[term_id + 1]
+            term = self._decoded[term_id] = decode_term(self._mm[start:end].decode("utf-8"))
+        return term
+
+    def term_id(self, term):
+        if self._ids is None:
+            self._ids = {self.term(i): i for i in range(self.header["terms"])}
+        return self._ids.get(term)
+
+    def triple_ids(self):
+        t = self._triples
+        for i in range(0, len(t), 3):
+            yield t[i], t[i + 1], t[i + 2]
+
+    def triples(self, pattern=(None, None, None)):
+        """rdflib-style triples((s, p, o)) lookup; subject lookups use the s-sorted order."""
+        ids = []
+        for term in pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            term_id = self.term_id(term)
+            if term_id is None:
+                return
+            ids.append(term_id)
+        s_id, p_id, o_id = ids
+        t = self._triples
+        lo, hi = 0, len(self)
+        if s_id is not None:
+            subjects = _Column(t, 0)
+            lo = bisect.bisect_left(subjects, s_id)
+            hi = bisect.bisect_right(subjects, s_id, lo)
+        for row in range(lo, hi):
+            s, p, o = t[3 * row], t[3 * row + 1], t[3 * row + 2]
+            if (p_id is None or p == p_id) and (o_id is None or o == o_id):
+                yield self.term(s), self.term(p), self.term(o)
+
+    def to_graph(self) -> Graph:
+        graph = Graph()
+        for prefix, namespace in self.namespaces:
+            graph.bind(prefix, namespace, override=True)
+        terms = [self.term(i) for i in range(self.header["terms"])]
+        graph.addN((terms[s], terms[p], terms[o], graph) for s, p, o in self.triple_ids())
+        return graph
+
+
+class _Column:
+    """Sequence view of one column of the flat triple array, for bisect."""
+
+    def __init__(self, flat, column: int):
+        self.flat = flat
+        self.column = column
+
+    def __len__(self):
+        return len(self.flat) // 3
+
+    def __getitem__(self, row):
+        return self.flat[3 * row + self.column]
+
+
+def load_snapshot(path) -> Graph:
+    with SnapshotIndex(path) as index:
+        return index.to_graph()
+
+
+def is_current(ttl_path) -> bool:
+    """True if the snapshot of a Turtle file exists and was written from its current content."""
+    snap = snapshot_path(ttl_path)
+    if not snap.exists() or not Path(ttl_path).exists():
+        return False
+    try:
+        with SnapshotIndex(snap) as index:
+            return index.header.get("source_sha256") == file_sha256(ttl_path)
+    except ValueError:
+        return False
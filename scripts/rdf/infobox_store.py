@@ -0,0 +1,239 @@
+"""
+Single-file corpus store for crawled infoboxes.
+Replaces thousands of data/infoboxes/infobox_*.txt files by one append-only
+SQLite database (data/infoboxes/infoboxes.sqlite) indexed by title, revid and
+content hash. Each row holds exactly what the .txt file used to contain
+("--- Title ---" line, infobox, optional "Other names" section), so readers
+parse records the same way; a NULL content row is a tombstone.
+Writers open the store with open_corpus_store(): the first time, it imports
+the .txt files already in the directory, so a crawl that upgrades a checkout
+of .txt files to the store keeps its unchanged pages. Readers should use
+iter_infobox_texts(), which streams from the store when it exists (adding the
+.txt files of titles a store without that import lacks) and falls back to the
+.txt files otherwise.
+
+Run directly to import an existing directory of .txt files into the store
+and drop superseded revisions.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+INPUT_DIR = "data/infoboxes"
+STORE_FILE = "infoboxes.sqlite"
+FILES_IMPORTED = "files_imported"
+
+_TITLE_RE = re.compile(r"^---\s+(.+?)\s+---$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    revid INTEGER,
+    timestamp TEXT,
+    sha1 TEXT,
+    content TEXT,
+    stored_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_title ON pages (title, id);
+CREATE INDEX IF NOT EXISTS pages_revid ON pages (revid);
+CREATE INDEX IF NOT EXISTS pages_sha1 ON pages (sha1);
+CREATE VIEW IF NOT EXISTS latest AS
+    SELECT * FROM pages WHERE id IN (SELECT MAX(id) FROM pages GROUP BY title);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def store_path(input_dir: str = INPUT_DIR) -> str:
+    return os.path.join(input_dir, STORE_FILE)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class InfoboxStore:
+    """Append-only SQLite store; the latest row of a title is its current version."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    def latest(self, title: str):
+        """(revid, timestamp, sha1, content) of the current version, or None."""
+        return self.conn.execute(
+            "SELECT revid, timestamp, sha1, content FROM pages WHERE title = ? ORDER BY id DESC LIMIT 1",
+            (title,),
+        ).fetchone()
+
+    def append(self, title: str, content: str, revid=None, timestamp=None) -> bool:
+        """Store a new version; returns False (nothing written) if the content is unchanged."""
+        sha1 = content_hash(content)
+        current = self.latest(title)
+        if current is not None and current[2] == sha1:
+            if revid is not None and current[0] != revid:
+                self.conn.execute(
+                    "UPDATE pages SET revid = ?, timestamp = ? WHERE id = "
+                    "(SELECT MAX(id) FROM pages WHERE title = ?)",
+                    (revid, timestamp, title),
+                )
+            return False
+        self.conn.execute(
+            "INSERT INTO pages (title, revid, timestamp, sha1, content, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (title, revid, timestamp, sha1, content, time.strftime("%Y-%m-%dT%H:%M:%S")),
+        )
+        return True
+
+    def remove(self, title: str, revid=None, timestamp=None) -> bool:
+        """Tombstone a title (page deleted or infobox removed)."""
+        current = self.latest(title)
+        if current is None or current[3] is None:
+            return False
+        self.conn.execute(
+            "INSERT INTO pages (title, revid, timestamp, sha1, content, stored_at) VALUES (?, ?, ?, NULL, NULL, ?)",
+            (title, revid, timestamp, time.strftime("%Y-%m-%dT%H:%M:%S")),
+        )
+        return True
+
+    def known_titles(self) -> set:
+        """Every title with a row, tombstones included."""
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT title FROM pages")}
+
+    def titles(self) -> set:
+        return {row[0] for row in self.conn.execute("SELECT title FROM latest WHERE content IS NOT NULL")}
+
+    def revisions(self) -> dict:
+        """{title: (revid, timestamp)} for every live page."""
+        return {
+            title: (revid, timestamp)
+            for title, revid, timestamp in self.conn.execute(
+                "SELECT title, revid, timestamp FROM latest WHERE content IS NOT NULL"
+            )
+        }
+
+    def hashes(self) -> dict:
+        """{title: sha1} for every live page."""
+        return dict(self.conn.execute("SELECT title, sha1 FROM latest WHERE content IS NOT NULL"))
+
+    def iter_pages(self):
+        """Stream (title, sha1, content) of every live page, ordered by title."""
+        cursor = self.conn.execute(
+            "SELECT title, sha1, content FROM latest WHERE content IS NOT NULL ORDER BY title"
+        )
+        yield from cursor
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM latest WHERE content IS NOT NULL").fetchone()[0]
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def compact(self) -> int:
+        """Drop superseded versions and tombstones; returns the number of rows removed."""
+        removed = self.conn.execute(
+            "DELETE FROM pages WHERE id NOT IN (SELECT id FROM latest WHERE content IS NOT NULL)"
+        ).rowcount
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+        return removed
+
+
+def title_from_text(text: str):
+    """Page title from the first line of an infobox record (--- Page Title ---)."""
+    match = _TITLE_RE.match(text.split("\n", 1)[0].strip())
+    return match.group(1) if match else None
+
+
+def iter_infobox_files(input_dir: str = INPUT_DIR):
+    """Yield (file name, text) of every infobox_*.txt file, sorted by name."""
+    for fname in sorted(os.listdir(input_dir)):
+        if not (fname.startswith("infobox_") and fname.endswith(".txt")):
+            continue
+        with open(os.path.join(input_dir, fname), encoding="utf-8") as f:
+            yield fname, f.read()
+
+
+def iter_infobox_texts(input_dir: str = INPUT_DIR):
+    """
+    Yield (key, text) for every infobox record of a corpus directory: (title, text)
+    streamed from the store when present, else (file name, text) from the .txt files.
+    A store that never imported the .txt files is completed by the files of the
+    titles it does not know.
+    """
+    path = store_path(input_dir)
+    if not os.path.exists(path):
+        yield from iter_infobox_files(input_dir)
+        return
+    with InfoboxStore(path) as store:
+        for title, _sha1, content in store.iter_pages():
+            yield title, content
+        if store.get_meta(FILES_IMPORTED) is not None:
+            return
+        known = store.known_titles()
+    for fname, text in iter_infobox_files(input_dir):
+        if title_from_text(text) not in known:
+            yield fname, text
+
+
+def import_directory(store: InfoboxStore, input_dir: str = INPUT_DIR, skip_known: bool = False) -> int:
+    """
+    Append the .txt records of a directory to the store; with skip_known, only
+    the titles the store has no row for, so newer crawled versions stay current.
+    """
+    known = store.known_titles() if skip_known else set()
+    imported = 0
+    for _fname, text in iter_infobox_files(input_dir):
+        title = title_from_text(text)
+        if title and title not in known and store.append(title, text):
+            imported += 1
+    store.set_meta(FILES_IMPORTED, time.strftime("%Y-%m-%dT%H:%M:%S"))
+    store.commit()
+    return imported
+
+
+def open_corpus_store(input_dir: str = INPUT_DIR) -> InfoboxStore:
+    """Open (or create) the store of a corpus directory, importing its .txt files the first time."""
+    store = InfoboxStore(store_path(input_dir))
+    if store.get_meta(FILES_IMPORTED) is None:
+        imported = import_directory(store, input_dir, skip_known=True)
+        if imported:
+            print(f"Imported {imported} .txt infobox records into {store.path}")
+    return store
+
+
+def main():
+    path = store_path(INPUT_DIR)
+    with InfoboxStore(path) as store:
+        imported = import_directory(store, INPUT_DIR)
+        removed = store.compact()
+        print(f"OK. Infobox store: {path}")
+        print(f"  - Records imported from .txt files: {imported}")
+        print(f"  - Superseded rows removed: {removed}")
+        print(f"  - Live pages: {store.count()}")
+
+
+if __name__ == "__main__":
+    main()
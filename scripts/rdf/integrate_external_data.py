@@ -1,18 +1,30 @@
 """
 Automatic enrichment of the Tolkien KG.
-Merges external data sources (METW cards JSON, LotR characters CSV),
+Merges external data sources (METW cards JSON, read card by card through
+card_stream.py, LotR characters CSV),
 adds multilingual labels, schema metadata, and optional DBpedia owl:sameAs links,
 then writes the consolidated triples to data/rdf/external_links.ttl.
-Relies on labels from data/rdf/all_infoboxes.ttl to match entities.
+Relies on labels from data/rdf/all_infoboxes.ttl to match entities: exact
+normalized names first, then the approximate matcher of fuzzy_match.py. Every
+card and CSV row is listed with its best match and score in
+data/rdf/external_match_report.csv. Fuzzy matches are only reported: a fuzzy
+match links its card or CSV facts once its (name, uri) pair is in the reviewed
+accept list data/rdf/fuzzy_accept.csv (rows of the report with at least the
+"name" and "uri" columns), and never adds labels or DBpedia links to the
+entity. FUZZY_MATCHING = True links every fuzzy match without review.
 """
 
 import csv
-import json
 from pathlib import Path
 from urllib.parse import quote
 
 from rdflib import Graph, Literal, Namespace, RDF, RDFS, OWL, URIRef
 
+from graph_cache import load_graph, save_graph
+from card_stream import image_base_url, iter_cards
+from fuzzy_match import EXACT, FUZZY, FuzzyMatcher
+from label_index import build_label_index
+
 KGRES = Namespace("http://tolkien-kg.org/resource/")
 KGONT = Namespace("http://tolkien-kg.org/ontology/")
 SCHEMA = Namespace("http://schema.org/")
@@ -22,43 +34,25 @@ INPUT_TTL = Path("data/rdf/all_infoboxes.ttl")
 CARDS_JSON = Path("data/rdf/cards.json")
 CSV_CHARACTERS = Path("data/rdf/lotr_characters.csv")
 OUTPUT_TTL = Path("data/rdf/external_links.ttl")
+MATCH_REPORT = Path("data/rdf/external_match_report.csv")
 
 ADD_DBPEDIA_SAMEAS = True
+FUZZY_MATCHING = False
+FUZZY_THRESHOLD = 0.85
+FUZZY_ACCEPT_FILE = Path("data/rdf/fuzzy_accept.csv")
 
+fuzzy_accepts = set()
 
-def normalize_name(value: str) -> str:
-    text = (value or "").strip().lower()
-    text = text.replace("_", " ")
-    cleaned = []
-    for ch in text:
-        if ch.isalnum() or ch.isspace():
-            cleaned.append(ch)
-    text = "".join(cleaned)
-    return " ".join(text.split())
-
-
-def build_label_index(graph: Graph) -> dict:
-    labels = {}
-    for s, p, o in graph.triples((None, None, None)):
-        if p not in (SCHEMA.name, RDFS.label):
-            continue
-        if not isinstance(o, Literal):
-            continue
-        key = normalize_name(str(o))
-        if not key:
-            continue
-        labels.setdefault(key, set()).add(s)
-    return labels
-
-
-def find_entity(labels_index: dict, name: str):
-    key = normalize_name(name)
-    if not key:
-        return None
-    uris = labels_index.get(key)
-    if not uris:
-        return None
-    return next(iter(uris))
+CSV_FIELD_MAP = {
+    "birth": KGONT.birthDate,
+    "death": KGONT.deathDate,
+    "gender": SCHEMA.gender,
+    "hair": KGONT.hair,
+    "height": KGONT.height,
+    "race": KGONT.race,
+    "realm": KGONT.realm,
+    "spouse": KGONT.spouse,
+}
 
 
 def dbpedia_uri(name: str) -> URIRef:
@@ -75,101 +69,124 @@ def add_dbpedia_link(graph: Graph, entity_uri: URIRef, name: str, linked: set):
     linked.add(entity_uri)
 
 
-def integrate_cards(graph: Graph, labels_index: dict, linked_dbpedia: set) -> int:
+def load_fuzzy_accepts(path: Path = FUZZY_ACCEPT_FILE) -> set:
+    """{(name, uri)} of the reviewed fuzzy matches; empty without the file."""
+    if not path.exists():
+        return set()
+    with path.open("r", encoding="utf-8", newline="") as f:
+        return {(row["name"], row["uri"]) for row in csv.DictReader(f) if row.get("name") and row.get("uri")}
+
+
+def is_linked(match) -> bool:
+    if match is None:
+        return False
+    if match.status == EXACT:
+        return True
+    return match.status == FUZZY and (FUZZY_MATCHING or (match.name, str(match.uri)) in fuzzy_accepts)
+
+
+def best_match(matches):
+    """Exact before fuzzy, then the highest score; None for an empty batch."""
+    return max(matches, key=lambda m: (m.status == EXACT, is_linked(m), m.score), default=None)
+
+
+def integrate_cards(graph: Graph, matcher: FuzzyMatcher, linked_dbpedia: set, report: list) -> int:
     if not CARDS_JSON.exists():
         return 0
     count = 0
-    with CARDS_JSON.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for _set_id, set_data in data.items():
-        base_urls = set_data.get("imageBaseUrl", {})
-        cards = set_data.get("cards", {})
-        for card_id, card in cards.items():
-            name_by_lang = card.get("name", {})
-            if not isinstance(name_by_lang, dict):
-                continue
+    matches = {}
 
-            entity_uri = None
-            matched_name = None
-            for lang, label in name_by_lang.items():
-                if not label:
-                    continue
-                entity_uri = find_entity(labels_index, label)
-                if entity_uri:
-                    matched_name = label
-                    break
-
-            if not entity_uri:
-                continue
+    for card_set, card_id, card in iter_cards(CARDS_JSON):
+        name_by_lang = card.get("name", {})
+        if not isinstance(name_by_lang, dict):
+            continue
 
-            card_uri = KGCARD[card_id]
-            graph.add((card_uri, RDF.type, SCHEMA.CreativeWork))
-            graph.add((card_uri, SCHEMA.identifier, Literal(card_id)))
-            graph.add((entity_uri, SCHEMA.subjectOf, card_uri))
-            graph.add((card_uri, SCHEMA.about, entity_uri))
-
-            image_file = card.get("image")
-            if image_file:
-                base_url = base_urls.get("en") or next(iter(base_urls.values()), "")
-                if base_url:
-                    graph.add((card_uri, SCHEMA.image, URIRef(f"{base_url}{image_file}")))
-
-            for lang, label in name_by_lang.items():
-                if not label:
-                    continue
-                lang_tag = lang if lang.isalpha() else None
-                graph.add((card_uri, RDFS.label, Literal(label, lang=lang_tag)))
+        labels = [label for label in name_by_lang.values() if label and isinstance(label, str)]
+        for label in labels:
+            if label not in matches:
+                matches[label] = matcher.match(label)
+        match = best_match(matches[label] for label in labels)
+        if match is None:
+            continue
+        report.append(("cards", card_id, match))
+        if not is_linked(match):
+            continue
+        entity_uri = match.uri
+
+        card_uri = KGCARD[card_id]
+        graph.add((card_uri, RDF.type, SCHEMA.CreativeWork))
+        graph.add((card_uri, SCHEMA.identifier, Literal(card_id)))
+        graph.add((entity_uri, SCHEMA.subjectOf, card_uri))
+        graph.add((card_uri, SCHEMA.about, entity_uri))
+
+        image_file = card.get("image")
+        if image_file:
+            base_url = image_base_url(card_set)
+            if base_url:
+                graph.add((card_uri, SCHEMA.image, URIRef(f"{base_url}{image_file}")))
+
+        for lang, label in name_by_lang.items():
+            if not label:
+                continue
+            lang_tag = lang if lang.isalpha() else None
+            graph.add((card_uri, RDFS.label, Literal(label, lang=lang_tag)))
+            if match.status == EXACT:
                 graph.add((entity_uri, RDFS.label, Literal(label, lang=lang_tag)))
 
-            if matched_name:
-                add_dbpedia_link(graph, entity_uri, matched_name, linked_dbpedia)
-            count += 1
+        if match.status == EXACT:
+            add_dbpedia_link(graph, entity_uri, match.name, linked_dbpedia)
+        count += 1
     return count
 
 
-def integrate_csv(graph: Graph, labels_index: dict, linked_dbpedia: set) -> int:
+def integrate_csv(graph: Graph, matcher: FuzzyMatcher, linked_dbpedia: set, report: list) -> int:
     if not CSV_CHARACTERS.exists():
         return 0
     count = 0
     with CSV_CHARACTERS.open("r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            name = (row.get("name") or "").strip()
-            if not name:
-                continue
-            entity_uri = find_entity(labels_index, name)
-            if not entity_uri:
-                continue
+        rows = list(csv.DictReader(f))
+    matches = matcher.resolve_many((row.get("name") or "").strip() for row in rows)
 
+    for line, row in enumerate(rows, start=2):
+        name = (row.get("name") or "").strip()
+        if not name:
+            continue
+        match = matches[name]
+        report.append(("csv", line, match))
+        if not is_linked(match):
+            continue
+        entity_uri = match.uri
+
+        if match.status == EXACT:
             graph.add((entity_uri, RDFS.label, Literal(name, lang="en")))
             add_dbpedia_link(graph, entity_uri, name, linked_dbpedia)
 
-            field_map = {
-                "birth": KGONT.birthDate,
-                "death": KGONT.deathDate,
-                "gender": SCHEMA.gender,
-                "hair": KGONT.hair,
-                "height": KGONT.height,
-                "race": KGONT.race,
-                "realm": KGONT.realm,
-                "spouse": KGONT.spouse,
-            }
-            for key, pred in field_map.items():
-                value = (row.get(key) or "").strip()
-                if value:
-                    graph.add((entity_uri, pred, Literal(value)))
-
-            count += 1
+        for key, pred in CSV_FIELD_MAP.items():
+            value = (row.get(key) or "").strip()
+            if value:
+                graph.add((entity_uri, pred, Literal(value)))
+
+        count += 1
     return count
 
 
+def write_match_report(report: list, path: Path = MATCH_REPORT):
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "record", "name", "status", "score", "runner_up", "label", "uri", "linked"])
+        for source, record, m in report:
+            writer.writerow([
+                source, record, m.name, m.status, f"{m.score:.3f}",
+                "" if m.runner_up is None else f"{m.runner_up:.3f}",
+                m.label or "", m.uri or "", "yes" if is_linked(m) else "no",
+            ])
+
+
 def main():
     if not INPUT_TTL.exists():
         raise FileNotFoundError(f"Missing input: {INPUT_TTL}")
 
-    kg = Graph()
-    kg.parse(INPUT_TTL, format="turtle")
+    kg = load_graph(INPUT_TTL)
 
     out = Graph()
     out.bind("kg-res", KGRES)
@@ -179,27 +196,24 @@ def main():
     out.bind("owl", OWL)
     out.bind("kg-card", KGCARD)
 
-    labels_index = build_label_index(kg)
+    matcher = FuzzyMatcher(build_label_index(kg), threshold=FUZZY_THRESHOLD)
+    fuzzy_accepts.clear()
+    fuzzy_accepts.update(load_fuzzy_accepts())
     linked_dbpedia = set()
+    report = []
+
+    cards_count = integrate_cards(out, matcher, linked_dbpedia, report)
+    csv_count = integrate_csv(out, matcher, linked_dbpedia, report)
 
-    cards_count = integrate_cards(out, labels_index, linked_dbpedia)
-    csv_count = integrate_csv(out, labels_index, linked_dbpedia)
-
-    out.serialize(destination=str(OUTPUT_TTL), format="turtle")
-    try:
-        with open(OUTPUT_TTL, "r", encoding="utf-8") as f:
-            content = f.read()
-        if "@prefix schema1:" in content:
-            content = content.replace("@prefix schema1:", "@prefix schema:")
-            content = content.replace("schema1:", "schema:")
-            with open(OUTPUT_TTL, "w", encoding="utf-8") as f:
-                f.write(content)
-    except Exception:
-        pass
+    save_graph(out, OUTPUT_TTL)
+    write_match_report(report)
     print(f"OK. External triples written: {OUTPUT_TTL}")
     print(f"  - Cards linked: {cards_count}")
     print(f"  - CSV rows linked: {csv_count}")
     print(f"  - DBpedia links added: {len(linked_dbpedia)}")
+    fuzzy = [m for _source, _record, m in report if m.status == FUZZY]
+    linked = sum(1 for m in fuzzy if is_linked(m))
+    print(f"  - Fuzzy matches: {len(fuzzy)}, {linked} linked (accept list: {FUZZY_ACCEPT_FILE}, report: {MATCH_REPORT})")
 
 
 if __name__ == "__main__":
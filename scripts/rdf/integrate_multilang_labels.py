@@ -3,120 +3,297 @@ Automatic multilingual label enrichment for the Tolkien KG.
 Fetches langlinks from the LotR Fandom API for each entity label, then writes
 new rdfs:label literals (with language tags) into data/rdf/multilang_labels.ttl.
 Only labels uniquely mapped to one entity in data/rdf/all_infoboxes.ttl are used.
+
+Requests go through the MediaWikiClient of mediawiki_client.py: BATCH_SIZE titles
+per request, CONCURRENCY requests in flight, a token bucket that pauses on
+maxlag / HTTP 429 / 503, and retries; batches that still fail are queued once
+more at the end of the run.
+
+Responses are cached in data/rdf/.langlinks_cache.jsonl, one line per requested
+title with the resolved page, its last-touched timestamp and its langlinks,
+appended as soon as a batch is done (an interrupted run resumes from it). A
+rerun only fetches titles that are new or whose page changed: edited pages are
+found with list=recentchanges since the last complete run, or, when that run
+is too old, by comparing prop=info touched timestamps. Titles whose page was
+missing are refetched once their entry is MISSING_RECHECK_DAYS old, in case
+the page has been created since.
+
+Set FANDOM_API to point the script at another MediaWiki API endpoint (e.g. a
+local stand-in server used for testing).
 """
 
-import time
-import requests
-from rdflib import Graph, Literal, Namespace
-from rdflib.namespace import RDFS, RDF
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
 
-API_URL = "https://lotr.fandom.com/api.php"
+from rdflib import Graph, Literal
+from rdflib.namespace import RDFS
+
+from graph_cache import load_graph, save_graph
+from label_index import build_label_index, normalize_name, unique_labels
+from mediawiki_client import (
+    MediaWikiClient,
+    collect_recent_changes,
+    recent_changes_usable,
+    recentchanges_params,
+    utc_timestamp,
+)
+
+API_URL = os.environ.get("FANDOM_API", "https://lotr.fandom.com/api.php")
 USER_AGENT = "TolkienKGBot/1.0 (student project; contact: you@example.com)"
-REQUEST_DELAY_SEC = 0.4
 BATCH_SIZE = 50
+CONCURRENCY = 4
+RATE_PER_SEC = 3.0
+BURST = 4
 
 INPUT_TTL = "data/rdf/all_infoboxes.ttl"
 OUTPUT_TTL = "data/rdf/multilang_labels.ttl"
+CACHE_FILE = "data/rdf/.langlinks_cache.jsonl"
+MISSING_RECHECK_DAYS = 7
+
 
-SCHEMA = Namespace("http://schema.org/")
+def langlinks_params(titles):
+    return {
+        "action": "query",
+        "prop": "langlinks|info",
+        "lllimit": "max",
+        "redirects": 1,
+        "titles": "|".join(titles),
+    }
 
 
-def normalize_label(value: str) -> str:
-    text = (value or "").strip().lower()
-    text = text.replace("_", " ")
-    cleaned = []
-    for ch in text:
-        if ch.isalnum() or ch.isspace():
-            cleaned.append(ch)
-    text = "".join(cleaned)
-    return " ".join(text.split())
+def info_params(titles):
+    return {"action": "query", "prop": "info", "redirects": 1, "titles": "|".join(titles)}
 
 
-def build_label_index(graph: Graph):
-    label_to_uris = {}
-    for s, p, o in graph.triples((None, None, None)):
-        if p not in (SCHEMA.name, RDFS.label):
-            continue
-        if not isinstance(o, Literal):
+def resolve(titles, aliases: dict) -> dict:
+    """{requested title: page title} following the normalized / redirects maps of the responses."""
+    resolved = {}
+    for title in titles:
+        page = title
+        for _ in range(3):
+            if page not in aliases:
+                break
+            page = aliases[page]
+        resolved[title] = page
+    return resolved
+
+
+def collect_pages(data: dict, pages: dict, aliases: dict):
+    """Merge one query response into `pages` ({page title: {"touched", "langlinks"}}) and `aliases`."""
+    query = data.get("query", {})
+    for item in query.get("normalized", []) + query.get("redirects", []):
+        aliases[item["from"]] = item["to"]
+    for page in query.get("pages", {}).values():
+        title = page.get("title")
+        if not title:
             continue
-        key = normalize_label(str(o))
-        if not key:
+        entry = pages.setdefault(title, {"touched": None, "langlinks": []})
+        if page.get("touched"):
+            entry["touched"] = page["touched"]
+        for link in page.get("langlinks", []):
+            lang = link.get("lang")
+            value = link.get("*")
+            if lang and value:
+                entry["langlinks"].append([lang, value])
+
+
+class LanglinksCache:
+    """Append-only JSONL cache {requested title: {"page", "touched", "langlinks"}} plus the last complete run."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.last_run = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # line cut short by an interrupted run
+                    if "title" in record:
+                        self.entries[record.pop("title")] = record
+                    elif "last_run" in record:
+                        self.last_run = record["last_run"]
+        self._file = None
+
+    def record(self, title: str, page, touched, langlinks):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        entry = {"page": page, "touched": touched, "langlinks": langlinks, "fetched": utc_timestamp()}
+        self._file.write(json.dumps({"title": title, **entry}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.entries[title] = entry
+
+    def compact(self, titles, last_run):
+        """Rewrites the file with the entries of `titles` only, followed by `last_run`."""
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for title in sorted(titles):
+                if title in self.entries:
+                    f.write(json.dumps({"title": title, **self.entries[title]}, ensure_ascii=False) + "\n")
+            if last_run:
+                f.write(json.dumps({"last_run": last_run}) + "\n")
+        os.replace(tmp_path, self.path)
+        self.last_run = last_run
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def missing_expired(entry: dict, now=None) -> bool:
+    """True for a page that was missing when fetched more than MISSING_RECHECK_DAYS ago (it may exist now)."""
+    if entry["touched"] is not None:
+        return False
+    fetched = entry.get("fetched")
+    if not fetched:
+        return True
+    fetched = datetime.strptime(fetched, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return (now or datetime.now(timezone.utc)) - fetched >= timedelta(days=MISSING_RECHECK_DAYS)
+
+
+async def stale_titles(client: MediaWikiClient, titles, cache: LanglinksCache) -> list:
+    """Cached titles whose page changed since it was fetched, or that were missing and are due a recheck."""
+    cached = [t for t in titles if t in cache.entries]
+    if not cached:
+        return []
+    expired = {t for t in cached if missing_expired(cache.entries[t])}
+    cached = [t for t in cached if t not in expired]
+    if recent_changes_usable({"last_run": cache.last_run}):
+        changed = set()
+        async for data in client.query_all(recentchanges_params(cache.last_run)):
+            collect_recent_changes(data, changed)
+        print(f"  - Pages edited since {cache.last_run}: {len(changed)}")
+        return sorted(expired) + [t for t in cached if cache.entries[t]["page"] in changed or t in changed]
+
+    pages = {}
+    aliases = {}
+
+    async def fetch_info(batch):
+        async for data in client.query_all(info_params(batch)):
+            collect_pages(data, pages, aliases)
+
+    await asyncio.gather(*(
+        fetch_info(cached[start : start + BATCH_SIZE]) for start in range(0, len(cached), BATCH_SIZE)
+    ))
+    resolved = resolve(cached, aliases)
+    return sorted(expired) + [
+        t for t in cached
+        if resolved[t] != cache.entries[t]["page"]
+        or pages.get(resolved[t], {}).get("touched") != cache.entries[t]["touched"]
+    ]
+
+
+async def fetch_langlinks(client: MediaWikiClient, batch, cache: LanglinksCache) -> bool:
+    """Fetches one batch and records every title in the cache; False if a request failed."""
+    pages = {}
+    aliases = {}
+    async for data in client.query_all(langlinks_params(batch)):
+        collect_pages(data, pages, aliases)
+        if "continue" in data:
             continue
-        label_to_uris.setdefault(key, set()).add(s)
-    return label_to_uris
+        for title, page in resolve(batch, aliases).items():
+            entry = pages.get(page, {"touched": None, "langlinks": []})
+            cache.record(title, page, entry["touched"], entry["langlinks"])
+        return True
+    return False
 
 
-def fetch_langlinks(titles):
-    params = {
-        "action": "query",
-        "prop": "langlinks",
-        "lllimit": "max",
-        "format": "json",
-        "redirects": 1,
-        "titles": "|".join(titles),
-    }
-    headers = {"User-Agent": USER_AGENT}
-    response = requests.get(API_URL, params=params, headers=headers, timeout=30)
-    response.raise_for_status()
-    return response.json()
+async def fetch_batches(client: MediaWikiClient, batches, cache: LanglinksCache) -> list:
+    """Drains the batches with CONCURRENCY workers, one batch each at a time; returns the failed ones."""
+    queue = asyncio.Queue()
+    for batch in batches:
+        queue.put_nowait(batch)
+    failed = []
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while not queue.empty():
+            batch = queue.get_nowait()
+            if not await fetch_langlinks(client, batch, cache):
+                failed.append(batch)
+                continue
+            done += 1
+            if done % 10 == 0:
+                print(f"  - Batches done: {done}/{len(batches)}")
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return failed
+
+
+async def refresh_cache(titles, cache: LanglinksCache, api_url: str = API_URL) -> int:
+    """Fetches the new and stale titles into the cache; returns the number of titles still failing."""
+    client = MediaWikiClient(api_url, concurrency=CONCURRENCY, rate=RATE_PER_SEC, burst=BURST, user_agent=USER_AGENT)
+    try:
+        stale = await stale_titles(client, titles, cache)
+        pending = [t for t in titles if t not in cache.entries] + stale
+        print(f"  - Titles: {len(titles)} ({len(pending)} to fetch, {len(stale)} stale)")
+        batches = [pending[start : start + BATCH_SIZE] for start in range(0, len(pending), BATCH_SIZE)]
+        failed = await fetch_batches(client, batches, cache)
+        if failed:
+            print(f"  - Retrying {len(failed)} failed batches")
+            failed = await fetch_batches(client, failed, cache)
+        print(f"  - API requests: {client.requests_sent}")
+        return sum(len(batch) for batch in failed)
+    finally:
+        client.close()
 
 
 def main():
-    kg = Graph()
-    kg.parse(INPUT_TTL, format="turtle")
+    kg = load_graph(INPUT_TTL)
 
-    label_to_uris = build_label_index(kg)
-    label_to_uri = {}
-    for key, uris in label_to_uris.items():
-        if len(uris) == 1:
-            label_to_uri[key] = next(iter(uris))
+    label_to_uri = unique_labels(build_label_index(kg))
 
     titles = list(label_to_uri.keys())
 
+    run_started = utc_timestamp()
+    cache = LanglinksCache()
+    try:
+        failed = asyncio.run(refresh_cache(titles, cache))
+    finally:
+        cache.close()
+    # A failed batch may hide edited pages: keep the previous start point.
+    cache.compact(titles, cache.last_run if failed else run_started)
+
     out = Graph()
     out.bind("rdfs", RDFS)
 
-    total_pages = 0
+    matched_pages = set()
     total_labels = 0
     languages = set()
 
-    for i in range(0, len(titles), BATCH_SIZE):
-        batch = titles[i : i + BATCH_SIZE]
-        try:
-            data = fetch_langlinks(batch)
-        except Exception:
+    for title in titles:
+        entry = cache.entries.get(title)
+        # missing pages have no touched timestamp
+        if not entry or not entry["touched"] or entry["page"] in matched_pages:
+            continue
+        key = normalize_name(entry["page"])
+        uri = label_to_uri.get(key)
+        if not uri:
             continue
 
-        pages = data.get("query", {}).get("pages", {})
-        for page in pages.values():
-            title = page.get("title")
-            if not title:
-                continue
-            key = normalize_label(title)
-            uri = label_to_uri.get(key)
-            if not uri:
-                continue
-
-            total_pages += 1
-            for link in page.get("langlinks", []):
-                lang = link.get("lang")
-                value = link.get("*")
-                if not lang or not value:
-                    continue
-                languages.add(lang)
-                out.add((uri, RDFS.label, Literal(value, lang=lang)))
-                total_labels += 1
-
-        time.sleep(REQUEST_DELAY_SEC)
+        matched_pages.add(entry["page"])
+        for lang, value in entry["langlinks"]:
+            languages.add(lang)
+            out.add((uri, RDFS.label, Literal(value, lang=lang)))
+            total_labels += 1
 
-    out.serialize(destination=OUTPUT_TTL, format="turtle")
+    save_graph(out, OUTPUT_TTL)
     print(f"OK. Labels written: {OUTPUT_TTL}")
-    print(f"  - Entities matched: {total_pages}")
+    print(f"  - Entities matched: {len(matched_pages)}")
     print(f"  - Labels added: {total_labels}")
     print(f"  - Languages: {', '.join(sorted(languages))}")
+    if failed:
+        print(f"  - Titles not fetched (retried next run): {failed}")
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,88 @@
+"""
+Label index and name matcher shared by the enrichment scripts.
+Names are normalized (lowercase, "_" as space, only letters/digits/spaces,
+collapsed whitespace) with one str.translate call over a lazily filled
+translation table. The index is built from schema:name and rdfs:label
+triples only, and LabelMatcher resolves whole batches of names (card names,
+CSV rows, API titles) normalizing each distinct string once.
+"""
+
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDFS
+
+SCHEMA = Namespace("http://schema.org/")
+LABEL_PREDICATES = (SCHEMA.name, RDFS.label)
+
+
+class _NormalizeTable(dict):
+    """str.translate table: keeps letters, digits and whitespace, maps "_" to a space, drops the rest."""
+
+    def __missing__(self, codepoint):
+        ch = chr(codepoint)
+        if ch == "_":
+            value = " "
+        elif ch.isalnum() or ch.isspace():
+            value = ch
+        else:
+            value = None
+        self[codepoint] = value
+        return value
+
+
+_TABLE = _NormalizeTable()
+
+
+def normalize_name(value: str) -> str:
+    return " ".join((value or "").lower().translate(_TABLE).split())
+
+
+def build_label_index(graph: Graph, predicates=LABEL_PREDICATES) -> dict:
+    """{normalized label: set of subjects} from the literal objects of the label predicates."""
+    labels = {}
+    for predicate in predicates:
+        for s, _p, o in graph.triples((None, predicate, None)):
+            if not isinstance(o, Literal):
+                continue
+            key = normalize_name(str(o))
+            if key:
+                labels.setdefault(key, set()).add(s)
+    return labels
+
+
+def unique_labels(labels: dict) -> dict:
+    """{normalized label: subject} for the labels that name exactly one subject."""
+    return {key: next(iter(uris)) for key, uris in labels.items() if len(uris) == 1}
+
+
+class LabelMatcher:
+    """Resolves names to indexed subjects; every distinct name is normalized once."""
+
+    def __init__(self, labels: dict):
+        self.labels = labels
+        self._keys = {}
+
+    def key(self, name: str) -> str:
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = normalize_name(name)
+        return key
+
+    def find(self, name: str):
+        """Subject whose label normalizes like `name` (the smallest IRI if several), or None."""
+        key = self.key(name)
+        if not key:
+            return None
+        uris = self.labels.get(key)
+        if not uris:
+            return None
+        return min(uris)
+
+    def match_many(self, names) -> dict:
+        """{name: subject} for every name of the batch that matches an indexed label."""
+        matches = {}
+        for name in set(names):
+            if name:
+                uri = self.find(name)
+                if uri is not None:
+                    matches[name] = uri
+        return matches
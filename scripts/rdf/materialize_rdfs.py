@@ -0,0 +1,143 @@
+"""
+RDFS closure of the Tolkien KG, computed once per build.
+Combines data/rdf/kg_full.ttl with data/rdf/tolkien-kg-ontology.ttl and applies
+the RDFS rules rdfs2/3 (domain, range), rdfs5/7 (subPropertyOf) and rdfs9/11
+(subClassOf) with a semi-naive fixpoint: each round only joins the triples
+derived in the previous round. Writes the derived triples (not the inputs) to
+data/rdf/kg_inferred.nt, whose first line records the hashes of both inputs.
+
+Ranges that are datatypes (xsd:*, rdfs:Literal) are not used to type IRIs, and
+axiomatic triples (everything is an rdfs:Resource, ...) are left out.
+validate_final.py loads the inferred triples next to the data and skips
+pyshacl's own RDFS inference while the file is current; load it into Fuseki
+next to kg_full.ttl for subclass-aware type queries.
+"""
+
+import os
+from collections import defaultdict
+
+from rdflib import Graph, Literal, RDF, RDFS
+from rdflib.namespace import XSD
+
+from graph_cache import load_graph
+from graph_snapshot import file_sha256
+from rdf_stream import iter_ntriples, ntriples_line
+
+DATA_FILE = "data/rdf/kg_full.ttl"
+ONTOLOGY_FILE = "data/rdf/tolkien-kg-ontology.ttl"
+OUTPUT_FILE = "data/rdf/kg_inferred.nt"
+
+
+def _transitive(pairs) -> dict:
+    """{x: every y reachable from x} for a relation given as (x, y) pairs."""
+    direct = defaultdict(set)
+    for x, y in pairs:
+        direct[x].add(y)
+    closure = {}
+    for start in direct:
+        reached = set()
+        frontier = list(direct[start])
+        while frontier:
+            node = frontier.pop()
+            if node in reached:
+                continue
+            reached.add(node)
+            frontier.extend(direct.get(node, ()))
+        reached.discard(start)
+        closure[start] = reached
+    return closure
+
+
+def _is_datatype(cls) -> bool:
+    return isinstance(cls, Literal) or str(cls).startswith(str(XSD)) or cls == RDFS.Literal
+
+
+def rdfs_closure(data: Graph, ontology: Graph) -> set:
+    """Triples entailed by data + ontology under the RDFS rules above, minus the input triples."""
+    graphs = (data, ontology)
+    sub_class = _transitive((s, o) for g in graphs for s, _p, o in g.triples((None, RDFS.subClassOf, None)))
+    sub_prop = _transitive((s, o) for g in graphs for s, _p, o in g.triples((None, RDFS.subPropertyOf, None)))
+    domains = defaultdict(set)
+    ranges = defaultdict(set)
+    for g in graphs:
+        for prop, _p, cls in g.triples((None, RDFS.domain, None)):
+            domains[prop].add(cls)
+        for prop, _p, cls in g.triples((None, RDFS.range, None)):
+            if not _is_datatype(cls):
+                ranges[prop].add(cls)
+
+    def known(triple) -> bool:
+        return triple in inferred or triple in data or triple in ontology
+
+    inferred = set()
+    # rdfs5 / rdfs11: the schema closures themselves
+    for relation, closure in ((RDFS.subClassOf, sub_class), (RDFS.subPropertyOf, sub_prop)):
+        for x, supers in closure.items():
+            for y in supers:
+                triple = (x, relation, y)
+                if not known(triple):
+                    inferred.add(triple)
+
+    delta = list(data) + list(ontology)
+    while delta:
+        derived = set()
+        for s, p, o in delta:
+            candidates = []
+            for q in sub_prop.get(p, ()):                      # rdfs7
+                candidates.append((s, q, o))
+            for cls in domains.get(p, ()):                     # rdfs2
+                candidates.append((s, RDF.type, cls))
+            if not isinstance(o, Literal):
+                for cls in ranges.get(p, ()):                  # rdfs3
+                    candidates.append((o, RDF.type, cls))
+            if p == RDF.type:
+                for cls in sub_class.get(o, ()):               # rdfs9
+                    candidates.append((s, RDF.type, cls))
+            for triple in candidates:
+                if triple not in derived and not known(triple):
+                    derived.add(triple)
+        inferred |= derived
+        delta = derived
+    return inferred
+
+
+def _header(data_path: str, ontology_path: str) -> str:
+    return (
+        f"# rdfs closure of {os.path.basename(data_path)} {file_sha256(data_path)}"
+        f" {os.path.basename(ontology_path)} {file_sha256(ontology_path)}\n"
+    )
+
+
+def write_inferred(triples, path: str = OUTPUT_FILE, data_path: str = DATA_FILE, ontology_path: str = ONTOLOGY_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(_header(data_path, ontology_path))
+        f.writelines(sorted(ntriples_line(t) for t in triples))
+    os.replace(tmp_path, path)
+
+
+def load_inferred(path: str = OUTPUT_FILE, data_path: str = DATA_FILE, ontology_path: str = ONTOLOGY_FILE):
+    """Graph of the inferred triples, or None if the file is missing or older than its inputs."""
+    if not (os.path.exists(path) and os.path.exists(data_path) and os.path.exists(ontology_path)):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline() != _header(data_path, ontology_path):
+            return None
+    graph = Graph()
+    graph.addN((s, p, o, graph) for s, p, o in iter_ntriples(path))
+    return graph
+
+
+def main():
+    data = load_graph(DATA_FILE)
+    ontology = load_graph(ONTOLOGY_FILE)
+    inferred = rdfs_closure(data, ontology)
+    write_inferred(inferred)
+    types = sum(1 for _s, p, _o in inferred if p == RDF.type)
+    print(f"OK. Inferred triples written: {OUTPUT_FILE} ({len(inferred)} triples)")
+    print(f"  - rdf:type: {types}")
+    print(f"  - Other: {len(inferred) - types}")
+
+
+if __name__ == "__main__":
+    main()
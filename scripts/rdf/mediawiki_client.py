@@ -0,0 +1,189 @@
+"""
+MediaWiki API client shared by the crawler (scripts/run_once/ApiRequestData)
+and the enrichment scripts.
+Async calls run requests.get in worker threads over one pooled Session: a
+semaphore bounds the requests in flight and every call goes through a token
+bucket limiting the sustained rate. Requests carry MediaWiki's `maxlag`; a
+`maxlag` error, HTTP 429 or 503 pauses the whole bucket for `Retry-After`
+seconds (or an exponential backoff), and failed or non-JSON responses are
+retried up to `max_retries` times.
+
+Also holds the list=recentchanges helpers used by the incremental runs.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:132.0) Gecko/20100101 Firefox/132.0"
+
+CONCURRENCY = 4
+RATE_PER_SEC = 3.0
+BURST = 4
+MAXLAG = 5
+MAX_RETRIES = 5
+REQUEST_TIMEOUT = 30
+RC_MAX_AGE_DAYS = 30  # Conservative bound on the wiki's recentchanges retention ($wgRCMaxAge)
+
+
+class TokenBucket:
+    """Async token bucket; `pause()` blocks every caller until a deadline."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(resp, default: float) -> float:
+    value = resp.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class MediaWikiClient:
+    """Rate-limited async wrapper around a pooled requests.Session."""
+
+    def __init__(self, api_url: str, concurrency=CONCURRENCY, rate=RATE_PER_SEC, burst=BURST,
+                 maxlag=MAXLAG, max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT, user_agent=USER_AGENT):
+        self.api_url = api_url
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.requests_sent = 0
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    async def get(self, params: dict):
+        """GET the API with `params`; returns the decoded JSON or None after retries."""
+        params = {**params, "format": "json", "maxlag": self.maxlag}
+        for attempt in range(self.max_retries):
+            backoff = 2 ** attempt
+            await self.bucket.acquire()
+            async with self.semaphore:
+                self.requests_sent += 1
+                try:
+                    resp = await asyncio.to_thread(
+                        self.session.get, self.api_url, params=params, timeout=self.timeout
+                    )
+                except requests.RequestException as e:
+                    print(f"Request failed ({e}), retrying in {backoff}s")
+                    await asyncio.sleep(backoff)
+                    continue
+
+            if resp.status_code in (429, 503):
+                self.bucket.pause(_retry_after(resp, backoff))
+                continue
+            if resp.status_code != 200:
+                print(f"HTTP error: {resp.status_code}\nResponse text: {resp.text[:500]}")
+                return None
+
+            try:
+                data = resp.json()
+            except ValueError:
+                print(f"Invalid JSON response ({resp.text[:100]!r}), retrying in {backoff}s")
+                await asyncio.sleep(backoff)
+                continue
+            if data.get("error", {}).get("code") == "maxlag":
+                delay = _retry_after(resp, backoff)
+                print(f"Server lagged, pausing {delay:.0f}s")
+                self.bucket.pause(delay)
+                continue
+            return data
+
+        print(f"Giving up after {self.max_retries} attempts: {params.get('action')} {params.get('page', '')}")
+        return None
+
+    async def list_all(self, params: dict, list_key: str) -> list[str]:
+        """Follow `continue` tokens of a list= query and collect page titles."""
+        titles = []
+        cont = {}
+        while True:
+            data = await self.get({**params, **cont})
+            if not data or list_key not in data.get("query", {}):
+                if data:
+                    print("Unexpected response structure:", data)
+                break
+            titles.extend(p["title"] for p in data["query"][list_key])
+            if "continue" not in data:
+                break
+            cont = data["continue"]
+        return titles
+
+    async def query_all(self, params: dict):
+        """Async generator over every response of a query, following `continue` tokens."""
+        cont = {}
+        while True:
+            data = await self.get({**params, **cont})
+            if data is None:
+                return
+            yield data
+            if "continue" not in data:
+                return
+            cont = data["continue"]
+
+
+def utc_timestamp(dt=None):
+    """MediaWiki timestamp format (ISO 8601, UTC, second precision)."""
+    return (dt or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def recent_changes_usable(manifest, now=None):
+    """True when every edit since the last run is still listed by list=recentchanges."""
+    last_run = manifest.get("last_run")
+    if not last_run:
+        return False
+    last = datetime.strptime(last_run, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return (now or datetime.now(timezone.utc)) - last < timedelta(days=RC_MAX_AGE_DAYS)
+
+
+def recentchanges_params(since):
+    return {
+        "action": "query",
+        "list": "recentchanges",
+        "rcstart": since,
+        "rcdir": "newer",
+        "rcnamespace": 0,
+        "rctype": "edit|new",
+        "rcprop": "title|ids|timestamp",
+        "rclimit": 500,
+        "format": "json",
+    }
+
+
+def collect_recent_changes(data, changed):
+    for change in data.get("query", {}).get("recentchanges", []):
+        changed.add(change["title"])
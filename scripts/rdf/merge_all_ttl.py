@@ -1,37 +1,31 @@
 """
 Merge pipeline outputs into the final Tolkien KG TTL.
-Loads language-enriched infobox triples and external links, merges them,
-normalizes schema prefix quirks, and writes data/rdf/kg_full.ttl for Fuseki.
+Streams language-enriched infobox triples and external links, drops duplicate
+triples, and writes data/rdf/kg_full.ttl for Fuseki as N-Triples lines (valid
+Turtle, so no schema prefix quirks), plus its binary snapshot
+data/rdf/kg_full.kgsnap for fast loading. Memory stays flat as sources are added.
 """
 
-from rdflib import Graph
+from graph_snapshot import snapshot_path, write_snapshot
+from rdf_stream import iter_ntriples, merge_files
 
 INPUTS = [
     "data/rdf/all_infoboxes_with_lang.ttl",
     "data/rdf/external_links.ttl",
 ]
 OUTPUT = "data/rdf/kg_full.ttl"
+SNAPSHOT = snapshot_path(OUTPUT)
+# "hash": keep input order, remember a 16-byte fingerprint per triple
+# "sort": external sort in bounded memory, sorted output
+DEDUPE = "hash"
 
 
 def main():
-    merged = Graph()
-    for path in INPUTS:
-        merged.parse(path, format="turtle")
-    merged.serialize(destination=OUTPUT, format="turtle")
-    try:
-        with open(OUTPUT, "r", encoding="utf-8") as f:
-            content = f.read()
-        if "@prefix schema1:" in content:
-            content = content.replace("@prefix schema1:", "@prefix schema:")
-            content = content.replace("schema1:", "schema:")
-            with open(OUTPUT, "w", encoding="utf-8") as f:
-                f.write(content)
-    except Exception:
-        pass
-    print(f"OK. Merged TTL written: {OUTPUT}")
+    written, namespaces = merge_files(INPUTS, OUTPUT, dedupe=DEDUPE)
+    write_snapshot(iter_ntriples(OUTPUT), SNAPSHOT, namespaces=namespaces, source=OUTPUT)
+    print(f"OK. Merged TTL written: {OUTPUT} ({written} triples)")
+    print(f"OK. Snapshot written: {SNAPSHOT}")
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -3,59 +3,114 @@ Merge multilingual labels into the Tolkien KG and ensure English fallbacks.
 Combines base infobox triples with fetched langlink labels, adds missing
 `rdfs:label@en` using schema:name or existing untagged labels, and writes
 data/rdf/all_infoboxes_with_lang.ttl for downstream merging.
+
+Single streaming pass: the triples of both inputs are written out as N-Triples
+lines (valid Turtle, duplicates dropped) while the subjects with an English
+label and the first fallback candidate of the others are recorded; only the
+missing @en labels are appended at the end. No graph of the KG is built.
+Label coverage per language is printed and written to data/rdf/label_coverage.csv.
 """
 
-from rdflib import Graph, Literal
+import csv
+import os
+from collections import defaultdict
+
+from rdflib import Literal, Namespace
 from rdflib.namespace import RDFS
-from rdflib import Namespace
+
+from rdf_stream import HashDeduper, ntriples_line, stream_triples
 
 SCHEMA = Namespace("http://schema.org/")
 
 INPUT_TTL = "data/rdf/all_infoboxes.ttl"
 LABELS_TTL = "data/rdf/multilang_labels.ttl"
 OUTPUT_TTL = "data/rdf/all_infoboxes_with_lang.ttl"
+COVERAGE_CSV = "data/rdf/label_coverage.csv"
 
+NO_LANGUAGE = "(none)"
 
-def has_en_label(graph: Graph, subject) -> bool:
-    for _, _, o in graph.triples((subject, RDFS.label, None)):
-        if isinstance(o, Literal) and o.language == "en":
-            return True
-    return False
-
-
-def main():
-    kg = Graph()
-    kg.parse(INPUT_TTL, format="turtle")
-
-    labels = Graph()
-    labels.parse(LABELS_TTL, format="turtle")
 
-    for triple in labels:
-        kg.add(triple)
+class LabelCensus:
+    """Per-subject label facts gathered while the triples stream by."""
 
-    en_labels = {s for s, _, o in kg.triples((None, RDFS.label, None)) if isinstance(o, Literal) and o.language == "en"}
+    def __init__(self):
+        self.en_subjects = set()
+        self.names = {}
+        self.untagged = {}
+        self.languages = defaultdict(set)
 
-    for s, _, o in kg.triples((None, SCHEMA.name, None)):
+    def __call__(self, triple):
+        s, p, o = triple
         if not isinstance(o, Literal):
-            continue
-        if s in en_labels:
-            continue
-        kg.add((s, RDFS.label, Literal(str(o), lang="en")))
-        en_labels.add(s)
+            return
+        if p == RDFS.label:
+            lang = o.language
+            self.languages[lang or NO_LANGUAGE].add(s)
+            if lang == "en":
+                self.en_subjects.add(s)
+            elif not lang:
+                self.untagged.setdefault(s, str(o))
+        elif p == SCHEMA.name:
+            self.names.setdefault(s, str(o))
+
+    def fallbacks(self) -> dict:
+        """{subject: English label} from schema:name, else from an untagged label, for subjects without @en."""
+        fallback = {}
+        for candidates in (self.names, self.untagged):
+            for s, value in candidates.items():
+                if s not in self.en_subjects and s not in fallback:
+                    fallback[s] = value
+        return fallback
+
+    def coverage(self, fallback: dict) -> list:
+        """[(language, labelled subjects, share of all labelled subjects)], most covered first."""
+        subjects = set(self.names).union(*self.languages.values())
+        counts = {lang: len(found) for lang, found in self.languages.items()}
+        counts["en"] = len(self.en_subjects) + len(fallback)
+        total = len(subjects) or 1
+        return sorted(((lang, n, n / total) for lang, n in counts.items()), key=lambda row: (-row[1], row[0]))
+
+
+def write_coverage(rows: list, path: str = COVERAGE_CSV):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["language", "subjects", "coverage"])
+        for lang, n, share in rows:
+            writer.writerow([lang, n, f"{share:.4f}"])
 
-    for s, _, o in kg.triples((None, RDFS.label, None)):
-        if not isinstance(o, Literal) or o.language:
-            continue
-        if s in en_labels:
-            continue
-        kg.add((s, RDFS.label, Literal(str(o), lang="en")))
-        en_labels.add(s)
 
-    kg.serialize(destination=OUTPUT_TTL, format="turtle")
-    print(f"OK. Merged KG written: {OUTPUT_TTL}")
+def main():
+    census = LabelCensus()
+    is_new = HashDeduper()
+    written = 0
+
+    tmp_output = f"{OUTPUT_TTL}.tmp"
+    with open(tmp_output, "w", encoding="utf-8", newline="\n") as out:
+        def emit(triple):
+            nonlocal written
+            census(triple)
+            line = ntriples_line(triple)
+            if is_new(line):
+                out.write(line)
+                written += 1
+
+        for path in (INPUT_TTL, LABELS_TTL):
+            stream_triples(path, emit)
+
+        fallback = census.fallbacks()
+        for s, value in fallback.items():
+            out.write(ntriples_line((s, RDFS.label, Literal(value, lang="en"))))
+    os.replace(tmp_output, OUTPUT_TTL)
+
+    rows = census.coverage(fallback)
+    write_coverage(rows)
+
+    print(f"OK. Merged KG written: {OUTPUT_TTL} ({written + len(fallback)} triples)")
+    print(f"  - English fallback labels: {len(fallback)}")
+    print(f"OK. Label coverage ({COVERAGE_CSV}):")
+    for lang, n, share in rows:
+        print(f"  {lang:<8} {n:>6}  {100 * share:5.1f}%")
 
 
 if __name__ == "__main__":
     main()
-
-
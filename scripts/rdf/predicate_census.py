@@ -0,0 +1,142 @@
+"""
+Streaming predicate census of an RDF file.
+Reads N-Triples line by line with a plain tokenizer (no rdflib terms), or
+Turtle through the streaming parser of rdf_stream, and keeps one small record
+per distinct predicate: usage count, IRI / literal / blank-node objects,
+literal datatypes and language tags, and a few sample subjects. Memory is
+bounded by the number of predicates, not triples.
+
+Each predicate gets a proposed OWL property kind: ObjectProperty when at least
+OBJECT_RATIO of its objects are IRIs or blank nodes, DatatypeProperty otherwise.
+Used by extend_ontology.py and validate_with_ontology.py.
+
+Usage: python scripts/rdf/predicate_census.py [file] (default: data/rdf/kg_full.ttl)
+"""
+
+import re
+import sys
+from collections import Counter
+
+from rdflib import BNode, Literal
+
+from rdf_stream import stream_triples
+
+DEFAULT_FILE = "data/rdf/kg_full.ttl"
+KG_ONT = "http://tolkien-kg.org/ontology/"
+OBJECT_RATIO = 0.9
+SAMPLE_SIZE = 3
+
+_NT_LINE_RE = re.compile(r"^\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(.*?)\s*\.\s*$")
+_LITERAL_TAIL_RE = re.compile(r'"(?:\^\^<([^>]*)>|@([A-Za-z0-9-]+))?$')
+_XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+
+
+class _NotNTriples(Exception):
+    pass
+
+
+class PredicateStats:
+    __slots__ = ("count", "iris", "literals", "bnodes", "datatypes", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.iris = 0
+        self.literals = 0
+        self.bnodes = 0
+        self.datatypes = Counter()
+        self.samples = []
+
+    def add(self, subject: str, kind: str, datatype: str = None):
+        self.count += 1
+        if kind == "iri":
+            self.iris += 1
+        elif kind == "bnode":
+            self.bnodes += 1
+        else:
+            self.literals += 1
+            self.datatypes[datatype or _XSD_STRING] += 1
+        if len(self.samples) < SAMPLE_SIZE and subject not in self.samples:
+            self.samples.append(subject)
+
+    @property
+    def literal_ratio(self) -> float:
+        return self.literals / self.count if self.count else 0.0
+
+    @property
+    def proposed_kind(self) -> str:
+        resources = self.iris + self.bnodes
+        return "ObjectProperty" if self.count and resources / self.count >= OBJECT_RATIO else "DatatypeProperty"
+
+
+def _census_ntriples(path: str, stats: dict):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            match = _NT_LINE_RE.match(line)
+            if not match:
+                raise _NotNTriples(line)
+            subject, predicate, obj = match.groups()
+            record = stats.get(predicate)
+            if record is None:
+                record = stats[predicate] = PredicateStats()
+            subject = subject[1:-1] if subject.startswith("<") else subject
+            if obj.startswith("<"):
+                record.add(subject, "iri")
+            elif obj.startswith("_:"):
+                record.add(subject, "bnode")
+            else:
+                tail = _LITERAL_TAIL_RE.search(obj)
+                if tail is None:
+                    raise _NotNTriples(line)
+                datatype, lang = tail.groups()
+                record.add(subject, "literal", f"@{lang}" if lang else datatype)
+
+
+def _census_triples(path: str, stats: dict):
+    def emit(triple):
+        s, p, o = triple
+        record = stats.get(str(p))
+        if record is None:
+            record = stats[str(p)] = PredicateStats()
+        if isinstance(o, Literal):
+            record.add(str(s), "literal", f"@{o.language}" if o.language else (str(o.datatype) if o.datatype else None))
+        else:
+            record.add(str(s), "bnode" if isinstance(o, BNode) else "iri")
+
+    stream_triples(path, emit, format="turtle" if not str(path).endswith(".nt") else "nt")
+
+
+def predicate_census(path: str) -> dict:
+    """{predicate IRI: PredicateStats} for every predicate used in the file."""
+    stats = {}
+    try:
+        _census_ntriples(path, stats)
+    except _NotNTriples:
+        stats = {}
+        _census_triples(path, stats)
+    return stats
+
+
+def kg_properties(stats: dict) -> set:
+    return {p for p in stats if p.startswith(KG_ONT)}
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    stats = predicate_census(path)
+    total = sum(record.count for record in stats.values())
+    print(f"OK. Predicate census of {path}: {len(stats)} predicates, {total} triples\n")
+    for predicate, record in sorted(stats.items(), key=lambda item: -item[1].count):
+        top = record.datatypes.most_common(1)
+        top_type = top[0][0].rsplit("#", 1)[-1] if top else "-"
+        print(
+            f"  {record.count:>7}  IRI {100 * record.iris / record.count:5.1f}%"
+            f"  literal {100 * record.literal_ratio:5.1f}%  {top_type:<10}"
+            f"  {record.proposed_kind:<16}  {predicate}"
+        )
+        print(f"           e.g. {', '.join(record.samples)}")
+
+
+if __name__ == "__main__":
+    main()
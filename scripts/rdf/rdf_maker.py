@@ -3,48 +3,146 @@ Extract Tolkien Gateway infoboxes into RDF triples.
 Parses wikitext, maps infobox fields to ontology predicates, normalizes IRIs,
 materializes labels for linked resources, and writes data/rdf/all_infoboxes.ttl.
 Also strips noisy markup, handles links vs literals, and fixes schema prefix quirks.
+
+Every build keeps the triples and label assignments of each page in
+PAGE_CACHE, keyed by title with the page's content hash and this script's
+hash. With --changes, only the pages the change set of compare_infoboxes.py
+(data/rdf/infobox_changes.json) adds or modifies are parsed again; removed
+pages drop out, and the other pages are taken from the cache. A cached page
+whose content hash no longer matches is parsed again too (the change set
+is older than the corpus), and a missing cache or change set means a full
+build.
+
+Usage: python scripts/rdf/rdf_maker.py [--changes [FILE]]
 """
 
+import argparse
+import hashlib
+import json
 import os
+import pickle
 import re
 import unicodedata
+from collections import deque
+from functools import lru_cache
 from rdflib import Graph, Literal, Namespace, RDF, URIRef
 from rdflib.namespace import XSD, RDFS
 import wikitextparser as wtp
 
+from graph_cache import save_graph
+from infobox_store import content_hash, iter_infobox_texts
+
 INPUT_DIR = "data/infoboxes"
 OUTPUT_DIR = "data/rdf"
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "all_infoboxes.ttl")
+CHANGESET_FILE = os.path.join(OUTPUT_DIR, "infobox_changes.json")
+PAGE_CACHE = os.path.join(OUTPUT_DIR, ".rdf_maker_pages.pickle")
 
 KGONT = Namespace("http://tolkien-kg.org/ontology/")
 KGRES = Namespace("http://tolkien-kg.org/resource/")
 SCHEMA = Namespace("http://schema.org/")
 
 
+_INFOBOX_PREFIX_RE = re.compile(r"^infobox\s+")
+_INFOBOX_SUFFIX_RE = re.compile(r"\s+infobox$")
+_WHITESPACE_RE = re.compile(r"\s+")
+_MULTI_UNDERSCORE_RE = re.compile(r"_{2,}")
+
+
 def _normalize_template_key(template_name: str) -> str:
     n = (template_name or "").strip().lower()
-    n = re.sub(r"^infobox\s+", "", n)
-    n = re.sub(r"\s+infobox$", "", n)
-    n = re.sub(r"\s+", " ", n)
+    n = _INFOBOX_PREFIX_RE.sub("", n)
+    n = _INFOBOX_SUFFIX_RE.sub("", n)
+    n = _WHITESPACE_RE.sub(" ", n)
     return n
 
 
+_BRACE_PAIR_RE = re.compile(r"(?=(\{\{|\}\}))")
+_TEMPLATE_TOKEN_RE = re.compile(r"<!--.*?-->|\{\{|\}\}|\[\[|\]\]|\||=", re.DOTALL)
+_REF_RE = re.compile(r"<ref[^>]*?/>|<ref[^>]*?>.*?</ref>|</?ref[^>]*?>", re.DOTALL | re.IGNORECASE)
+
+# Markup whose argument splitting rules the fast tokenizer does not reproduce.
+_FAST_PATH_BLOCKERS = ("{{{", "}}}", "<nowiki", "<pre", "<math", "<source", "<syntaxhighlight")
+
+
 def _extract_infobox_block(wikitext: str) -> str | None:
     """Return the raw {{Infobox ...}} block if found (balanced braces)."""
     start = wikitext.lower().find("{{infobox")
     if start == -1:
         return None
     count = 0
-    for i in range(start, len(wikitext)):
-        if wikitext[i : i + 2] == "{{":
+    for m in _BRACE_PAIR_RE.finditer(wikitext, start):
+        if m.group(1) == "{{":
             count += 1
-        elif wikitext[i : i + 2] == "}}":
+        else:
             count -= 1
             if count == 0:
-                return wikitext[start : i + 2]
+                return wikitext[start : m.start() + 2]
     return None
 
 
+def _tokenize_template(block: str):
+    """Split a single ``{{name|key=value|...}}`` block into (name, args).
+
+    Only top-level ``|`` and the first top-level ``=`` of each argument are
+    significant; anything nested in ``{{ }}``, ``[[ ]]`` or an HTML comment is
+    kept verbatim. Positional arguments are numbered from "1" like
+    wikitextparser does. Returns None on input the tokenizer cannot handle
+    faithfully (unbalanced markup, template parameters, nowiki...).
+    """
+    if not (block.startswith("{{") and block.endswith("}}")):
+        return None
+    lowered = block.lower()
+    if any(marker in lowered for marker in _FAST_PATH_BLOCKERS):
+        return None
+
+    segments = []
+    seg_start = 2
+    seg_eq = None
+    braces = 0
+    links = 0
+    for m in _TEMPLATE_TOKEN_RE.finditer(block):
+        tok = m.group()
+        if tok == "{{":
+            braces += 1
+        elif tok == "}}":
+            braces -= 1
+            if braces == 0:
+                if links or m.end() != len(block):
+                    return None
+                segments.append((seg_start, seg_eq, m.start()))
+                break
+        elif tok == "[[":
+            links += 1
+        elif tok == "]]":
+            if links:
+                links -= 1
+        elif braces == 1 and links == 0:
+            if tok == "|":
+                segments.append((seg_start, seg_eq, m.start()))
+                seg_start = m.end()
+                seg_eq = None
+            elif tok == "=" and seg_eq is None:
+                seg_eq = m.start()
+    else:
+        return None
+
+    name_start, _, name_end = segments[0]
+    name = block[name_start:name_end].strip()
+    if not name:
+        return None
+
+    args = {}
+    position = 0
+    for start, eq, end in segments[1:]:
+        if eq is None:
+            position += 1
+            args[str(position)] = block[start:end].strip()
+        else:
+            args[block[start:eq].strip()] = block[eq + 1 : end].strip()
+    return name, args
+
+
 def clean_value(value: str, preserve_timeline: bool = False) -> str:
     v = value or ""
     v = re.sub(r"<ref[^>]*>.*?</ref>", "", v, flags=re.DOTALL | re.IGNORECASE)
@@ -273,19 +371,72 @@ TYPE_MAP = {
 }
 
 
+def _build_automaton(patterns: list[str]):
+    """Compile patterns into an Aho-Corasick automaton (goto, fail, outputs).
+
+    outputs[state] lists the indexes of every pattern ending at that state.
+    """
+    goto = [{}]
+    outputs = [[]]
+    for idx, pattern in enumerate(patterns):
+        state = 0
+        for ch in pattern:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][ch] = nxt
+                goto.append({})
+                outputs.append([])
+            state = nxt
+        outputs[state].append(idx)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+    return goto, fail, outputs
+
+
+def _first_pattern_in(automaton, text: str):
+    """Return the lowest pattern index occurring anywhere in text, or None."""
+    goto, fail, outputs = automaton
+    state = 0
+    best = None
+    for ch in text:
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        for idx in outputs[state]:
+            if best is None or idx < best:
+                best = idx
+    return best
+
+
+_TYPE_KEYS = list(TYPE_MAP)
+_TYPE_AUTOMATON = _build_automaton(_TYPE_KEYS)
+
+
 def normalize_key(key: str) -> str:
     k = key.strip().lower()
     k = k.replace("_", " ")
-    k = re.sub(r"\s+", " ", k)
+    k = _WHITESPACE_RE.sub(" ", k)
     return k
 
 
+@lru_cache(maxsize=65536)
 def sanitize_local(name: str) -> str:
     t = name.strip().replace(" ", "_")
     t = unicodedata.normalize("NFD", t)
     t = "".join(c for c in t if unicodedata.category(c) != "Mn")
     t = "".join(c if c.isalnum() or c in ("_", ".") else "_" for c in t)
-    t = re.sub(r"_{2,}", "_", t).strip("_")
+    t = _MULTI_UNDERSCORE_RE.sub("_", t).strip("_")
     return t or "unknown"
 
 
@@ -293,13 +444,20 @@ def to_res_iri(title: str):
     return KGRES[sanitize_local(title)]
 
 
-def choose_type(template_name: str, data: dict):
+@lru_cache(maxsize=None)
+def _type_for_template(template_name: str):
+    """Template-name part of choose_type: exact key, then first TYPE_MAP key contained in it."""
     key = _normalize_template_key(template_name)
     if key in TYPE_MAP:
         return TYPE_MAP[key]
-    for k, t in TYPE_MAP.items():
-        if k in key:
-            return t
+    idx = _first_pattern_in(_TYPE_AUTOMATON, key)
+    return TYPE_MAP[_TYPE_KEYS[idx]] if idx is not None else None
+
+
+def choose_type(template_name: str, data: dict):
+    rdf_type = _type_for_template(template_name or "")
+    if rdf_type is not None:
+        return rdf_type
     if any(k in data for k in ("gender", "birth", "death", "race", "parentage", "children", "spouse")):
         if any(k in data for k in ("occupation", "born", "died", "education", "website")):
             return SCHEMA.Person
@@ -315,13 +473,8 @@ def choose_type(template_name: str, data: dict):
     return SCHEMA.CreativeWork
 
 
-def parse_infobox_text(text: str):
-    text_cleaned = re.sub(r"<ref[^>]*?/>", "", text, flags=re.IGNORECASE)
-    text_cleaned = re.sub(r"<ref[^>]*?>.*?</ref>", "", text_cleaned, flags=re.DOTALL | re.IGNORECASE)
-    text_cleaned = re.sub(r"</?ref[^>]*?>", "", text_cleaned, flags=re.IGNORECASE)
-
-    block = _extract_infobox_block(text_cleaned) or text_cleaned
-
+def _parse_infobox_wtp(block: str):
+    """Reference parser: build a wikitextparser AST and read the chosen template."""
     parsed = wtp.parse(block)
     chosen_tpl = None
     for tpl in parsed.templates:
@@ -342,6 +495,18 @@ def parse_infobox_text(text: str):
     return name, args
 
 
+def parse_infobox_text(text: str):
+    text_cleaned = _REF_RE.sub("", text)
+
+    block = _extract_infobox_block(text_cleaned)
+    if block is not None:
+        fast = _tokenize_template(block)
+        if fast is not None:
+            return fast
+
+    return _parse_infobox_wtp(block or text_cleaned)
+
+
 def extract_other_names_section(full_text: str):
     """Extract other_names from embedded section after infobox."""
     lines = full_text.split("\n")
@@ -428,6 +593,7 @@ def emit_mixed(graph: Graph, subj, pred, raw: str, keep_literal_if_links: bool =
     return wrote
 
 
+@lru_cache(maxsize=None)
 def map_predicate(key: str):
     norm = normalize_key(key)
     if norm in PROPERTY_MAP:
@@ -448,7 +614,89 @@ def materialize_resources(graph: Graph, main_subjects: set, resource_labels: dic
         graph.add((iri, RDFS.label, Literal(label, datatype=XSD.string)))
 
 
-def main():
+class _Triples(list):
+    """Triple list standing in for a Graph in the emit_* helpers."""
+    add = list.append
+
+
+def page_fragment(full_text: str):
+    """
+    (entity, triples, labels) of one infobox record; labels are the
+    (iri, label, is_subject) assignments in emission order, replayed by main().
+    """
+    lines = full_text.split("\n")
+    entity = lines[0].replace("---", "").strip()
+    infobox_text = "\n".join(lines[1:])
+    tpl_name, data = parse_infobox_text(infobox_text)
+    subj = to_res_iri(entity)
+    triples = _Triples()
+    triples.add((subj, RDF.type, choose_type(tpl_name, data)))
+
+    resource_labels = {}
+    name_val = data.get("name") or entity
+    emit_literal(triples, subj, SCHEMA.name, name_val)
+
+    for key, raw_val in data.items():
+        if not raw_val or key == "name":
+            continue
+        pred = map_predicate(key)
+        if pred is None:
+            continue
+        is_other = pred == KGONT.other_names
+
+        if is_other and ("see below" in raw_val.lower() or "see [[" in raw_val.lower()):
+            extracted = extract_other_names_section(full_text)
+            if extracted:
+                for other_name in extracted:
+                    emit_literal(triples, subj, pred, other_name)
+                continue
+
+        keep_literal = is_other
+        emit_mixed(triples, subj, pred, raw_val, keep_literal_if_links=keep_literal, resource_labels=resource_labels)
+
+    labels = [(subj, entity, True)] + [(iri, label, False) for iri, label in resource_labels.items() if iri != subj]
+    return entity, list(triples), labels
+
+
+def script_hash() -> str:
+    with open(__file__, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_page_cache(path: str = PAGE_CACHE) -> dict:
+    """{title: (sha1, triples, labels)} of the last build of this script version; {} otherwise."""
+    try:
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+    return cache["pages"] if cache.get("script") == script_hash() else {}
+
+
+def save_page_cache(pages: dict, path: str = PAGE_CACHE):
+    with open(f"{path}.tmp", "wb") as f:
+        pickle.dump({"script": script_hash(), "pages": pages}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_changes(path: str = CHANGESET_FILE):
+    """(titles to rebuild, removed titles) of a compare_infoboxes.py change set, None without one."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            change_set = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return set(change_set["added"]) | set(change_set["modified"]), set(change_set["removed"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract the infoboxes into all_infoboxes.ttl.")
+    parser.add_argument(
+        "--changes", nargs="?", const=CHANGESET_FILE, default=None,
+        help=f"rebuild only the pages of this change set, the others from the page cache (default {CHANGESET_FILE})",
+    )
+    args = parser.parse_args(argv)
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     g = Graph()
     g.bind("kg-ont", KGONT, override=True)
@@ -456,64 +704,56 @@ def main():
     g.bind("rdfs", RDFS, override=True)
     g.bind("schema", SCHEMA, override=True)
 
+    cached, rebuild, removed = {}, set(), set()
+    if args.changes:
+        changes = load_changes(args.changes)
+        cached = load_page_cache(PAGE_CACHE) if changes else {}
+        if changes is None:
+            print(f"No change set ({args.changes}): full build")
+        elif not cached:
+            print(f"No page cache for this rdf_maker.py ({PAGE_CACHE}): full build")
+        else:
+            rebuild, removed = changes
+
     resource_labels = {}
     main_subjects = set()
+    pages = {}
+    reused = stale = 0
 
-    for fname in os.listdir(INPUT_DIR):
-        if not (fname.startswith("infobox_") and fname.endswith(".txt")):
-            continue
-        with open(os.path.join(INPUT_DIR, fname), encoding="utf-8") as f:
-            full_text = f.read()
+    for _key, full_text in iter_infobox_texts(INPUT_DIR):
         if not full_text:
             continue
-        lines = full_text.split("\n")
-        entity = lines[0].replace("---", "").strip()
-        infobox_text = "\n".join(lines[1:])
-        tpl_name, data = parse_infobox_text(infobox_text)
-        subj = to_res_iri(entity)
-        rdf_type = choose_type(tpl_name, data)
-        g.add((subj, RDF.type, rdf_type))
-
-        main_subjects.add(subj)
-        resource_labels[subj] = entity
-
-        name_val = data.get("name") or entity
-        emit_literal(g, subj, SCHEMA.name, name_val)
-
-        for key, raw_val in data.items():
-            if not raw_val or key == "name":
-                continue
-            pred = map_predicate(key)
-            if pred is None:
-                continue
-            is_other = pred == KGONT.other_names
-
-            if is_other and ("see below" in raw_val.lower() or "see [[" in raw_val.lower()):
-                extracted = extract_other_names_section(full_text)
-                if extracted:
-                    for other_name in extracted:
-                        emit_literal(g, subj, pred, other_name)
-                    continue
-
-            keep_literal = is_other
-            emit_mixed(g, subj, pred, raw_val, keep_literal_if_links=keep_literal, resource_labels=resource_labels)
+        sha1 = content_hash(full_text)
+        title = full_text.split("\n", 1)[0].replace("---", "").strip()
+        entry = cached.get(title)
+        if entry is not None and title not in rebuild and entry[0] == sha1:
+            entity, (_sha1, triples, labels) = title, entry
+            reused += 1
+        else:
+            if entry is not None and title not in rebuild:
+                stale += 1
+            entity, triples, labels = page_fragment(full_text)
+        pages[entity] = (sha1, triples, labels)
+
+        for triple in triples:
+            g.add(triple)
+        main_subjects.add(labels[0][0])
+        for iri, label, is_subject in labels:
+            if is_subject or iri not in resource_labels:
+                resource_labels[iri] = label
 
     materialize_resources(g, main_subjects, resource_labels)
 
-    g.serialize(destination=OUTPUT_FILE, format="turtle")
-
-    with open(OUTPUT_FILE, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    if "@prefix schema1:" in content:
-        content = content.replace("@prefix schema1:", "@prefix schema:")
-        content = content.replace("schema1:", "schema:")
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(content)
+    save_graph(g, OUTPUT_FILE)
+    save_page_cache(pages, PAGE_CACHE)
     print(f"OK. RDF generated: {OUTPUT_FILE} ({len(g)} triples)")
     print(f"    - Main subjects: {len(main_subjects)}")
     print(f"    - Materialized resources: {len(resource_labels)}")
+    if cached:
+        print(f"    - Pages from the cache: {reused}, parsed: {len(pages) - reused} "
+              f"({len(rebuild)} added or modified, {len(removed)} removed in the change set)")
+        if stale:
+            print(f"    - {stale} pages changed without being in the change set (parsed again)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+"""
+Streaming RDF helpers for merging large files with flat memory.
+Parsers push each triple to a callback instead of building a Graph, triples are
+written as N-Triples lines (which are also valid Turtle), and duplicates are
+dropped either with a set of 128-bit line fingerprints or with an external
+sort (sorted runs spilled to temporary files, then a k-way merge).
+"""
+
+import hashlib
+import heapq
+import os
+import tempfile
+
+from rdflib import Graph
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.plugins.serializers.nt import _nt_row
+
+import graph_cache
+
+CHUNK_LINES = 200_000
+
+
+class _TripleSink(Graph):
+    """Graph that forwards every parsed triple to a callback instead of storing it."""
+
+    def __init__(self, emit):
+        super().__init__()
+        self._emit = emit
+
+    def add(self, triple):
+        self._emit(triple)
+        return self
+
+
+class _ListSink:
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+def guess_format(path) -> str:
+    return "nt" if str(path).endswith(".nt") else "turtle"
+
+
+def stream_triples(path, emit, format: str = None) -> list:
+    """
+    Call emit(triple) for every triple of a file and return its prefix bindings.
+    A graph already held by graph_cache is replayed instead of re-parsing the file.
+    """
+    graph = graph_cache.cached_graph(path)
+    if graph is not None:
+        for triple in graph:
+            emit(triple)
+        return list(graph.namespaces())
+    sink = _TripleSink(emit)
+    sink.parse(str(path), format=format or guess_format(path))
+    return list(sink.namespaces())
+
+
+def parse_ntriples_lines(lines):
+    """Yield the triples of an iterable of N-Triples lines."""
+    sink = _ListSink()
+    parser = W3CNTriplesParser(sink)
+    for line in lines:
+        parser.line = line.rstrip("\r\n")
+        parser.parseline()
+        if sink.triples:
+            yield from sink.triples
+            sink.triples.clear()
+
+
+def iter_ntriples(path):
+    """Yield the triples of an N-Triples file one line at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        yield from parse_ntriples_lines(f)
+
+
+def ntriples_line(triple) -> str:
+    return _nt_row(triple)
+
+
+class HashDeduper:
+    """Remembers 128-bit fingerprints of the lines seen so far."""
+
+    def __init__(self):
+        self.seen = set()
+
+    def __call__(self, line: str) -> bool:
+        key = hashlib.blake2b(line.encode("utf-8"), digest_size=16).digest()
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+
+class ExternalSorter:
+    """Sorts lines in runs of chunk_lines spilled to disk; iterating yields each distinct line once, sorted."""
+
+    def __init__(self, chunk_lines: int = CHUNK_LINES, tmp_dir: str = None):
+        self.chunk_lines = chunk_lines
+        self.tmp_dir = tmp_dir
+        self.chunk = []
+        self.runs = []
+
+    def add(self, line: str):
+        self.chunk.append(line)
+        if len(self.chunk) >= self.chunk_lines:
+            self._spill()
+
+    def _spill(self):
+        if not self.chunk:
+            return
+        fd, path = tempfile.mkstemp(prefix="merge_run_", suffix=".nt", dir=self.tmp_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(sorted(set(self.chunk)))
+        self.runs.append(path)
+        self.chunk = []
+
+    def __iter__(self):
+        self._spill()
+        files = [open(path, "r", encoding="utf-8") for path in self.runs]
+        try:
+            previous = None
+            for line in heapq.merge(*files):
+                if line != previous:
+                    yield line
+                    previous = line
+        finally:
+            for f in files:
+                f.close()
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+
+
+def merge_files(inputs, output, dedupe: str = "hash", chunk_lines: int = CHUNK_LINES) -> tuple:
+    """
+    Union RDF files into one N-Triples file without building a merged graph.
+    dedupe="hash" keeps input order; dedupe="sort" writes sorted output in bounded memory.
+    Returns (triples written, prefix bindings seen in the inputs).
+    """
+    tmp_output = f"{output}.tmp"
+    namespaces = {}
+    written = 0
+    with open(tmp_output, "w", encoding="utf-8", newline="\n") as out:
+        if dedupe == "sort":
+            sorter = ExternalSorter(chunk_lines, tmp_dir=os.path.dirname(os.path.abspath(output)))
+            for path in inputs:
+                for prefix, ns in stream_triples(path, lambda t: sorter.add(ntriples_line(t))):
+                    namespaces.setdefault(prefix, ns)
+            for line in sorter:
+                out.write(line)
+                written += 1
+        elif dedupe == "hash":
+            is_new = HashDeduper()
+
+            def emit(triple):
+                nonlocal written
+                line = ntriples_line(triple)
+                if is_new(line):
+                    out.write(line)
+                    written += 1
+
+            for path in inputs:
+                for prefix, ns in stream_triples(path, emit):
+                    namespaces.setdefault(prefix, ns)
+        else:
+            raise ValueError(f"Unknown dedupe method: {dedupe}")
+    os.replace(tmp_output, output)
+    return written, list(namespaces.items())
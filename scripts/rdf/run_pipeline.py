@@ -0,0 +1,321 @@
+"""
+Orchestrator for the RDF build pipeline.
+Models every build script as a step with declared input and output files,
+derives the dependency DAG from them, and runs the steps as subprocesses:
+independent steps run in parallel, and a step is skipped when the hashes of
+its inputs, outputs and script (with the scripts/rdf modules it imports,
+directly or not) are the ones recorded after its last successful run
+(data/rdf/.pipeline_cache.json).
+
+    rdf_maker ─┬─ extend_ontology ───────────────────────────── validate_with_ontology
+               ├─ integrate_external_data ──────────┐                     │
+               ├─ integrate_multilang_labels (--fetch)                    │
+               └─ merge_multilang_labels ─── merge_all_ttl ─ materialize_rdfs ─ validate_final
+                                                             ┘
+
+With --in-process the steps run one after another in this process instead:
+stages hand their graphs to each other through graph_cache, so every Turtle
+file is parsed at most once per build instead of once per reading script.
+
+Usage: python scripts/rdf/run_pipeline.py [--jobs N] [--in-process] [--force] [--fetch] [--dry-run] [step ...]
+Naming steps runs those steps and everything they depend on.
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from infobox_store import STORE_FILE
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SCRIPTS_DIR = Path(__file__).resolve().parent
+CACHE_FILE = "data/rdf/.pipeline_cache.json"
+CORPUS_DIR = "data/infoboxes"
+
+
+@dataclass
+class Step:
+    """One build script with the files it reads and writes (paths relative to the project root)."""
+    name: str
+    script: str
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    network: bool = False
+    args: list = field(default_factory=list)
+
+
+STEPS = [
+    Step("rdf_maker", "rdf_maker.py",
+         inputs=[CORPUS_DIR, "data/rdf/infobox_changes.json"],
+         outputs=["data/rdf/all_infoboxes.ttl"],
+         args=["--changes"]),
+    Step("extend_ontology", "extend_ontology.py",
+         inputs=["data/rdf/all_infoboxes.ttl", "data/rdf/tolkien-kg-ontology.ttl"],
+         outputs=["data/rdf/tolkien-kg-ontology.ttl"]),
+    Step("integrate_external_data", "integrate_external_data.py",
+         inputs=["data/rdf/all_infoboxes.ttl", "data/rdf/cards.json", "data/rdf/lotr_characters.csv",
+                 "data/rdf/fuzzy_accept.csv"],
+         outputs=["data/rdf/external_links.ttl", "data/rdf/external_match_report.csv"]),
+    Step("integrate_multilang_labels", "integrate_multilang_labels.py",
+         inputs=["data/rdf/all_infoboxes.ttl"],
+         outputs=["data/rdf/multilang_labels.ttl"],
+         network=True),
+    Step("merge_multilang_labels", "merge_multilang_labels.py",
+         inputs=["data/rdf/all_infoboxes.ttl", "data/rdf/multilang_labels.ttl"],
+         outputs=["data/rdf/all_infoboxes_with_lang.ttl", "data/rdf/label_coverage.csv"]),
+    Step("merge_all_ttl", "merge_all_ttl.py",
+         inputs=["data/rdf/all_infoboxes_with_lang.ttl", "data/rdf/external_links.ttl"],
+         outputs=["data/rdf/kg_full.ttl", "data/rdf/kg_full.kgsnap"]),
+    Step("materialize_rdfs", "materialize_rdfs.py",
+         inputs=["data/rdf/kg_full.ttl", "data/rdf/tolkien-kg-ontology.ttl"],
+         outputs=["data/rdf/kg_inferred.nt"]),
+    Step("validate_final", "validate_final.py",
+         inputs=["data/rdf/kg_full.ttl", "data/rdf/kg_inferred.nt", "data/rdf/tolkien-shapes.ttl"],
+         args=["--incremental"]),
+    Step("validate_with_ontology", "validate_with_ontology.py",
+         inputs=["data/rdf/kg_full.ttl", "data/rdf/tolkien-kg-ontology.ttl"]),
+]
+
+
+def _corpus_files(directory: Path) -> list:
+    """Files of an infobox corpus directory that the build actually reads."""
+    return sorted(
+        p for p in directory.iterdir()
+        if p.name == STORE_FILE or (p.name.startswith("infobox_") and p.suffix == ".txt")
+    )
+
+
+def hash_path(path: str):
+    """sha256 of a file, or of every corpus file of a directory; None if missing."""
+    full = PROJECT_ROOT / path
+    if not full.exists():
+        return None
+    files = _corpus_files(full) if full.is_dir() else [full]
+    digest = hashlib.sha256()
+    for file in files:
+        if full.is_dir():
+            digest.update(file.name.encode("utf-8") + b"\0")
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_imports(script: str) -> list:
+    """The script and every scripts/rdf module it imports, directly or through other local modules."""
+    found = []
+    stack = [script]
+    while stack:
+        name = stack.pop()
+        if name in found:
+            continue
+        found.append(name)
+        with open(SCRIPTS_DIR / name, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                path = f"{module.split('.')[0]}.py"
+                if (SCRIPTS_DIR / path).is_file():
+                    stack.append(path)
+    return sorted(found)
+
+
+def step_fingerprint(step: Step) -> dict:
+    paths = [f"scripts/rdf/{name}" for name in local_imports(step.script)] + step.inputs + step.outputs
+    return {path: hash_path(path) for path in dict.fromkeys(paths)}
+
+
+def dependencies(steps: list) -> dict:
+    """{step name: set of step names producing one of its inputs}."""
+    producers = {out: step.name for step in steps for out in step.outputs}
+    return {
+        step.name: {producers[i] for i in step.inputs if i in producers and producers[i] != step.name}
+        for step in steps
+    }
+
+
+def select_steps(steps: list, deps: dict, targets: list) -> list:
+    if not targets:
+        return steps
+    wanted = set()
+    stack = list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(deps[name])
+    return [step for step in steps if step.name in wanted]
+
+
+def load_cache() -> dict:
+    path = PROJECT_ROOT / CACHE_FILE
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache: dict):
+    path = PROJECT_ROOT / CACHE_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+
+def run_step(step: Step) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, str(SCRIPTS_DIR / step.script), *step.args],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    return proc.returncode, proc.stdout + proc.stderr, time.perf_counter() - start
+
+
+def run_step_in_process(step: Step) -> tuple:
+    """Import the step's module and call its main(); graphs stay cached for later steps."""
+    start = time.perf_counter()
+    returncode = 0
+    saved_argv = sys.argv
+    sys.argv = [step.script, *step.args]
+    try:
+        importlib.import_module(Path(step.script).stem).main()
+    except SystemExit as exc:
+        returncode = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.argv = saved_argv
+    return returncode, "", time.perf_counter() - start
+
+
+def run_pipeline(
+    targets=None,
+    jobs: int = 4,
+    force: bool = False,
+    fetch: bool = False,
+    dry_run: bool = False,
+    in_process: bool = False,
+) -> bool:
+    deps = dependencies(STEPS)
+    unknown = [t for t in targets or [] if t not in deps]
+    if unknown:
+        raise SystemExit(f"Unknown step(s): {', '.join(unknown)} (known: {', '.join(deps)})")
+    steps = {step.name: step for step in select_steps(STEPS, deps, targets or [])}
+    cache = load_cache()
+    runner = run_step
+    if in_process:
+        # Shared rdflib graphs are not thread-safe and the scripts use paths relative to the root.
+        os.chdir(PROJECT_ROOT)
+        runner, jobs = run_step_in_process, 1
+
+    pending = dict(steps)
+    done, failed = set(), set()
+    running = {}
+
+    def start_ready(pool):
+        for name, step in list(pending.items()):
+            if any(d in failed for d in deps[name] if d in steps):
+                print(f"  - {name}: skipped (dependency failed)")
+                failed.add(name)
+                del pending[name]
+                continue
+            if not all(d in done for d in deps[name] if d in steps):
+                continue
+            if len(running) >= jobs:
+                break
+            del pending[name]
+            if step.network and not fetch:
+                print(f"  - {name}: using existing outputs (network step, pass --fetch to rerun)")
+                done.add(name)
+                continue
+            fingerprint = step_fingerprint(step)
+            if not force and cache.get(name) == fingerprint:
+                print(f"  - {name}: up to date")
+                done.add(name)
+                continue
+            missing = [i for i in step.inputs if fingerprint[i] is None]
+            if missing:
+                print(f"  - {name}: FAILED (missing input {', '.join(missing)})")
+                failed.add(name)
+                continue
+            if dry_run:
+                print(f"  - {name}: would run")
+                done.add(name)
+                continue
+            print(f"  - {name}: running...")
+            running[pool.submit(runner, step)] = step
+
+    print(f"Pipeline: {len(steps)} steps, {'in-process' if in_process else f'{jobs} parallel jobs'}")
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        start_ready(pool)
+        while running or pending:
+            if not running:
+                start_ready(pool)
+                if not running:
+                    break
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                returncode, output, duration = future.result()
+                if returncode == 0:
+                    done.add(step.name)
+                    cache[step.name] = step_fingerprint(step)
+                    save_cache(cache)
+                    print(f"  - {step.name}: OK ({duration:.1f}s)")
+                else:
+                    failed.add(step.name)
+                    print(f"  - {step.name}: FAILED (exit {returncode}, {duration:.1f}s)")
+                    if output:
+                        print("\n".join("      " + line for line in output.strip().splitlines()[-20:]))
+            start_ready(pool)
+
+    if failed:
+        print(f"Pipeline failed: {', '.join(sorted(failed))}")
+        return False
+    print("OK. Pipeline complete")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Tolkien KG build pipeline.")
+    parser.add_argument("steps", nargs="*", help="steps to build (default: all)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 2, help="parallel steps")
+    parser.add_argument("--in-process", action="store_true", help="run steps sequentially in one process sharing parsed graphs")
+    parser.add_argument("--force", action="store_true", help="ignore the cache and rerun every step")
+    parser.add_argument("--fetch", action="store_true", help="also rerun network steps (Fandom langlinks)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would run")
+    args = parser.parse_args()
+    ok = run_pipeline(
+        args.steps,
+        jobs=args.jobs,
+        force=args.force,
+        fetch=args.fetch,
+        dry_run=args.dry_run,
+        in_process=args.in_process,
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+SHACL validation helpers shared by validate_final.py.
+Focus nodes are the instances of the shapes' sh:targetClass classes (and their
+subclasses). A focus node is validated on its neighbourhood subgraph: its own
+triples plus the triples of every node it points to, restricted to rdf:type and
+the shapes' sh:path predicates, which covers the depth-1 sh:path / sh:node
+shapes of data/rdf/tolkien-shapes.ttl.
+
+Incremental mode keeps the result of every focus node in
+data/rdf/.shacl_cache.json and the validated triples in data/rdf/.shacl_validated.nt.
+The next run diffs the graph against those triples and revalidates only the
+focus nodes whose neighbourhood changed.
+
+Sharded mode (opt-in) splits the focus nodes of each target class into N
+shards by a stable hash and validates every shard's neighbourhood subgraph in
+its own process; results are merged by focus node. It is slower than one
+process on the pipeline's data; see validate_final.py and
+benchmark_shacl_sharding.py for when it pays off.
+"""
+
+import json
+import os
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from pyshacl import validate
+from rdflib import Graph, Literal, RDF, RDFS, URIRef
+from rdflib.namespace import SH
+
+from graph_snapshot import file_sha256
+from rdf_stream import ntriples_line, parse_ntriples_lines
+
+CACHE_FILE = "data/rdf/.shacl_cache.json"
+VALIDATED_NT = "data/rdf/.shacl_validated.nt"
+INFERENCE = "rdfs"
+
+_SCHEMA_PREDICATES = (RDFS.subClassOf, RDFS.subPropertyOf, RDFS.domain, RDFS.range)
+
+
+def target_classes(shapes: Graph, data: Graph) -> set:
+    """sh:targetClass classes of the shapes, closed under rdfs:subClassOf."""
+    classes = set(shapes.objects(None, SH.targetClass))
+    frontier = list(classes)
+    while frontier:
+        cls = frontier.pop()
+        for graph in (shapes, data):
+            for sub in graph.subjects(RDFS.subClassOf, cls):
+                if sub not in classes:
+                    classes.add(sub)
+                    frontier.append(sub)
+    return classes
+
+
+def focus_nodes(data: Graph, classes: set) -> set:
+    nodes = set()
+    for cls in classes:
+        nodes.update(data.subjects(RDF.type, cls))
+    return nodes
+
+
+def shape_predicates(shapes: Graph, data: Graph):
+    """
+    Predicates the shapes can look at: rdf:type, every IRI sh:path and their
+    rdfs:subPropertyOf descendants; None (= all predicates) if a path is complex.
+    """
+    predicates = {RDF.type}
+    for path in shapes.objects(None, SH.path):
+        if not isinstance(path, URIRef):
+            return None
+        predicates.add(path)
+    frontier = list(predicates)
+    while frontier:
+        prop = frontier.pop()
+        for sub in data.subjects(RDFS.subPropertyOf, prop):
+            if sub not in predicates:
+                predicates.add(sub)
+                frontier.append(sub)
+    return predicates
+
+
+def neighbourhood(data: Graph, nodes, predicates=None) -> Graph:
+    """
+    Triples of the nodes and of every node they point to, plus the data's RDFS
+    schema triples; with `predicates`, only triples using those predicates.
+    """
+    sub = Graph()
+    seen = set()
+
+    def node_triples(node):
+        if predicates is None:
+            return data.triples((node, None, None))
+        return (t for p in predicates for t in data.triples((node, p, None)))
+
+    for node in nodes:
+        for s, p, o in node_triples(node):
+            sub.add((s, p, o))
+            if not isinstance(o, Literal) and o not in seen:
+                seen.add(o)
+                for triple in node_triples(o):
+                    sub.add(triple)
+    for pred in _SCHEMA_PREDICATES:
+        for triple in data.triples((None, pred, None)):
+            sub.add(triple)
+    return sub
+
+
+def _term(graph: Graph, subject, predicate):
+    value = graph.value(subject, predicate)
+    return None if value is None else str(value)
+
+
+def collect_results(results_graph: Graph) -> list:
+    """One dict per sh:ValidationResult of a pyshacl results graph."""
+    results = []
+    for result in results_graph.subjects(RDF.type, SH.ValidationResult):
+        results.append({
+            "focus": _term(results_graph, result, SH.focusNode),
+            "path": _term(results_graph, result, SH.resultPath),
+            "value": _term(results_graph, result, SH.value),
+            "severity": (_term(results_graph, result, SH.resultSeverity) or "").rsplit("#", 1)[-1],
+            "component": (_term(results_graph, result, SH.sourceConstraintComponent) or "").rsplit("#", 1)[-1],
+            "message": _term(results_graph, result, SH.resultMessage),
+        })
+    results.sort(key=lambda r: (r["focus"] or "", r["path"] or "", r["message"] or "", r["value"] or ""))
+    return results
+
+
+def run_validation(data: Graph, shapes: Graph, inference: str = INFERENCE) -> list:
+    _conforms, results_graph, _text = validate(
+        data,
+        shacl_graph=shapes,
+        inference=inference,
+        abort_on_first=False,
+    )
+    return collect_results(results_graph)
+
+
+def shard_focus_nodes(data: Graph, shapes: Graph, shards: int, nodes=None) -> list:
+    """Split focus nodes (all, or the given ones) into shards: per target class, by crc32 of the IRI."""
+    shard_nodes = [[] for _ in range(shards)]
+    assigned = set()
+    for cls in sorted(target_classes(shapes, data)):
+        for node in sorted(data.subjects(RDF.type, cls)):
+            if node in assigned or (nodes is not None and node not in nodes):
+                continue
+            assigned.add(node)
+            shard_nodes[zlib.crc32(f"{cls}|{node}".encode("utf-8")) % shards].append(node)
+    return [shard for shard in shard_nodes if shard]
+
+
+def _validate_shard(data_nt: str, shapes_nt: str, focus_keys: set, inference: str) -> list:
+    data = Graph()
+    data.parse(data=data_nt, format="nt")
+    shapes = Graph()
+    shapes.parse(data=shapes_nt, format="nt")
+    return [r for r in run_validation(data, shapes, inference) if r["focus"] in focus_keys]
+
+
+def validate_sharded(data: Graph, shapes: Graph, workers: int, nodes=None, inference: str = INFERENCE) -> list:
+    """Validate the focus nodes (all, or the given ones) in `workers` processes."""
+    shards = shard_focus_nodes(data, shapes, workers, nodes)
+    shapes_nt = shapes.serialize(format="nt")
+    predicates = shape_predicates(shapes, data)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _validate_shard,
+                neighbourhood(data, shard, predicates).serialize(format="nt"),
+                shapes_nt,
+                {str(node) for node in shard},
+                inference,
+            )
+            for shard in shards
+        ]
+        results = [r for future in futures for r in future.result()]
+    results.sort(key=lambda r: (r["focus"] or "", r["path"] or "", r["message"] or "", r["value"] or ""))
+    return results
+
+
+def violation_summary(results: list) -> Counter:
+    """Violation counts per (constraint component, result path)."""
+    return Counter((r["component"], r["path"]) for r in results if r["severity"] == "Violation")
+
+
+def count_violations(results: list) -> int:
+    return sum(1 for r in results if r["severity"] == "Violation")
+
+
+def format_results(results: list, limit: int = 20) -> str:
+    lines = []
+    for r in results[:limit]:
+        lines.append(f"Constraint {r['severity']} in {r['component']}:")
+        lines.append(f"    Focus node: {r['focus']}")
+        if r["path"]:
+            lines.append(f"    Result path: {r['path']}")
+        if r["value"]:
+            lines.append(f"    Value: {r['value']}")
+        if r["message"]:
+            lines.append(f"    Message: {r['message']}")
+    return "\n".join(lines)
+
+
+def affected_focus_nodes(data: Graph, focus: set, added, removed) -> set:
+    """Focus nodes whose neighbourhood contains a subject of an added or removed triple."""
+    changed = {s for s, _p, _o in added} | {s for s, _p, _o in removed}
+    affected = changed & focus
+    for node in changed:
+        for s in data.subjects(None, node):
+            if s in focus:
+                affected.add(s)
+    return affected
+
+
+def _graph_lines(data: Graph) -> set:
+    return {ntriples_line(triple) for triple in data}
+
+
+def load_cache(shapes_path: str, inference: str):
+    """Cached results per focus node, or None if there is no cache for these shapes."""
+    if not (os.path.exists(CACHE_FILE) and os.path.exists(VALIDATED_NT)):
+        return None
+    with open(CACHE_FILE, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    if cache.get("shapes_sha256") != file_sha256(shapes_path) or cache.get("inference") != inference:
+        return None
+    return cache["nodes"]
+
+
+def save_cache(nodes: dict, lines: set, shapes_path: str, inference: str):
+    with open(VALIDATED_NT, "w", encoding="utf-8", newline="\n") as f:
+        f.writelines(sorted(lines))
+    with open(CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"shapes_sha256": file_sha256(shapes_path), "inference": inference, "nodes": nodes}, f)
+
+
+def validate_incremental(
+    data: Graph, shapes: Graph, shapes_path: str, inference: str = INFERENCE, workers: int = 1
+) -> tuple:
+    """
+    Validate only the focus nodes affected since the last run; returns
+    (all results, number of focus nodes revalidated, number of focus nodes).
+    """
+    focus = focus_nodes(data, target_classes(shapes, data))
+    lines = _graph_lines(data)
+    cached = load_cache(shapes_path, inference)
+    if cached is None:
+        if workers > 1:
+            results = validate_sharded(data, shapes, workers, inference=inference)
+        else:
+            results = run_validation(data, shapes, inference)
+        todo = focus
+    else:
+        with open(VALIDATED_NT, "r", encoding="utf-8") as f:
+            previous = set(f)
+        added = parse_ntriples_lines(lines - previous)
+        removed = parse_ntriples_lines(previous - lines)
+        todo = affected_focus_nodes(data, focus, added, removed)
+        todo |= {node for node in focus if str(node) not in cached}
+        if not todo:
+            results = []
+        elif workers > 1 and len(todo) >= workers:
+            results = validate_sharded(data, shapes, workers, nodes=todo, inference=inference)
+        else:
+            results = run_validation(neighbourhood(data, todo, shape_predicates(shapes, data)), shapes, inference)
+
+    focus_keys = {str(node) for node in focus}
+    todo_keys = {str(node) for node in todo}
+    if cached is None:
+        todo_keys |= {r["focus"] for r in results}
+    nodes = {} if cached is None else {
+        key: value for key, value in cached.items() if key not in todo_keys and key in focus_keys
+    }
+    for key in todo_keys:
+        nodes[key] = []
+    for r in results:
+        if r["focus"] in todo_keys:
+            nodes[r["focus"]].append(r)
+    save_cache(nodes, lines, shapes_path, inference)
+    all_results = [r for key in sorted(nodes) for r in nodes[key]]
+    return all_results, len(todo), len(focus)
@@ -1,44 +1,116 @@
-"""Final SHACL validation with relaxed constraints."""
+"""
+Final SHACL validation with relaxed constraints.
+--incremental revalidates only the focus nodes whose neighbourhood changed
+since the last incremental run and reuses the cached results for the rest.
+When data/rdf/kg_inferred.nt (materialize_rdfs.py) is current, its triples are
+added to the data and pyshacl runs without its own RDFS inference.
+
+--workers N (opt-in, default 1) shards the focus nodes over N processes. It is
+not a speed-up for the pipeline: with kg_inferred.nt current, one process
+validates kg_full in 2.5 s and 2 shards take 4.9 s. With one free CPU per
+worker, benchmark_shacl_sharding.py --materialized estimates at best 1.2x (8
+CPUs, kg_full), and the gain does not grow with the graph up to 8 times
+kg_full (390,000 triples), so there is no size from which it pays off. Without
+kg_inferred.nt, every shard saves part of pyshacl's RDFS inference and it pays
+off from kg_full's size with 2 free CPUs, but stays slower than materializing.
+"""
+
+import argparse
 
 from pyshacl import validate
-from rdflib import Graph
-
-print("Loading RDF data...")
-data = Graph()
-data.parse("data/rdf/kg_full.ttl", format="turtle")
-print(f"OK. {len(data)} triples loaded")
-
-print("\nLoading SHACL shapes...")
-shapes = Graph()
-shapes.parse("data/rdf/tolkien-shapes.ttl", format="turtle")
-print(f"OK. {len(shapes)} shapes loaded")
-
-print("\nRunning SHACL validation...")
-conforms, results, text = validate(
-    data,
-    shacl_graph=shapes,
-    inference="rdfs",
-    abort_on_first=False,
+
+from graph_cache import load_graph
+from materialize_rdfs import load_inferred
+from shacl_validation import (
+    collect_results,
+    count_violations,
+    format_results,
+    validate_incremental,
+    validate_sharded,
+    violation_summary,
 )
 
-print(f"\n{'=' * 60}")
-print("VALIDATION RESULT")
-print(f"{'=' * 60}")
-print(f"\nOK. Conforms: {conforms}")
+DATA_FILE = "data/rdf/kg_full.ttl"
+SHAPES_FILE = "data/rdf/tolkien-shapes.ttl"
+
+
+def main_incremental(data, shapes, workers: int, inference: str):
+    print("\nRunning incremental SHACL validation...")
+    results, revalidated, total = validate_incremental(
+        data, shapes, SHAPES_FILE, inference=inference, workers=workers
+    )
+    violations = count_violations(results)
+    print(f"OK. Focus nodes revalidated: {revalidated}/{total}")
+    print(f"\nOK. Conforms: {violations == 0}")
+    if violations:
+        print(f"Number of violations: {violations}")
+        print(format_results(results))
+    else:
+        print("\nNO SHACL VIOLATIONS!")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SHACL validation of kg_full.ttl.")
+    parser.add_argument("--incremental", action="store_true", help="revalidate only changed focus nodes")
+    parser.add_argument("--workers", type=int, default=1, help="validate focus-node shards in N processes (slower than one process, see benchmark_shacl_sharding.py)")
+    args = parser.parse_args(argv)
+
+    print("Loading RDF data...")
+    data = load_graph(DATA_FILE)
+    print(f"OK. {len(data)} triples loaded")
+
+    inference = "rdfs"
+    inferred = load_inferred()
+    if inferred is not None:
+        data = load_graph(DATA_FILE, copy=True)
+        data += inferred
+        inference = "none"
+        print(f"OK. {len(inferred)} materialized RDFS triples added (inference disabled)")
+
+    print("\nLoading SHACL shapes...")
+    shapes = load_graph(SHAPES_FILE)
+    print(f"OK. {len(shapes)} shapes loaded")
+
+    if args.incremental:
+        main_incremental(data, shapes, args.workers, inference)
+        return
+
+    if args.workers > 1:
+        print(f"\nRunning SHACL validation in {args.workers} processes...")
+        results = validate_sharded(data, shapes, args.workers, inference=inference)
+        conforms = not results
+        text = format_results(results)
+    else:
+        print("\nRunning SHACL validation...")
+        conforms, results_graph, text = validate(
+            data,
+            shacl_graph=shapes,
+            inference=inference,
+            abort_on_first=False,
+        )
+        results = collect_results(results_graph)
 
-if not conforms:
-    violations = text.count("Constraint Violation")
-    print(f"Number of violations: {violations}")
     print(f"\n{'=' * 60}")
-    print("FIRST VIOLATIONS:")
-    print(f"{'=' * 60}\n")
-    print(text[:2000])
-else:
-    print("\nNO SHACL VIOLATIONS!")
-    print("OK. The RDF conforms to the shapes.")
-    print("\nFinal statistics:")
-    print(f"  - RDF triples: {len(data)}")
-    print(f"  - SHACL triples: {len(shapes)}")
-    print("  - Conformity: 100%")
+    print("VALIDATION RESULT")
+    print(f"{'=' * 60}")
+    print(f"\nOK. Conforms: {conforms}")
+
+    if not conforms:
+        print(f"Number of violations: {count_violations(results)}")
+        for (component, path), count in violation_summary(results).most_common():
+            print(f"  - {component} on {path}: {count}")
+        print(f"\n{'=' * 60}")
+        print("FIRST VIOLATIONS:")
+        print(f"{'=' * 60}\n")
+        print(text[:2000])
+    else:
+        print("\nNO SHACL VIOLATIONS!")
+        print("OK. The RDF conforms to the shapes.")
+        print("\nFinal statistics:")
+        print(f"  - RDF triples: {len(data)}")
+        print(f"  - SHACL triples: {len(shapes)}")
+        print("  - Conformity: 100%")
 
 
+if __name__ == "__main__":
+    main()
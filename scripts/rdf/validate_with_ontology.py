@@ -1,40 +1,42 @@
-from rdflib import Graph
-from rdflib.namespace import RDF, OWL
-
 """
 Module for validating RDF properties against an ontology.
 This module validates that all properties used in an RDF dataset
-are correctly defined in the corresponding ontology.
+are correctly defined in the corresponding ontology. The data is read with
+a streaming predicate census instead of being loaded into rdflib.
 """
 
-ontology = Graph()
-ontology.parse("data/rdf/tolkien-kg-ontology.ttl", format="turtle")
+from rdflib.namespace import RDF, OWL
+
+from graph_cache import load_graph
+from predicate_census import kg_properties, predicate_census
+
+ONTOLOGY_FILE = "data/rdf/tolkien-kg-ontology.ttl"
+DATA_FILE = "data/rdf/kg_full.ttl"
 
-data = Graph()
-data.parse("data/rdf/kg_full.ttl", format="turtle")
 
-print(f"OK. Ontology: {len(ontology)} triples")
-print(f"OK. Data: {len(data)} triples")
+def main():
+    ontology = load_graph(ONTOLOGY_FILE)
+    census = predicate_census(DATA_FILE)
 
-KG_ONT = "http://tolkien-kg.org/ontology/"
-used_props = set()
-defined_props = set()
+    print(f"OK. Ontology: {len(ontology)} triples")
+    print(f"OK. Data: {sum(record.count for record in census.values())} triples")
 
-for s, p, o in data.triples((None, None, None)):
-    if str(p).startswith(KG_ONT):
-        used_props.add(str(p))
+    used_props = kg_properties(census)
+    defined_props = set()
 
-for s in ontology.subjects(RDF.type, OWL.ObjectProperty):
-    defined_props.add(str(s))
-for s in ontology.subjects(RDF.type, OWL.DatatypeProperty):
-    defined_props.add(str(s))
+    for s in ontology.subjects(RDF.type, OWL.ObjectProperty):
+        defined_props.add(str(s))
+    for s in ontology.subjects(RDF.type, OWL.DatatypeProperty):
+        defined_props.add(str(s))
 
-undefined = used_props - defined_props
-if undefined:
-    print("\nProperties used but NOT defined in the ontology:")
-    for prop in sorted(undefined):
-        print(f"  - {prop}")
-else:
-    print("\nOK. All kg-ont:* properties are defined.")
+    undefined = used_props - defined_props
+    if undefined:
+        print("\nProperties used but NOT defined in the ontology:")
+        for prop in sorted(undefined):
+            print(f"  - {prop} (proposed: {census[prop].proposed_kind})")
+    else:
+        print("\nOK. All kg-ont:* properties are defined.")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Concurrent Tolkien Gateway crawler
+
+Asynchronous counterpart of `requestAllInfobox.py`: same page selection modes,
+same infobox extraction and same output (corpus store or `infobox_*.txt` files), but the
+HTTP work is spread over a bounded pool of in-flight requests instead of one
+`requests.get` at a time, and page wikitext is fetched BATCH_SIZE titles per
+request with `prop=revisions`.
+
+Politeness (`MediaWikiClient` of `scripts/rdf/mediawiki_client.py`)
+- One shared `requests.Session` (keep-alive connection pool sized to the concurrency).
+- `asyncio.Semaphore` bounding the number of requests in flight.
+- Token bucket limiting the sustained request rate (`RATE_PER_SEC`, `BURST`).
+- Every call sends MediaWiki's `maxlag`; a `maxlag` error, HTTP 429 or 503
+  pauses the whole bucket for `Retry-After` seconds (or an exponential backoff).
+
+Incremental mode
+- Same revision manifest as `requestAllInfobox.py` (`infobox_manifest.json`): only new
+  pages and pages edited since the last run (recentchanges / prop=info) are fetched.
+
+Resuming
+- Each processed title is appended to `data/infoboxes/crawl_checkpoint.txt`.
+  An interrupted run, or one with failed batches, restarts with only the titles
+  not yet in the checkpoint; the checkpoint is removed once every title is saved.
+
+Usage
+- Run: `python scripts/run_once/ApiRequestData/async_crawler.py`
+- Set `TOLKIEN_GATEWAY_API` to point the crawler at another MediaWiki API
+  endpoint (e.g. a local stand-in server used for testing).
+"""
+
+import asyncio
+import os
+import time
+
+from requestAllInfobox import (
+    API,
+    BATCH_SIZE,
+    INCREMENTAL,
+    INFOBOX_TEMPLATES,
+    MODE,
+    OUTPUT_DIR,
+    collect_lastrevids,
+    collect_revisions,
+    info_params,
+    known_file,
+    load_manifest,
+    open_store,
+    plan_refresh,
+    record_page,
+    report_incremental,
+    revisions_params,
+    save_infobox,
+    save_manifest,
+)
+from mediawiki_client import (
+    CONCURRENCY,
+    MediaWikiClient,
+    collect_recent_changes,
+    recent_changes_usable,
+    recentchanges_params,
+    utc_timestamp,
+)
+
+API_URL = os.environ.get("TOLKIEN_GATEWAY_API", API)
+CHECKPOINT_FILE = "crawl_checkpoint.txt"
+
+
+async def get_wikitext_batch(client: MediaWikiClient, titles, revisions=None):
+    """Current wikitext of up to BATCH_SIZE titles ({title: wikitext}), None on failure."""
+    wikitexts = {}
+    aliases = {}
+    cont = {}
+    while True:
+        params = revisions_params(titles)
+        params.update(cont)
+        data = await client.get(params)
+        if data is None:
+            return None
+        collect_revisions(data, wikitexts, aliases, revisions)
+        if "continue" not in data:
+            return wikitexts
+        cont = data["continue"]
+
+
+class CrawlCheckpoint:
+    """Append-only record of processed titles, used to resume an interrupted crawl."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.done = {line.rstrip("\n") for line in f if line.strip()}
+        self._file = None
+
+    def pending(self, titles):
+        return [t for t in titles if t not in self.done]
+
+    def mark_done(self, title: str):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(title + "\n")
+        self._file.flush()
+        self.done.add(title)
+
+    def close(self, completed: bool):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def select_titles(client: MediaWikiClient, mode=MODE) -> list[str]:
+    if mode == 1:
+        print("MODE 1: Fetching pages from Characters category...")
+        return await client.list_all(
+            {"action": "query", "list": "categorymembers", "cmtitle": "Category:Characters",
+             "cmlimit": 500, "cmnamespace": 0},
+            "categorymembers",
+        )
+    if mode == 2:
+        print(f"MODE 2: Fetching pages with {len(INFOBOX_TEMPLATES)} infobox templates...")
+        per_template = await asyncio.gather(*(
+            client.list_all(
+                {"action": "query", "list": "embeddedin", "eititle": template,
+                 "eilimit": 500, "einamespace": 0},
+                "embeddedin",
+            )
+            for template in INFOBOX_TEMPLATES
+        ))
+        return sorted({title for titles in per_template for title in titles})
+    print("MODE 3: Fetching all pages (not recommended)...")
+    return await client.list_all({"action": "query", "list": "allpages", "aplimit": 500}, "allpages")
+
+
+async def select_changed_titles(client: MediaWikiClient, all_titles, manifest) -> list[str]:
+    """Async version of requestAllInfobox.select_changed_titles (prop=info batches run concurrently)."""
+    known = [t for t in all_titles if manifest["pages"].get(t, {}).get("revid") is not None]
+    if recent_changes_usable(manifest):
+        changed = set()
+        async for data in client.query_all(recentchanges_params(manifest["last_run"])):
+            collect_recent_changes(data, changed)
+        selected = plan_refresh(all_titles, manifest, changed=changed)
+        method = f"recentchanges since {manifest['last_run']}"
+    else:
+        latest = {}
+
+        async def fetch_info(batch):
+            async for data in client.query_all(info_params(batch)):
+                collect_lastrevids(data, latest)
+
+        await asyncio.gather(*(
+            fetch_info(known[start : start + BATCH_SIZE]) for start in range(0, len(known), BATCH_SIZE)
+        ))
+        selected = plan_refresh(all_titles, manifest, latest=latest)
+        method = "prop=info lastrevid"
+    report_incremental(all_titles, known, selected, method)
+    return selected
+
+
+async def crawl(client: MediaWikiClient, titles, output_dir: str, checkpoint: CrawlCheckpoint, log,
+                manifest: dict, store=None, workers: int = CONCURRENCY) -> dict:
+    """Fetch and save every title; batches of BATCH_SIZE titles are drained by `workers` tasks."""
+    pending = checkpoint.pending(titles)
+    queue = asyncio.Queue()
+    for start in range(0, len(pending), BATCH_SIZE):
+        queue.put_nowait(pending[start : start + BATCH_SIZE])
+    stats = {"OK": 0, "NO INFOBOX": 0, "NO WIKITEXT": 0, "FAILED": 0}
+    errors = []
+
+    def fail(titles):
+        # Not checkpointed: retried by the next (resumed) run.
+        stats["FAILED"] += len(titles)
+        for title in titles:
+            log.write(f"FAILED: {title}\n")
+
+    async def worker():
+        while True:
+            batch = await queue.get()
+            try:
+                revisions = {}
+                wikitexts = await get_wikitext_batch(client, batch, revisions)
+                if wikitexts is None:
+                    fail(batch)
+                    continue
+                statuses = []
+                for title in batch:
+                    revision = revisions.get(title)
+                    status, filename = save_infobox(
+                        output_dir, title, wikitexts.get(title), log,
+                        known_file(manifest, output_dir, title), store, revision,
+                    )
+                    record_page(manifest, output_dir, title, status, filename, revision, store)
+                    statuses.append(status)
+                if store is not None:
+                    store.commit()
+                save_manifest(manifest, output_dir)
+                # Checkpointed only once the batch is committed.
+                for title, status in zip(batch, statuses):
+                    stats[status] += 1
+                    checkpoint.mark_done(title)
+                print(f"Processed {len(checkpoint.done)}/{len(titles)}")
+            except Exception as e:
+                # Keep draining the queue: a dead worker would leave queue.join() waiting forever.
+                print(f"Batch failed ({type(e).__name__}: {e}): {batch[0]} ... {batch[-1]}")
+                errors.append(e)
+                fail(batch)
+            finally:
+                queue.task_done()
+
+    print(f"Queued {len(pending)} pages in {queue.qsize()} batches "
+          f"({len(titles) - len(pending)} already done in a previous run).")
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        await queue.join()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    if errors:
+        raise errors[0]
+    return stats
+
+
+async def run(output_dir=OUTPUT_DIR, mode=MODE, incremental=INCREMENTAL, api_url=API_URL):
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = time.time()
+    run_started = utc_timestamp()
+    store = open_store(output_dir)
+    manifest = load_manifest(output_dir, store)
+    client = MediaWikiClient(api_url=api_url)
+    checkpoint = CrawlCheckpoint(os.path.join(output_dir, CHECKPOINT_FILE))
+    completed = False
+    try:
+        all_titles = await select_titles(client, mode)
+        if incremental:
+            all_titles = await select_changed_titles(client, all_titles, manifest)
+        print(f"Found {len(all_titles)} pages to process.")
+
+        log_file = os.path.join(output_dir, "infobox_log.txt")
+        with open(log_file, "a", encoding="utf-8") as log:
+            log.write(f"\n\n===== Session started at {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
+            log.write(f"Mode: {mode}, Incremental: {incremental}, Concurrent: {CONCURRENCY}\n")
+            stats = await crawl(client, all_titles, output_dir, checkpoint, log, manifest, store)
+            # Failed titles are not in the checkpoint: keep it so a resumed run only refetches them.
+            completed = not stats["FAILED"]
+            if completed:
+                # A failed batch may hide edited pages: keep the previous start point.
+                manifest["last_run"] = run_started
+                if store is not None:
+                    store.set_meta("last_run", run_started)
+            save_manifest(manifest, output_dir)
+            duration = time.time() - start_time
+            log.write(f"Session completed in {duration:.2f} seconds\n")
+    finally:
+        checkpoint.close(completed)
+        client.close()
+        if store is not None:
+            store.close()
+
+    print(f"Finished in {duration:.2f} seconds ({client.requests_sent} API requests).")
+    print(f"  • Saved:        {stats['OK']}")
+    print(f"  • No infobox:   {stats['NO INFOBOX']}")
+    print(f"  • No wikitext:  {stats['NO WIKITEXT']}")
+    print(f"  • Failed:       {stats['FAILED']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
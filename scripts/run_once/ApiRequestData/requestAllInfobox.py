@@ -1,7 +1,14 @@
 import requests
+import json
 import re
+import sys
 import time
 import os
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "rdf"))
+from infobox_store import InfoboxStore, open_corpus_store, store_path
+from mediawiki_client import collect_recent_changes, recent_changes_usable, recentchanges_params, utc_timestamp
 
 """
 Fetch Tolkien Gateway data/infoboxes
@@ -15,14 +22,17 @@ This script queries the MediaWiki API of tolkiengateway.net to:
 
 Main Functions
 - `safe_filename_from_title(title, max_length=180)`: normalizes titles into Windows-safe filenames (replaces forbidden characters, handles reserved names, truncates).
-- `get_infobox_wikitext(page_title)`: fetches raw wikitext of a page via `action=parse`.
+- `get_wikitext_batch(titles)`: fetches the wikitext (and revid/timestamp) of up to 50 pages per request via `prop=revisions`.
+- `select_changed_titles(all_titles, manifest)`: incremental mode; keeps new pages and pages edited since the last run.
 - `extract_infobox(wikitext)`: isolates the infobox by counting `{{` / `}}` to handle nesting.
 - `get_all_page_titles(limit=500)`: paginates through `list=allpages` to collect titles (script uses `limit=50` by default).
 - `get_all_infobox_template_titles(limit=500)`: (optional) lists infobox templates via the `Infobox_templates` category.
 
 Input/Output
 - Input: no user input (limit parameter hard-coded, modifiable).
-- Output: `infobox_*.txt` files in `data/infoboxes/` + `infobox_log.txt` (OK / NO INFOBOX / NO WIKITEXT).
+- Output: `data/infoboxes/infoboxes.sqlite` corpus store (see `scripts/rdf/infobox_store.py`), or one
+  `infobox_*.txt` file per page when `USE_STORE = False`, + `infobox_log.txt` (OK / NO INFOBOX / NO WIKITEXT)
+  + `infobox_manifest.json` (revid, timestamp and file of every page, time of the last run).
 
 Requirements
 - Python 3.8+ and the `requests` package.
@@ -36,6 +46,10 @@ Usage
 Notes
 - Filenames are cleaned to avoid Windows errors (forbidden characters, reserved names like CON/PRN, trailing spaces/dots).
 - Infobox extraction accounts for nested braces; if no infobox is found, the log notes `NO INFOBOX`.
+- Incremental mode uses the manifest: pages edited since the last run are found with `list=recentchanges`
+  (or, if the last run is older than the recent changes retention, by comparing `prop=info` lastrevid),
+  and are re-downloaded into their existing file. Without a manifest, one is bootstrapped from the
+  existing files and those pages are refreshed once.
 - On HTTP error, the script prints the code and a response excerpt.
 """
 
@@ -47,6 +61,81 @@ WINDOWS_RESERVED_NAMES = {
 
 API = "https://tolkiengateway.net/w/api.php"
 
+INFOBOX_TEMPLATES = [
+    "Template:Actor",
+    "Template:Album",
+    "Template:Amonhen",
+    "Template:Arnorian infobox",
+    "Template:Artist infobox",
+    "Template:Audiobook infobox",
+    "Template:Author infobox",
+    "Template:Avar infobox",
+    "Template:Band",
+    "Template:Battle",
+    "Template:Beyondbree",
+    "Template:Board game infobox",
+    "Template:Book",
+    "Template:Campaign",
+    "Template:Chapter",
+    "Template:Collectible",
+    "Template:Collectible card",
+    "Template:Company infobox",
+    "Template:Convention",
+    "Template:Director",
+    "Template:Dragon infobox",
+    "Template:Druadan infobox",
+    "Template:Dwarves infobox",
+    "Template:Eagle infobox",
+    "Template:Easterling infobox",
+    "Template:Edain infobox",
+    "Template:Elves infobox",
+    "Template:Ent infobox",
+    "Template:Episode infobox",
+    "Template:Events",
+    "Template:Evil infobox",
+    "Template:Film infobox",
+    "Template:Gondorian infobox",
+    "Template:Half-elf infobox",
+    "Template:Infobox character",
+    "Template:Infobox",
+    "Template:Journal",
+    "Template:Kingdom",
+    "Template:Letter infobox",
+    "Template:Location infobox",
+    "Template:Maiar infobox",
+    "Template:Mallorn",
+    "Template:Men infobox",
+    "Template:Modernpeople infobox",
+    "Template:Mountain",
+    "Template:Mythlore",
+    "Template:Nandor infobox",
+    "Template:Noble House infobox",
+    "Template:Noldor infobox",
+    "Template:Northmen infobox",
+    "Template:Numenorean infobox",
+    "Template:Object infobox",
+    "Template:Organization infobox",
+    "Template:Other infobox",
+    "Template:People infobox",
+    "Template:Person infobox",
+    "Template:Plant infobox",
+    "Template:Poem infobox",
+    "Template:Puzzle infobox",
+    "Template:Race infobox",
+    "Template:Rohirrim infobox",
+    "Template:Scene",
+    "Template:SEVEN",
+    "Template:Sindar infobox",
+    "Template:Song",
+    "Template:User infobox",
+    "Template:Valar infobox",
+    "Template:Vanyar infobox",
+    "Template:Video game infobox",
+    "Template:VTbox",
+    "Template:War",
+    "Template:Website",
+]
+
 
 def safe_filename_from_title(title: str, max_length: int = 180) -> str:
     """Create a Windows-safe filename stem from a wiki page title."""
@@ -70,26 +159,90 @@ def safe_filename_from_title(title: str, max_length: int = 180) -> str:
 
     return stem
 
-def get_infobox_wikitext(page_title):
-    params = {
-        "action": "parse",
-        "page": page_title,
-        "prop": "wikitext",
-        "format": "json"
+
+def revisions_params(titles):
+    """Query parameters returning the current wikitext of up to BATCH_SIZE titles."""
+    return {
+        "action": "query",
+        "prop": "revisions",
+        "rvprop": "content|ids|timestamp",
+        "rvslots": "main",
+        "titles": "|".join(titles),
+        "format": "json",
     }
+
+
+def collect_revisions(data, wikitexts, aliases, revisions=None):
+    """
+    Merge one `prop=revisions` response into `wikitexts` ({requested title: wikitext}).
+    `aliases` maps normalized titles back to the titles that were requested.
+    If given, `revisions` receives {requested title: (revid, timestamp)}.
+    Missing pages are simply absent from the result.
+    """
+    query = data.get("query", {})
+    for item in query.get("normalized", []):
+        aliases[item["to"]] = item["from"]
+    for page in query.get("pages", {}).values():
+        page_revisions = page.get("revisions")
+        if not page_revisions:
+            continue
+        title = aliases.get(page["title"], page["title"])
+        slot = page_revisions[0].get("slots", {}).get("main", {})
+        text = slot.get("*", slot.get("content"))
+        if text is not None:
+            wikitexts[title] = text
+        if revisions is not None:
+            revisions[title] = (page_revisions[0].get("revid"), page_revisions[0].get("timestamp"))
+
+
+def get_wikitext_batch(titles, revisions=None):
+    """
+    Fetch the wikitext of several pages in one `action=query&prop=revisions` call
+    (following `continue` when the server splits large results).
+    Returns {title: wikitext}, or None on HTTP error; `revisions` (optional dict)
+    receives {title: (revid, timestamp)}.
+    """
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:132.0) Gecko/20100101 Firefox/132.0"
     }
-    resp = requests.get(API, params=params, headers=headers)
-    if resp.status_code != 200:
-        print(f"HTTP error: {resp.status_code}\nResponse text: {resp.text[:500]}")
-        return None
-    data = resp.json()
-    if "parse" in data and "wikitext" in data["parse"]:
-        return data["parse"]["wikitext"]["*"]
-    else:
-        print("No wikitext found in response:", data)
-        return None
+    wikitexts = {}
+    aliases = {}
+    cont = {}
+    while True:
+        params = revisions_params(titles)
+        params.update(cont)
+        resp = requests.get(API, params=params, headers=headers)
+        if resp.status_code != 200:
+            print(f"HTTP error: {resp.status_code}\nResponse text: {resp.text[:500]}")
+            return None
+        data = resp.json()
+        collect_revisions(data, wikitexts, aliases, revisions)
+        if "continue" in data:
+            cont = data["continue"]
+        else:
+            break
+    return wikitexts
+
+
+def query_all(params):
+    """Yield every response of a query, following `continue` tokens (stops on HTTP error)."""
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:132.0) Gecko/20100101 Firefox/132.0"
+    }
+    cont = {}
+    while True:
+        request_params = dict(params)
+        request_params.update(cont)
+        resp = requests.get(API, params=request_params, headers=headers)
+        if resp.status_code != 200:
+            print(f"HTTP error: {resp.status_code}\nResponse text: {resp.text[:500]}")
+            return
+        data = resp.json()
+        yield data
+        if "continue" not in data:
+            return
+        cont = data["continue"]
+
     
 def extract_infobox(wikitext):
     start = wikitext.lower().find('{{infobox')
@@ -120,16 +273,15 @@ def extract_section(wikitext, section_title="Other names"):
     return None
 
 
-def get_existing_titles_from_infoboxes(output_dir="data/infoboxes"):
+def get_existing_files_from_infoboxes(output_dir="data/infoboxes"):
     """
-    Extracts the titles of pages already downloaded.
+    Maps the titles of pages already downloaded to their file name.
     Extracts the title from the first line: --- Page Title ---
-    Useful for incremental mode.
     """
-    existing_titles = set()
+    existing_files = {}
     
     if not os.path.exists(output_dir):
-        return existing_titles
+        return existing_files
     
     for filename in os.listdir(output_dir):
         if filename.startswith("infobox_") and filename.endswith(".txt"):
@@ -139,11 +291,131 @@ def get_existing_titles_from_infoboxes(output_dir="data/infoboxes"):
                     first_line = f.readline().strip()
                     match = re.match(r"^---\s+(.+?)\s+---$", first_line)
                     if match:
-                        existing_titles.add(match.group(1))
+                        existing_files[match.group(1)] = filename
             except Exception as e:
                 print(f"Error reading {filepath}: {e}")
     
-    return existing_titles
+    return existing_files
+
+
+def get_existing_titles_from_infoboxes(output_dir="data/infoboxes"):
+    """
+    Extracts the titles of pages already downloaded (from the corpus store if present).
+    Useful for incremental mode.
+    """
+    if os.path.exists(store_path(output_dir)):
+        with InfoboxStore(store_path(output_dir)) as store:
+            return store.titles()
+    return set(get_existing_files_from_infoboxes(output_dir))
+
+
+MANIFEST_FILE = "infobox_manifest.json"
+
+
+def load_manifest(output_dir="data/infoboxes", store=None):
+    """
+    Load {"last_run": timestamp, "pages": {title: {"revid", "timestamp", "file"}}}.
+    Without a manifest, bootstrap one from the corpus store (revids known) or from
+    the files already on disk (revid unknown).
+    """
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if store is not None:
+        pages = {
+            title: {"revid": revid, "timestamp": timestamp, "file": None}
+            for title, (revid, timestamp) in store.revisions().items()
+        }
+        return {"last_run": store.get_meta("last_run"), "pages": pages}
+    pages = {
+        title: {"revid": None, "timestamp": None, "file": filename}
+        for title, filename in get_existing_files_from_infoboxes(output_dir).items()
+    }
+    return {"last_run": None, "pages": pages}
+
+
+def save_manifest(manifest, output_dir="data/infoboxes"):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def info_params(titles):
+    return {"action": "query", "prop": "info", "titles": "|".join(titles), "format": "json"}
+
+
+def collect_lastrevids(data, latest):
+    """Merge one `prop=info` response into `latest` ({requested title: lastrevid})."""
+    query = data.get("query", {})
+    aliases = {item["to"]: item["from"] for item in query.get("normalized", [])}
+    for page in query.get("pages", {}).values():
+        if "lastrevid" in page:
+            latest[aliases.get(page["title"], page["title"])] = page["lastrevid"]
+
+
+def plan_refresh(all_titles, manifest, changed=None, latest=None):
+    """
+    Titles to (re)download: pages absent from the manifest or without a known
+    revid, plus known pages listed in `changed` (recentchanges) or whose stored
+    revid differs from `latest` (prop=info).
+    """
+    pages = manifest.get("pages", {})
+    selected = []
+    for title in all_titles:
+        entry = pages.get(title)
+        if entry is None or entry.get("revid") is None:
+            selected.append(title)
+        elif changed is not None and title in changed:
+            selected.append(title)
+        elif latest is not None and latest.get(title, entry["revid"]) != entry["revid"]:
+            selected.append(title)
+    return selected
+
+
+def select_changed_titles(all_titles, manifest):
+    """Incremental mode: keep only new pages and pages edited since the last run."""
+    known = [t for t in all_titles if manifest["pages"].get(t, {}).get("revid") is not None]
+    if recent_changes_usable(manifest):
+        changed = set()
+        for data in query_all(recentchanges_params(manifest["last_run"])):
+            collect_recent_changes(data, changed)
+        selected = plan_refresh(all_titles, manifest, changed=changed)
+        method = f"recentchanges since {manifest['last_run']}"
+    else:
+        latest = {}
+        for start in range(0, len(known), BATCH_SIZE):
+            for data in query_all(info_params(known[start : start + BATCH_SIZE])):
+                collect_lastrevids(data, latest)
+        selected = plan_refresh(all_titles, manifest, latest=latest)
+        method = "prop=info lastrevid"
+    report_incremental(all_titles, known, selected, method)
+    return selected
+
+
+def report_incremental(all_titles, known, selected, method):
+    print(f"Incremental mode enabled ({method}):")
+    print(f"  • Pages to process initially:  {len(all_titles)}")
+    print(f"  • Pages already downloaded:    {len(known)}")
+    print(f"  • Pages to download:           {len(selected)}")
+
+
+def record_page(manifest, output_dir, title, status, filename, revision, store=None):
+    """Update the manifest after saving a page; drop the stale record if the infobox is gone."""
+    entry = manifest["pages"].setdefault(title, {"revid": None, "timestamp": None, "file": None})
+    if revision:
+        entry["revid"], entry["timestamp"] = revision
+    if status == "OK":
+        entry["file"] = os.path.basename(filename) if filename else None
+    elif store is not None:
+        store.remove(title, *(revision or (None, None)))
+    elif entry.get("file"):
+        stale = os.path.join(output_dir, entry["file"])
+        if os.path.exists(stale):
+            os.remove(stale)
+        entry["file"] = None
 
 
 def get_pages_from_category(category_name="Category:Characters", limit=500):
@@ -200,89 +472,13 @@ def get_pages_with_infobox(limit=500):
     """
     API = "https://tolkiengateway.net/w/api.php"
     
-    
-    infobox_templates = [
-        "Template:Actor",
-        "Template:Album",
-        "Template:Amonhen",
-        "Template:Arnorian infobox",
-        "Template:Artist infobox",
-        "Template:Audiobook infobox",
-        "Template:Author infobox",
-        "Template:Avar infobox",
-        "Template:Band",
-        "Template:Battle",
-        "Template:Beyondbree",
-        "Template:Board game infobox",
-        "Template:Book",
-        "Template:Campaign",
-        "Template:Chapter",
-        "Template:Collectible",
-        "Template:Collectible card",
-        "Template:Company infobox",
-        "Template:Convention",
-        "Template:Director",
-        "Template:Dragon infobox",
-        "Template:Druadan infobox",
-        "Template:Dwarves infobox",
-        "Template:Eagle infobox",
-        "Template:Easterling infobox",
-        "Template:Edain infobox",
-        "Template:Elves infobox",
-        "Template:Ent infobox",
-        "Template:Episode infobox",
-        "Template:Events",
-        "Template:Evil infobox",
-        "Template:Film infobox",
-        "Template:Gondorian infobox",
-        "Template:Half-elf infobox",
-        "Template:Infobox character",
-        "Template:Infobox",
-        "Template:Journal",
-        "Template:Kingdom",
-        "Template:Letter infobox",
-        "Template:Location infobox",
-        "Template:Maiar infobox",
-        "Template:Mallorn",
-        "Template:Men infobox",
-        "Template:Modernpeople infobox",
-        "Template:Mountain",
-        "Template:Mythlore",
-        "Template:Nandor infobox",
-        "Template:Noble House infobox",
-        "Template:Noldor infobox",
-        "Template:Northmen infobox",
-        "Template:Numenorean infobox",
-        "Template:Object infobox",
-        "Template:Organization infobox",
-        "Template:Other infobox",
-        "Template:People infobox",
-        "Template:Person infobox",
-        "Template:Plant infobox",
-        "Template:Poem infobox",
-        "Template:Puzzle infobox",
-        "Template:Race infobox",
-        "Template:Rohirrim infobox",
-        "Template:Scene",
-        "Template:SEVEN",
-        "Template:Sindar infobox",
-        "Template:Song",
-        "Template:User infobox",
-        "Template:Valar infobox",
-        "Template:Vanyar infobox",
-        "Template:Video game infobox",
-        "Template:VTbox",
-        "Template:War",
-        "Template:Website",
-    ]
-    
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:132.0) Gecko/20100101 Firefox/132.0"
     }
     
     all_titles = set() 
     
-    for template in infobox_templates:
+    for template in INFOBOX_TEMPLATES:
         print(f"Fetching pages using {template}...")
         params = {
             "action": "query",
@@ -388,80 +584,149 @@ def get_all_infobox_template_titles(limit=500):
     return titles
 
 
-output_dir = "data/infoboxes"
-os.makedirs(output_dir, exist_ok=True)
+def format_infobox_record(title, infobox, other_names_section=None):
+    """Text of one corpus record: title line, infobox, optional "Other names" section."""
+    record = f"--- {title} ---\n{infobox}\n"
+    if other_names_section:
+        record += f"\n--- Other names (section) ---\n{other_names_section}\n"
+    return record
+
+
+def save_infobox(output_dir, title, wikitext, log, filename=None, store=None, revision=None):
+    """
+    Extract the infobox (and "Other names" section) from a page's wikitext and
+    append it to the corpus `store`, or write it to `filename` (a refreshed page
+    keeps its file) or a new `infobox_<title>.txt`. Logs and returns
+    (status, path written), status being OK, NO INFOBOX or NO WIKITEXT.
+    """
+    if not wikitext:
+        print(f"No wikitext found for '{title}'")
+        log.write(f"NO WIKITEXT: {title}\n")
+        return "NO WIKITEXT", None
+
+    infobox = extract_infobox(wikitext)
+    if not infobox:
+        print(f"No infobox found for '{title}'")
+        log.write(f"NO INFOBOX: {title}\n")
+        return "NO INFOBOX", None
+
+    other_names_section = extract_section(wikitext, "Other names")
+    record = format_infobox_record(title, infobox, other_names_section)
+
+    if store is not None:
+        changed = store.append(title, record, *(revision or (None, None)))
+        print(f"Stored infobox for '{title}'" + ("" if changed else " (unchanged)"))
+        log.write(f"OK: {title} -> store\n")
+        return "OK", None
+
+    if filename is None:
+        base = safe_filename_from_title(title)
+        filename = os.path.join(output_dir, f"infobox_{base}.txt")
+
+        if os.path.exists(filename):
+            suffix = 2
+            while True:
+                candidate = os.path.join(output_dir, f"infobox_{base}_{suffix}.txt")
+                if not os.path.exists(candidate):
+                    filename = candidate
+                    break
+                suffix += 1
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(record)
+    print(f"Saved infobox for '{title}' to {filename}")
+    log.write(f"OK: {title} -> {os.path.basename(filename)}\n")
+    return "OK", filename
+
+
+def known_file(manifest, output_dir, title):
+    entry = manifest["pages"].get(title)
+    if entry and entry.get("file"):
+        return os.path.join(output_dir, entry["file"])
+    return None
+
+
+OUTPUT_DIR = "data/infoboxes"
+MODE = 2
+INCREMENTAL = True
+BATCH_SIZE = 50  # MediaWiki limit for titles= per query (non-bot accounts)
+USE_STORE = True  # Write to data/infoboxes/infoboxes.sqlite instead of one .txt per page
+
+
+def open_store(output_dir=OUTPUT_DIR):
+    return open_corpus_store(output_dir) if USE_STORE else None
 
-MODE = 2  
-INCREMENTAL = True 
-start_time = time.time()
 
-if MODE == 1:
-    print("MODE 1: Fetching pages from Characters category...")
-    all_titles = get_pages_from_category("Category:Characters", limit=500)
-elif MODE == 2:
-    print("MODE 2: Fetching pages with infobox templates...")
-    all_titles = get_pages_with_infobox(limit=500)
-else:
+def select_titles(mode=MODE):
+    if mode == 1:
+        print("MODE 1: Fetching pages from Characters category...")
+        return get_pages_from_category("Category:Characters", limit=500)
+    if mode == 2:
+        print("MODE 2: Fetching pages with infobox templates...")
+        return get_pages_with_infobox(limit=500)
     print("MODE 3: Fetching all pages (not recommended)...")
-    all_titles = get_all_page_titles(limit=50)
-
-if INCREMENTAL:
-    existing_titles = get_existing_titles_from_infoboxes(output_dir)
-    initial_count = len(all_titles)
-    all_titles = [t for t in all_titles if t not in existing_titles]
-    skipped_count = initial_count - len(all_titles)
-    print(f"Incremental mode enabled:")
-    print(f"  • Pages to process initially:  {initial_count}")
-    print(f"  • Pages already downloaded:    {skipped_count}")
-    print(f"  • Pages to download:           {len(all_titles)}")
-else:
-    print("Incremental mode disabled: all pages will be processed")
-
-print(f"Found {len(all_titles)} pages to process.")
-
-log_file = os.path.join(output_dir, "infobox_log.txt")
-with open(log_file, "a", encoding="utf-8") as log: 
-    log.write(f"\n\n===== Session started at {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
-    log.write(f"Mode: {MODE}, Incremental: {INCREMENTAL}\n")
-    
-    for idx, title in enumerate(all_titles, 1):
-        print(f"Processing {idx}/{len(all_titles)}: {title}")
-        wikitext = get_infobox_wikitext(title)
-        if wikitext:
-            infobox = extract_infobox(wikitext)
-            if infobox:
-                base = safe_filename_from_title(title)
-                filename = os.path.join(output_dir, f"infobox_{base}.txt")
-
-                if os.path.exists(filename):
-                    suffix = 2
-                    while True:
-                        candidate = os.path.join(output_dir, f"infobox_{base}_{suffix}.txt")
-                        if not os.path.exists(candidate):
-                            filename = candidate
-                            break
-                        suffix += 1
-
-                other_names_section = extract_section(wikitext, "Other names")
-
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(f"--- {title} ---\n{infobox}\n")
-                    if other_names_section:
-                        f.write("\n--- Other names (section) ---\n")
-                        f.write(other_names_section)
-                        f.write("\n")
-                print(f"Saved infobox for '{title}' to {filename}")
-                log.write(f"OK: {title} -> {os.path.basename(filename)}\n")
-            else:
-                print(f"No infobox found for '{title}'")
-                log.write(f"NO INFOBOX: {title}\n")
-        else:
-            print(f"No wikitext found for '{title}'")
-            log.write(f"NO WIKITEXT: {title}\n")
-    
-    end_time = time.time()
-    duration = end_time - start_time
-    log.write(f"Session completed in {duration:.2f} seconds\n")
+    return get_all_page_titles(limit=50)
+
 
-print(f"Finished processing {len(all_titles)} pages in {end_time - start_time:.2f} seconds.")
+def main():
+    output_dir = OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    start_time = time.time()
+    run_started = utc_timestamp()
+    store = open_store(output_dir)
+    manifest = load_manifest(output_dir, store)
 
+    all_titles = select_titles(MODE)
+
+    if INCREMENTAL:
+        all_titles = select_changed_titles(all_titles, manifest)
+    else:
+        print("Incremental mode disabled: all pages will be processed")
+
+    print(f"Found {len(all_titles)} pages to process.")
+
+    log_file = os.path.join(output_dir, "infobox_log.txt")
+    with open(log_file, "a", encoding="utf-8") as log:
+        log.write(f"\n\n===== Session started at {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
+        log.write(f"Mode: {MODE}, Incremental: {INCREMENTAL}\n")
+
+        failed = False
+        for start in range(0, len(all_titles), BATCH_SIZE):
+            batch = all_titles[start : start + BATCH_SIZE]
+            print(f"Processing {start + 1}-{start + len(batch)}/{len(all_titles)}")
+            revisions = {}
+            wikitexts = get_wikitext_batch(batch, revisions)
+            if wikitexts is None:
+                failed = True
+                for title in batch:
+                    log.write(f"FAILED: {title}\n")
+                continue
+            for title in batch:
+                revision = revisions.get(title)
+                status, filename = save_infobox(
+                    output_dir, title, wikitexts.get(title), log,
+                    known_file(manifest, output_dir, title), store, revision,
+                )
+                record_page(manifest, output_dir, title, status, filename, revision, store)
+            if store is not None:
+                store.commit()
+            save_manifest(manifest, output_dir)
+
+        if not failed:
+            # A failed batch may hide edited pages: keep the previous start point.
+            manifest["last_run"] = run_started
+            if store is not None:
+                store.set_meta("last_run", run_started)
+        save_manifest(manifest, output_dir)
+        if store is not None:
+            store.close()
+
+        end_time = time.time()
+        duration = end_time - start_time
+        log.write(f"Session completed in {duration:.2f} seconds\n")
+
+    print(f"Finished processing {len(all_titles)} pages in {end_time - start_time:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,163 @@
 """
 Tolkien Knowledge Graph - Web Interface Launcher
 Start the FastAPI application with the web interface.
+
+Production mode (default): WORKERS worker processes, each recycled gracefully
+after about MAX_REQUESTS requests (with jitter, so they do not all restart at
+once, under gunicorn and uvicorn versions with limit_max_requests_jitter) and
+replaced when it dies. When gunicorn is installed (Linux/Mac), the
+application and its shared KG index (web/kg_index.py) are loaded once in the
+master process and the workers are forked from it, sharing the index
+copy-on-write; otherwise uvicorn starts the workers and each one loads the
+index itself. The same goes for the cache warm-up (web/warmup.py): the
+--warmup most popular pages (by incoming links in kg_full.ttl, or from
+--access-log) are rendered before the workers start serving. Either way a
+worker answers GET /ready with 503 until its index is loaded and its caches
+are warm.
+
+Development mode (--reload): a single process restarted on code changes.
+
+Usage: python scripts/setup/run_web.py [--reload] [--host HOST] [--port PORT] [--workers N]
+                                      [--warmup N] [--access-log FILE]
 """
+import argparse
+import gc
+import inspect
+import os
 import sys
 from pathlib import Path
 
 import uvicorn
 
-if __name__ == "__main__":
+HOST = "tolkien-kg.org"
+PORT = 80
+WORKERS = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+MAX_REQUESTS = 1000
+MAX_REQUESTS_JITTER = 100
+GRACEFUL_TIMEOUT = 30
+WARMUP_TOP_N = 200
+
+APP = "web.main:app"
+
+project_root = Path(__file__).resolve().parents[2]
+
+
+def run_gunicorn(args) -> bool:
+    """Serves with gunicorn (preloaded app, forked uvicorn workers); False if gunicorn is not installed."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+
+    from web import startup
+    from web.main import app, render_page
+
+    # Loaded and warmed before fork so the workers share it; on failure each worker retries on its own.
+    startup.prepare(render_page)
+    gc.freeze()
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("max_requests", args.max_requests)
+            self.cfg.set("max_requests_jitter", MAX_REQUESTS_JITTER)
+            self.cfg.set("graceful_timeout", GRACEFUL_TIMEOUT)
+            self.cfg.set("loglevel", "info")
+
+        def load(self):
+            return app
+
+    PreloadedApplication().run()
+    return True
+
+
+def run_uvicorn(args):
+    options = {}
+    # limit_max_requests_jitter is missing from older uvicorn releases (the pinned 0.38.0 among them)
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.run).parameters:
+        options["limit_max_requests_jitter"] = MAX_REQUESTS_JITTER
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        limit_max_requests=args.max_requests,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        log_level="info",
+        app_dir=str(project_root),
+        **options,
+    )
+
+
+def run_reload(args):
+    uvicorn.run(
+        APP,
+        host=args.host,
+        port=args.port,
+        reload=True,
+        log_level="info",
+        app_dir=str(project_root),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Start the Tolkien KG web interface.")
+    parser.add_argument("--reload", action="store_true", help="development mode: one process, restarted on code changes")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"worker processes (default {WORKERS}, env WEB_WORKERS)")
+    parser.add_argument("--max-requests", type=int, default=MAX_REQUESTS, help="requests served before a worker is recycled")
+    parser.add_argument(
+        "--warmup", type=int, default=int(os.environ.get("WEB_WARMUP_TOP_N", WARMUP_TOP_N)),
+        help=f"pages rendered into the caches at startup, 0 to disable (default {WARMUP_TOP_N}, env WEB_WARMUP_TOP_N)",
+    )
+    parser.add_argument("--access-log", default=os.environ.get("WEB_ACCESS_LOG"), help="rank the warm-up pages by this access log")
+    args = parser.parse_args(argv)
+
+    # Read by web/warmup.py, in this process and in the workers it starts.
+    os.environ["WEB_WARMUP_TOP_N"] = str(args.warmup)
+    if args.access_log:
+        os.environ["WEB_ACCESS_LOG"] = args.access_log
+
+    mode = "Development (reload, 1 process)" if args.reload else f"Production ({args.workers} workers)"
+    base_url = f"http://{args.host}" if args.port == 80 else f"http://{args.host}:{args.port}"
     print(
-        """
+        f"""
     ===============================================
       Tolkien Knowledge Graph - Web Interface
 
       Configuration:
-      - Host: tolkien-kg.org
-      - Port: 80
-      - Reload: Enabled (detects changes)
+      - Host: {args.host}
+      - Port: {args.port}
+      - Mode: {mode}
+      - Warm-up: {args.warmup} pages
 
       URLs:
-      - Home:        http://tolkien-kg.org/
-      - Browse:      http://tolkien-kg.org/browse
-      - API Docs:    http://tolkien-kg.org/docs
-      - ReDoc:       http://tolkien-kg.org/redoc
+      - Home:        {base_url}/
+      - Browse:      {base_url}/browse
+      - API Docs:    {base_url}/docs
+      - ReDoc:       {base_url}/redoc
+      - Readiness:   {base_url}/ready
 
       Press Ctrl+C to stop
     ===============================================
     """
     )
 
-    project_root = Path(__file__).resolve().parents[2]
     sys.path.insert(0, str(project_root))
 
     try:
-        uvicorn.run(
-            "web.main:app",
-            host="tolkien-kg.org",
-            port=80,
-            reload=True,
-            log_level="info",
-            app_dir=str(project_root),
-        )
+        if args.reload:
+            run_reload(args)
+        elif not run_gunicorn(args):
+            run_uvicorn(args)
     except KeyboardInterrupt:
         print("\n\nApplication stopped cleanly")
         sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# The scripts import their sibling modules by name, as when run from their directory.
+for path in (ROOT / "scripts" / "rdf", ROOT / "scripts" / "run_once" / "ApiRequestData", ROOT / "scripts" / "setup",
+             ROOT / "tests"):
+    sys.path.insert(0, str(path))
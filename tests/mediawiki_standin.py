@@ -0,0 +1,191 @@
+"""
+Local stand-in for a MediaWiki action API (tolkiengateway.net, lotr.fandom.com).
+Serves canned pages from memory on a background http.server thread:
+    - list=allpages / categorymembers / embeddedin / recentchanges, PAGE_SIZE
+      titles per response with `continue` tokens
+    - prop=revisions, at most REVISIONS_PER_RESPONSE pages per response with
+      `rvcontinue`
+    - prop=langlinks|info and prop=info, with normalized titles, redirects,
+      missing pages and `llcontinue` after LANGLINKS_PER_RESPONSE links
+Faults are injected with inject(): an HTTP status with Retry-After (429, 503,
+500), a maxlag error or a non-JSON body, for the next `times` requests
+matching a predicate. Every request is recorded in `requests`.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+PAGE_SIZE = 2
+REVISIONS_PER_RESPONSE = 2
+LANGLINKS_PER_RESPONSE = 3
+
+_LIST_PREFIXES = {"allpages": "ap", "categorymembers": "cm", "embeddedin": "ei", "recentchanges": "rc"}
+
+
+class MediaWikiStandIn:
+    """In-memory wiki: {title: {"revid", "timestamp", "touched", "wikitext", "langlinks"}}."""
+
+    def __init__(self, pages=None, redirects=None):
+        self.pages = dict(pages or {})
+        self.redirects = dict(redirects or {})
+        self.recent_changes = []
+        self.requests = []
+        self._faults = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    # --- setup -------------------------------------------------------------
+
+    def add_page(self, title, wikitext="", revid=1, timestamp="2024-01-01T00:00:00Z",
+                 touched="2024-01-01T00:00:00Z", langlinks=()):
+        self.pages[title] = {
+            "revid": revid, "timestamp": timestamp, "touched": touched,
+            "wikitext": wikitext, "langlinks": list(langlinks),
+        }
+
+    def inject(self, status=200, body=None, headers=None, times=1, when=None):
+        """The next `times` requests whose params satisfy `when` get this response instead."""
+        with self._lock:
+            self._faults.append({"status": status, "body": body, "headers": headers or {},
+                                 "times": times, "when": when or (lambda params: True)})
+
+    def clear_faults(self):
+        with self._lock:
+            self._faults.clear()
+
+    def requests_for(self, **match) -> list:
+        """Recorded requests whose params contain every key/value of `match`."""
+        return [params for params in self.requests if all(params.get(k) == v for k, v in match.items())]
+
+    def requested_titles(self, **match) -> list:
+        titles = []
+        for params in self.requests_for(**match):
+            titles.extend(params.get("titles", "").split("|") if params.get("titles") else [])
+        return titles
+
+    # --- server ------------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api.php"
+
+    def start(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True))
+                status, body, headers = standin.respond(params)
+                payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html" if isinstance(body, str) else "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- API ---------------------------------------------------------------
+
+    def respond(self, params: dict):
+        with self._lock:
+            self.requests.append(params)
+            for fault in self._faults:
+                if fault["times"] > 0 and fault["when"](params):
+                    fault["times"] -= 1
+                    body = fault["body"] if fault["body"] is not None else {"error": {"code": "http"}}
+                    return fault["status"], body, fault["headers"]
+        if params.get("action") != "query":
+            return 200, {"error": {"code": "badvalue", "info": "only action=query"}}, {}
+        if params.get("list"):
+            return 200, self._list(params), {}
+        return 200, self._prop(params), {}
+
+    def _list(self, params: dict) -> dict:
+        name = params["list"]
+        prefix = _LIST_PREFIXES[name]
+        if name == "recentchanges":
+            titles = list(self.recent_changes)
+        else:
+            titles = sorted(self.pages)
+        offset = int(params.get(f"{prefix}continue", 0))
+        data = {"query": {name: [{"ns": 0, "title": t} for t in titles[offset : offset + PAGE_SIZE]]}}
+        if offset + PAGE_SIZE < len(titles):
+            data["continue"] = {f"{prefix}continue": str(offset + PAGE_SIZE), "continue": "-||"}
+        return data
+
+    def _resolve(self, titles, follow_redirects: bool) -> tuple:
+        normalized, redirects, resolved = [], [], []
+        for title in titles:
+            page = title
+            if page[:1].islower():
+                page = page[:1].upper() + page[1:]
+                normalized.append({"from": title, "to": page})
+            if follow_redirects and page in self.redirects:
+                redirects.append({"from": page, "to": self.redirects[page]})
+                page = self.redirects[page]
+            resolved.append(page)
+        return normalized, redirects, resolved
+
+    def _prop(self, params: dict) -> dict:
+        props = params.get("prop", "").split("|")
+        titles = params.get("titles", "").split("|") if params.get("titles") else []
+        normalized, redirects, resolved = self._resolve(titles, "redirects" in params)
+        pages = {}
+        missing_id = -1
+        for title in dict.fromkeys(resolved):
+            page = self.pages.get(title)
+            if page is None:
+                pages[str(missing_id)] = {"ns": 0, "title": title, "missing": ""}
+                missing_id -= 1
+                continue
+            entry = {"pageid": abs(hash(title)) % 10**6, "ns": 0, "title": title}
+            if "info" in props:
+                entry.update(touched=page["touched"], lastrevid=page["revid"])
+            pages[entry["pageid"]] = entry
+
+        data = {"query": {"pages": {str(k): v for k, v in pages.items()}}}
+        if normalized:
+            data["query"]["normalized"] = normalized
+        if redirects:
+            data["query"]["redirects"] = redirects
+
+        existing = [p for p in data["query"]["pages"].values() if "missing" not in p]
+        if "revisions" in props:
+            offset = int(params.get("rvcontinue", 0))
+            for entry in existing[offset : offset + REVISIONS_PER_RESPONSE]:
+                page = self.pages[entry["title"]]
+                entry["revisions"] = [{
+                    "revid": page["revid"], "timestamp": page["timestamp"],
+                    "slots": {"main": {"contentmodel": "wikitext", "*": page["wikitext"]}},
+                }]
+            if offset + REVISIONS_PER_RESPONSE < len(existing):
+                data["continue"] = {"rvcontinue": str(offset + REVISIONS_PER_RESPONSE), "continue": "||"}
+        if "langlinks" in props:
+            links = [(entry, lang, value) for entry in existing for lang, value in self.pages[entry["title"]]["langlinks"]]
+            offset = int(params.get("llcontinue", 0))
+            for entry, lang, value in links[offset : offset + LANGLINKS_PER_RESPONSE]:
+                entry.setdefault("langlinks", []).append({"lang": lang, "*": value})
+            if offset + LANGLINKS_PER_RESPONSE < len(links):
+                data["continue"] = {"llcontinue": str(offset + LANGLINKS_PER_RESPONSE), "continue": "||"}
+        return data
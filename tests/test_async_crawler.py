@@ -0,0 +1,144 @@
+"""async_crawler.py against the local stand-in MediaWiki API: continuation, throttling and resume."""
+
+import asyncio
+import io
+import os
+import time
+
+import pytest
+
+import async_crawler
+from async_crawler import CHECKPOINT_FILE, CrawlCheckpoint, crawl, get_wikitext_batch, run, select_titles
+from infobox_store import InfoboxStore, store_path
+from mediawiki_client import MediaWikiClient
+from mediawiki_standin import MediaWikiStandIn
+
+TITLES = ["Aragorn", "Arwen", "Boromir", "Frodo Baggins", "Gimli", "Legolas", "The Shire"]
+
+
+def infobox(title):
+    return f"{{{{Infobox character\n| name = {title}\n| race = Men\n}}}}\n'''{title}''' is a character."
+
+
+@pytest.fixture
+def wiki():
+    standin = MediaWikiStandIn()
+    for revid, title in enumerate(TITLES, start=100):
+        standin.add_page(title, "A region of Eriador." if title == "The Shire" else infobox(title), revid=revid)
+    with standin:
+        yield standin
+
+
+def fast_client(wiki, **kwargs):
+    return MediaWikiClient(wiki.url, **{"rate": 1000.0, "burst": 100, **kwargs})
+
+
+def test_list_follows_continue(wiki):
+    async def main():
+        client = fast_client(wiki)
+        try:
+            return await select_titles(client, mode=3)
+        finally:
+            client.close()
+
+    assert asyncio.run(main()) == TITLES
+    assert len(wiki.requests_for(list="allpages")) == 4
+
+
+def test_wikitext_batch_follows_rvcontinue(wiki):
+    async def main():
+        client = fast_client(wiki)
+        try:
+            revisions = {}
+            return await get_wikitext_batch(client, ["aragorn", "Boromir", "Gimli", "Legolas", "Sauron"], revisions), revisions
+        finally:
+            client.close()
+
+    wikitexts, revisions = asyncio.run(main())
+    assert sorted(wikitexts) == ["Boromir", "Gimli", "Legolas", "aragorn"]
+    assert wikitexts["aragorn"] == infobox("Aragorn")
+    assert revisions["Gimli"] == (104, "2024-01-01T00:00:00Z")
+    assert len(wiki.requests_for(prop="revisions")) == 2
+
+
+def test_retry_after_maxlag_and_invalid_json(wiki):
+    wiki.inject(body="<html>Service temporarily unavailable</html>")
+    wiki.inject(status=429, headers={"Retry-After": "1"})
+    wiki.inject(body={"error": {"code": "maxlag", "info": "Waiting for a database server"}}, headers={"Retry-After": "0"})
+
+    async def main():
+        client = fast_client(wiki)
+        try:
+            started = time.monotonic()
+            wikitexts = await get_wikitext_batch(client, ["Arwen"])
+            return wikitexts, time.monotonic() - started, client.requests_sent
+        finally:
+            client.close()
+
+    wikitexts, elapsed, sent = asyncio.run(main())
+    assert wikitexts == {"Arwen": infobox("Arwen")}
+    assert elapsed >= 2.0  # 1s backoff after the invalid body, then paused for Retry-After
+    assert sent == 4
+
+
+def test_token_bucket_limits_rate(wiki):
+    async def main():
+        client = fast_client(wiki, rate=20.0, burst=1)
+        try:
+            started = time.monotonic()
+            await asyncio.gather(*(client.get({"action": "query", "list": "allpages"}) for _ in range(6)))
+            return time.monotonic() - started
+        finally:
+            client.close()
+
+    assert asyncio.run(main()) >= 5 / 20.0 * 0.9
+
+
+def test_failed_batch_is_resumed(wiki, tmp_path, monkeypatch):
+    monkeypatch.setattr(async_crawler, "BATCH_SIZE", 2)
+    output_dir = str(tmp_path)
+    wiki.inject(status=500, times=100, when=lambda params: "Gimli" in params.get("titles", ""))
+
+    asyncio.run(run(output_dir=output_dir, mode=3, incremental=False, api_url=wiki.url))
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+    assert os.path.exists(checkpoint_path)  # kept: Gimli's batch failed
+    assert "Gimli" not in CrawlCheckpoint(checkpoint_path).done
+    with InfoboxStore(store_path(output_dir)) as store:
+        assert store.titles() == {"Aragorn", "Arwen", "Boromir", "Frodo Baggins"}
+
+    wiki.clear_faults()
+    wiki.requests.clear()
+    asyncio.run(run(output_dir=output_dir, mode=3, incremental=False, api_url=wiki.url))
+    assert sorted(wiki.requested_titles(prop="revisions")) == ["Gimli", "Legolas"]
+    assert not os.path.exists(checkpoint_path)
+    with InfoboxStore(store_path(output_dir)) as store:
+        assert store.titles() == set(TITLES) - {"The Shire"}
+
+
+def test_worker_error_is_raised_after_drain(wiki, tmp_path, monkeypatch):
+    monkeypatch.setattr(async_crawler, "BATCH_SIZE", 2)
+    save_infobox = async_crawler.save_infobox
+
+    def failing_save(output_dir, title, *args):
+        if title == "Boromir":
+            raise OSError("disk full")
+        return save_infobox(output_dir, title, *args)
+
+    monkeypatch.setattr(async_crawler, "save_infobox", failing_save)
+    checkpoint = CrawlCheckpoint(str(tmp_path / CHECKPOINT_FILE))
+    manifest = {"last_run": None, "pages": {}}
+
+    async def main():
+        client = fast_client(wiki)
+        try:
+            await asyncio.wait_for(
+                crawl(client, TITLES, str(tmp_path), checkpoint, io.StringIO(), manifest, workers=2), timeout=30
+            )
+        finally:
+            client.close()
+
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(main())
+    checkpoint.close(False)
+    # Every other batch was still processed; Boromir's batch (Boromir, Frodo Baggins) was not checkpointed.
+    assert checkpoint.done == set(TITLES) - {"Boromir", "Frodo Baggins"}
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import card_stream
+from card_stream import image_base_url, iter_cards
+
+CARDS = {
+    "AS": {
+        "id": "AS", "name": "Against the Shadow",
+        "imageBaseUrl": {"en": "https://example.org/as/"},
+        "cards": {"AS-1": {"id": "AS-1", "name": {"en": "Annalena"}}, "AS-2": {"id": "AS-2", "name": {"en": "Ioreth"}}},
+        "order": 1,
+    },
+    "LE": {
+        "id": "LE", "name": "The Lidless Eye",
+        "cards": {"LE-1": {"id": "LE-1", "name": {"en": "Adûnaphel"}}, "LE-2": "not a card"},
+        "imageBaseUrl": {"fr": "https://example.org/le-fr/"},
+    },
+    "notes": "not a set",
+}
+
+
+@pytest.fixture
+def cards_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(card_stream, "CHUNK_SIZE", 7)  # values and keys cross chunk boundaries
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(CARDS, ensure_ascii=False, indent=1), encoding="utf-8")
+    return str(path)
+
+
+def test_cards_in_file_order(cards_file):
+    assert [(card_set["id"], card_id) for card_set, card_id, _card in iter_cards(cards_file)] == [
+        ("AS", "AS-1"), ("AS", "AS-2"), ("LE", "LE-1"),
+    ]
+
+
+def test_image_base_url_after_cards(cards_file):
+    urls = {card_id: image_base_url(card_set) for card_set, card_id, _card in iter_cards(cards_file)}
+    assert urls == {"AS-1": "https://example.org/as/", "AS-2": "https://example.org/as/", "LE-1": "https://example.org/le-fr/"}
+
+
+def test_same_set_object_per_set(cards_file):
+    sets = [card_set for card_set, _card_id, _card in iter_cards(cards_file)]
+    assert sets[0] is sets[1] and sets[1] is not sets[2]
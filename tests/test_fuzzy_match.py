@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+from rdflib import Graph
+
+import integrate_external_data
+from fuzzy_match import EXACT, FUZZY, FuzzyMatcher, Match, accepted
+from label_index import build_label_index
+
+KG_FULL = Path(__file__).resolve().parents[1] / "data" / "rdf" / "kg_full.ttl"
+RESOURCE = "http://tolkien-kg.org/resource/"
+
+# Wrong links the matcher made on the shipped data: CSV rows and card names whose extra words name
+# another subject than the KG label they contain.
+FALSE_POSITIVES = [
+    ("Finduilas of Dol Amroth", "Finduilas"),
+    ("Adrahil I", "Adrahil"),
+    ("Adrahil II", "Adrahil"),
+    ("Náin (father of Dáin II Ironfoot)", "Nain_II"),
+    ("Ecthelion of the Fountain", "Ecthelion"),
+    ("Ruffian Leader", "Ruffians"),
+    ("Beleg of Arnor", "Beleg"),
+    ("Eärendur of Númenor", "Earendur_King_of_Arnor"),
+    ("Pippin Gamgee", "Pippin"),
+    ("Hilda Brandybuck", "Hild"),
+    ("Black Trolls", "Trolls"),
+    ("Mordor in Arms", "Mordor"),
+    ("Elves upon Errantry", "Elves"),
+    ("Lindion the Oronín", "Lindon"),
+    ("Andrast Coast", "Andraste"),
+    ("Master of the House", "Master"),
+    ("Wizard’s Fire", "Wizards"),
+    ("Dagorlad", "Battle_of_Dagorlad"),
+    ("Plateau", "Plateau_of_Gorgoroth"),
+    ("in (King of Durin's Folk)", "King_of_Durins_Folk"),
+]
+
+CSV_MATCHES = [
+    ("Camellia (Sackville) Baggins", "Camellia_Sackville"),
+    ("Boromir (Steward)", "Boromir_Steward_of_Gondor"),
+    ("Eärendur of Arnor", "Earendur_King_of_Arnor"),
+    ("Dáin II Ironfoot", "Dain_Ironfoot"),
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    # the build matches against the infobox resources only, so the card IRIs of kg_full are left out
+    labels = build_label_index(Graph().parse(KG_FULL))
+    resources = {}
+    for label, subjects in labels.items():
+        subjects = {s for s in subjects if str(s).startswith(RESOURCE)}
+        if subjects:
+            resources[label] = subjects
+    return FuzzyMatcher(resources)
+
+
+@pytest.mark.parametrize("name, wrong", FALSE_POSITIVES)
+def test_false_positives_are_rejected(matcher, name, wrong):
+    m = matcher.match(name)
+    assert not (accepted(m) and str(m.uri) == RESOURCE + wrong), m
+
+
+@pytest.mark.parametrize("name, local", CSV_MATCHES)
+def test_label_missing_a_qualifier_or_surname(matcher, name, local):
+    m = matcher.match(name)
+    assert m.status == FUZZY and str(m.uri) == RESOURCE + local, m
+
+
+def test_containment_alone_stays_below_threshold(matcher):
+    assert matcher.score("adrahil i", "adrahil", matcher.head("Adrahil I")) < matcher.threshold
+
+
+def test_fuzzy_matches_are_report_only(monkeypatch):
+    m = Match("Gandalf the Grey", FUZZY, 0.9, "gandalf", RESOURCE + "Gandalf", None)
+    monkeypatch.setattr(integrate_external_data, "fuzzy_accepts", set())
+    assert integrate_external_data.is_linked(Match("Gandalf", EXACT, 1.0, "gandalf", RESOURCE + "Gandalf", None))
+    assert not integrate_external_data.is_linked(m)
+    monkeypatch.setattr(integrate_external_data, "fuzzy_accepts", {("Gandalf the Grey", RESOURCE + "Gandalf")})
+    assert integrate_external_data.is_linked(m)
+
+
+def test_accept_list_reads_report_rows(tmp_path):
+    path = tmp_path / "fuzzy_accept.csv"
+    path.write_text(
+        "source,record,name,status,score,runner_up,label,uri,linked\n"
+        f"csv,12,Boromir (Steward),fuzzy,0.932,0.704,boromir steward of gondor,{RESOURCE}Boromir_Steward_of_Gondor,no\n",
+        encoding="utf-8",
+    )
+    assert integrate_external_data.load_fuzzy_accepts(path) == {("Boromir (Steward)", RESOURCE + "Boromir_Steward_of_Gondor")}
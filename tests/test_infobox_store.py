@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import requestAllInfobox as crawler
+from infobox_store import FILES_IMPORTED, InfoboxStore, iter_infobox_texts, store_path
+from mediawiki_client import utc_timestamp
+from mediawiki_standin import MediaWikiStandIn
+
+PAGES = {
+    "Aragorn": "{{Infobox character\n| name = Aragorn\n| race = Men\n}}",
+    "Bilbo Baggins": "{{Infobox character\n| name = Bilbo Baggins\n| race = Hobbits\n}}",
+    "Frodo Baggins": "{{Infobox character\n| name = Frodo Baggins\n| race = Hobbits\n}}",
+}
+EDITED = "{{Infobox character\n| name = Aragorn II\n| race = Men\n}}"
+
+
+def write_files_checkout(directory):
+    """A checkout of the .txt corpus with its files-mode manifest."""
+    pages = {}
+    for revid, (title, infobox) in enumerate(sorted(PAGES.items()), start=1):
+        filename = f"infobox_{title.replace(' ', '_')}.txt"
+        (directory / filename).write_text(crawler.format_infobox_record(title, infobox), encoding="utf-8")
+        pages[title] = {"revid": revid, "timestamp": "2024-01-01T00:00:00Z", "file": filename}
+    manifest = {"last_run": utc_timestamp(), "pages": pages}
+    (directory / crawler.MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+
+
+def records(directory) -> dict:
+    return {text.split("\n", 1)[0]: text for _key, text in iter_infobox_texts(str(directory))}
+
+
+def test_incremental_crawl_upgrading_a_files_checkout_keeps_unchanged_pages(tmp_path, monkeypatch):
+    write_files_checkout(tmp_path)
+    with MediaWikiStandIn() as wiki:
+        for revid, (title, infobox) in enumerate(sorted(PAGES.items()), start=1):
+            wiki.add_page(title, infobox, revid=revid)
+        wiki.add_page("Aragorn", EDITED, revid=10)
+        wiki.recent_changes = ["Aragorn"]
+        monkeypatch.setattr(crawler, "API", wiki.url)
+        monkeypatch.setattr(crawler, "OUTPUT_DIR", str(tmp_path))
+        monkeypatch.setattr(crawler, "select_titles", lambda mode=None: sorted(PAGES))
+        crawler.main()
+
+        assert wiki.requested_titles(prop="revisions") == ["Aragorn"]
+
+    found = records(tmp_path)
+    assert sorted(found) == ["--- Aragorn ---", "--- Bilbo Baggins ---", "--- Frodo Baggins ---"]
+    assert "Aragorn II" in found["--- Aragorn ---"]
+    with InfoboxStore(store_path(str(tmp_path))) as store:
+        assert store.count() == 3 and store.get_meta(FILES_IMPORTED)
+
+
+def test_store_without_the_import_is_completed_by_the_files(tmp_path):
+    write_files_checkout(tmp_path)
+    # a store created before the .txt import existed, holding only the page crawled since
+    with InfoboxStore(store_path(str(tmp_path))) as store:
+        store.append("Aragorn", crawler.format_infobox_record("Aragorn", EDITED), 10)
+
+    found = records(tmp_path)
+    assert len(found) == 3
+    assert "Aragorn II" in found["--- Aragorn ---"]
+
+
+@pytest.mark.parametrize("use_store", [True, False])
+def test_open_store_imports_files_once(tmp_path, monkeypatch, use_store):
+    write_files_checkout(tmp_path)
+    monkeypatch.setattr(crawler, "USE_STORE", use_store)
+    store = crawler.open_store(str(tmp_path))
+    if not use_store:
+        assert store is None
+        return
+    store.append("Aragorn", crawler.format_infobox_record("Aragorn", EDITED), 10)
+    store.close()
+    with crawler.open_store(str(tmp_path)) as store:
+        assert store.count() == 3
+        assert "Aragorn II" in store.latest("Aragorn")[3]
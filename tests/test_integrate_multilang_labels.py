@@ -0,0 +1,117 @@
+"""integrate_multilang_labels.py against the local stand-in API: cache hits, stale pages, retries and resume."""
+
+import asyncio
+
+import pytest
+
+import integrate_multilang_labels as labels
+from integrate_multilang_labels import LanglinksCache, refresh_cache
+from mediawiki_client import utc_timestamp
+from mediawiki_standin import MediaWikiStandIn
+
+TITLES = ["Aragorn", "Mithrandir", "Sauron", "gandalf"]
+OLD_RUN = "2000-01-01T00:00:00Z"
+
+
+@pytest.fixture(autouse=True)
+def fast_client(monkeypatch):
+    monkeypatch.setattr(labels, "RATE_PER_SEC", 1000.0)
+    monkeypatch.setattr(labels, "BURST", 100)
+    monkeypatch.setattr(labels, "BATCH_SIZE", 2)
+
+
+@pytest.fixture
+def wiki():
+    standin = MediaWikiStandIn(redirects={"Mithrandir": "Gandalf"})
+    standin.add_page("Aragorn", langlinks=[("de", "Aragorn"), ("fr", "Aragorn"), ("ru", "Арагорн"), ("ja", "アラゴルン")])
+    standin.add_page("Gandalf", langlinks=[("fr", "Gandalf le Gris")])
+    with standin:
+        yield standin
+
+
+def refresh(wiki, cache, titles=TITLES) -> int:
+    return asyncio.run(refresh_cache(titles, cache, api_url=wiki.url))
+
+
+def fetched_titles(wiki) -> list:
+    return sorted(wiki.requested_titles(prop="langlinks|info"))
+
+
+def test_fetch_follows_continue_redirects_and_missing_pages(wiki, tmp_path):
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    assert refresh(wiki, cache) == 0
+    assert len(cache.entries["Aragorn"]["langlinks"]) == 4  # across two llcontinue responses
+    assert cache.entries["Mithrandir"]["page"] == "Gandalf"
+    assert cache.entries["gandalf"]["langlinks"] == [["fr", "Gandalf le Gris"]]
+    assert cache.entries["Sauron"]["touched"] is None
+
+
+def test_unchanged_titles_are_cache_hits(wiki, tmp_path):
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    refresh(wiki, cache)
+    cache.compact(TITLES, utc_timestamp())
+    wiki.requests.clear()
+
+    assert refresh(wiki, LanglinksCache(cache.path)) == 0
+    assert fetched_titles(wiki) == []
+    assert len(wiki.requests_for(list="recentchanges")) == 1
+
+
+def test_stale_pages_are_refetched(wiki, tmp_path):
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    refresh(wiki, cache)
+
+    # Last run too old for recentchanges: touched timestamps compared with prop=info.
+    cache.compact(TITLES, OLD_RUN)
+    wiki.add_page("Aragorn", touched="2024-06-01T00:00:00Z", langlinks=[("es", "Aragorn II")])
+    wiki.requests.clear()
+    cache = LanglinksCache(cache.path)
+    assert refresh(wiki, cache) == 0
+    assert fetched_titles(wiki) == ["Aragorn"]
+    assert cache.entries["Aragorn"]["langlinks"] == [["es", "Aragorn II"]]
+
+    # Recent last run: edited pages come from list=recentchanges.
+    cache.compact(TITLES, utc_timestamp())
+    wiki.recent_changes = ["Gandalf"]
+    wiki.requests.clear()
+    assert refresh(wiki, LanglinksCache(cache.path)) == 0
+    assert fetched_titles(wiki) == ["Mithrandir", "gandalf"]
+
+
+def test_missing_page_is_rechecked(wiki, tmp_path):
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    refresh(wiki, cache)
+    cache.compact(TITLES, utc_timestamp())
+    wiki.add_page("Sauron", langlinks=[("de", "Sauron")])
+    wiki.requests.clear()
+
+    cache = LanglinksCache(cache.path)
+    refresh(wiki, cache)
+    assert fetched_titles(wiki) == []  # missing entry still fresh
+
+    cache.entries["Sauron"]["fetched"] = OLD_RUN
+    refresh(wiki, cache)
+    assert fetched_titles(wiki) == ["Sauron"]
+    assert cache.entries["Sauron"]["langlinks"] == [["de", "Sauron"]]
+
+
+def test_failing_batch_is_retried(wiki, tmp_path):
+    wiki.inject(status=500, when=lambda params: "Aragorn" in params.get("titles", ""))
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    assert refresh(wiki, cache) == 0
+    assert fetched_titles(wiki).count("Aragorn") == 3  # failed, retried: two llcontinue responses
+    assert set(cache.entries) == set(TITLES)
+
+
+def test_interrupted_run_resumes_from_cache(wiki, tmp_path):
+    wiki.inject(status=500, times=100, when=lambda params: "Sauron" in params.get("titles", ""))
+    cache = LanglinksCache(str(tmp_path / "cache.jsonl"))
+    assert refresh(wiki, cache) == 2
+    cache.close()
+
+    wiki.clear_faults()
+    wiki.requests.clear()
+    cache = LanglinksCache(cache.path)
+    assert set(cache.entries) == {"Aragorn", "Mithrandir"}
+    assert refresh(wiki, cache) == 0
+    assert fetched_titles(wiki) == ["Sauron", "gandalf"]
@@ -0,0 +1,79 @@
+import json
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+import rdf_maker
+
+PAGES = {
+    "Aragorn": "{{Infobox character\n| name = Aragorn\n| race = [[Men]]\n| spouse = [[Arwen Undómiel|Arwen]]\n}}",
+    "Arwen": "{{Infobox character\n| name = Arwen\n| race = [[Elves|Half-elven]]\n| spouse = [[Aragorn]]\n}}",
+    "Bilbo Baggins": "{{Infobox character\n| name = Bilbo Baggins\n| race = [[Hobbits]]\n}}",
+}
+
+
+def write_corpus(directory, pages):
+    for old in directory.glob("infobox_*.txt"):
+        old.unlink()
+    for title, infobox in pages.items():
+        (directory / f"infobox_{title.replace(' ', '_')}.txt").write_text(f"--- {title} ---\n{infobox}", encoding="utf-8")
+
+
+def build(tmp_path, monkeypatch, argv):
+    out = tmp_path / "rdf"
+    monkeypatch.setattr(rdf_maker, "INPUT_DIR", str(tmp_path / "infoboxes"))
+    monkeypatch.setattr(rdf_maker, "OUTPUT_DIR", str(out))
+    monkeypatch.setattr(rdf_maker, "OUTPUT_FILE", str(out / "all_infoboxes.ttl"))
+    monkeypatch.setattr(rdf_maker, "PAGE_CACHE", str(out / "pages.pickle"))
+    rdf_maker.main(argv)
+    return Graph().parse(out / "all_infoboxes.ttl")
+
+
+def test_change_set_build_equals_full_build(tmp_path, monkeypatch, capsys):
+    corpus = tmp_path / "infoboxes"
+    corpus.mkdir()
+    write_corpus(corpus, PAGES)
+    build(tmp_path, monkeypatch, [])
+
+    pages = dict(PAGES)
+    pages["Aragorn"] = pages["Aragorn"].replace("[[Men]]", "[[Dúnedain]]")
+    del pages["Bilbo Baggins"]
+    pages["Frodo Baggins"] = "{{Infobox character\n| name = Frodo Baggins\n| race = [[Hobbits]]\n}}"
+    pages["Arwen Undómiel"] = "{{Infobox character\n| name = Arwen Undómiel\n}}"
+    write_corpus(corpus, pages)
+    changes = tmp_path / "changes.json"
+    changes.write_text(json.dumps({
+        "added": ["Arwen Undómiel", "Frodo Baggins"], "removed": ["Bilbo Baggins"], "modified": ["Aragorn"],
+    }), encoding="utf-8")
+    capsys.readouterr()
+
+    incremental = build(tmp_path, monkeypatch, ["--changes", str(changes)])
+    assert "Pages from the cache: 1, parsed: 3" in capsys.readouterr().out
+    assert isomorphic(incremental, build(tmp_path, monkeypatch, []))
+    assert (rdf_maker.to_res_iri("Bilbo Baggins"), None, None) not in incremental
+
+
+def test_pages_missing_from_the_change_set_are_parsed_again(tmp_path, monkeypatch, capsys):
+    corpus = tmp_path / "infoboxes"
+    corpus.mkdir()
+    write_corpus(corpus, PAGES)
+    build(tmp_path, monkeypatch, [])
+
+    pages = dict(PAGES, **{"Bilbo Baggins": PAGES["Bilbo Baggins"].replace("Hobbits", "Stoors")})
+    write_corpus(corpus, pages)
+    changes = tmp_path / "changes.json"
+    changes.write_text(json.dumps({"added": [], "removed": [], "modified": []}), encoding="utf-8")
+    capsys.readouterr()
+
+    incremental = build(tmp_path, monkeypatch, ["--changes", str(changes)])
+    assert "1 pages changed without being in the change set" in capsys.readouterr().out
+    assert isomorphic(incremental, build(tmp_path, monkeypatch, []))
+
+
+def test_missing_change_set_means_a_full_build(tmp_path, monkeypatch, capsys):
+    corpus = tmp_path / "infoboxes"
+    corpus.mkdir()
+    write_corpus(corpus, PAGES)
+    full = build(tmp_path, monkeypatch, [])
+    assert isomorphic(full, build(tmp_path, monkeypatch, ["--changes", str(tmp_path / "none.json")]))
+    assert "No change set" in capsys.readouterr().out
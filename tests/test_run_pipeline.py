@@ -0,0 +1,29 @@
+import run_pipeline
+from run_pipeline import STEPS, Step, local_imports, step_fingerprint
+
+
+def test_local_imports_are_transitive():
+    imports = local_imports("integrate_external_data.py")
+    assert {"integrate_external_data.py", "fuzzy_match.py", "label_index.py", "graph_snapshot.py"} <= set(imports)
+    assert "rdflib.py" not in imports
+
+
+def test_fingerprint_follows_imported_modules(tmp_path, monkeypatch):
+    scripts = tmp_path / "scripts" / "rdf"
+    scripts.mkdir(parents=True)
+    (scripts / "step.py").write_text("import helper\n\ndef main():\n    pass\n", encoding="utf-8")
+    (scripts / "helper.py").write_text("def run():\n    from deep import value\n", encoding="utf-8")
+    (scripts / "deep.py").write_text("value = 1\n", encoding="utf-8")
+    monkeypatch.setattr(run_pipeline, "PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(run_pipeline, "SCRIPTS_DIR", scripts)
+    step = Step("step", "step.py")
+
+    before = step_fingerprint(step)
+    assert set(before) == {"scripts/rdf/deep.py", "scripts/rdf/helper.py", "scripts/rdf/step.py"}
+    (scripts / "deep.py").write_text("value = 2\n", encoding="utf-8")
+    assert step_fingerprint(step) != before
+
+
+def test_every_step_script_parses():
+    for step in STEPS:
+        assert step.script in local_imports(step.script)
@@ -0,0 +1,28 @@
+import argparse
+
+import run_web
+
+ARGS = argparse.Namespace(host="127.0.0.1", port=8000, workers=2, max_requests=1000)
+
+
+def test_uvicorn_without_jitter_option(monkeypatch):
+    calls = []
+
+    def run(app, host, port, workers, limit_max_requests, timeout_graceful_shutdown, log_level, app_dir):
+        calls.append(limit_max_requests)
+
+    monkeypatch.setattr(run_web.uvicorn, "run", run)
+    run_web.run_uvicorn(ARGS)
+    assert calls == [1000]
+
+
+def test_uvicorn_with_jitter_option(monkeypatch):
+    calls = []
+
+    def run(app, host="127.0.0.1", port=8000, workers=None, limit_max_requests=None,
+            limit_max_requests_jitter=0, timeout_graceful_shutdown=None, log_level=None, app_dir=""):
+        calls.append(limit_max_requests_jitter)
+
+    monkeypatch.setattr(run_web.uvicorn, "run", run)
+    run_web.run_uvicorn(ARGS)
+    assert calls == [run_web.MAX_REQUESTS_JITTER]
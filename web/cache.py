@@ -0,0 +1,81 @@
+"""
+In-process caches for SPARQL results and rendered pages.
+Each cache is a thread-safe LRU of at most `maxsize` entries that expire
+after `ttl` seconds (WEB_CACHE_TTL, default one hour), so edits loaded into
+Fuseki show up on resource pages without a restart. None results (failed
+queries, unknown resources) are not cached. Browse, facets and statistics
+come from the in-memory index of kg_index.py instead, which reflects the
+dataset at startup until the server is restarted.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+CACHE_TTL = float(os.environ.get("WEB_CACHE_TTL", 3600))
+QUERY_CACHE_SIZE = 4096
+PAGE_CACHE_SIZE = 1024
+
+
+class TTLCache:
+    """LRU mapping whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, maxsize: int, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value of `key`, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached(cache: TTLCache):
+    """Caches the non-None results of a function by its positional arguments."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            key = (func.__name__, args)
+            value = cache.get(key)
+            if value is None:
+                value = func(*args)
+                if value is not None:
+                    cache.set(key, value)
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+QUERY_CACHE = TTLCache(QUERY_CACHE_SIZE)
+PAGE_CACHE = TTLCache(PAGE_CACHE_SIZE)
@@ -0,0 +1,160 @@
+"""
+In-memory read-only indexes of the knowledge graph.
+Built once from Fuseki at startup (a handful of full-scan SPARQL queries) and
+then used by sparql_queries.py instead of per-request scans:
+    - resolver: lowercase label / local name -> resource IRI
+    - facets and statistics: type counts
+    - browse and search: (name, subject, type) rows sorted by name
+
+The production launcher builds the index in the master process before forking
+the workers, so every worker shares the same pages copy-on-write. The index
+reflects the dataset at startup: names it does not resolve are looked up in
+Fuseki, but browse, facets and statistics need a server restart after
+reloading Fuseki.
+"""
+import time
+from typing import Dict, Optional
+
+from SPARQLWrapper import SPARQLWrapper, JSON
+
+from web import slow_queries
+from web.metrics import error_kind, record_query
+
+NAME_PREDICATES = (
+    "http://schema.org/name",
+    "http://www.w3.org/2000/01/rdf-schema#label",
+    "http://tolkien-kg.org/ontology/name",
+)
+SCHEMA_NAME = "http://schema.org/name"
+LOCAL_BASES = (
+    "http://tolkien-kg.org/resource/",
+    "http://tolkien-kg.org/ontology/",
+    "http://tolkien-kg.org/card/",
+)
+FACET_PREFIXES = ("http://tolkien-kg.org/ontology/", "http://schema.org/")
+FACET_LIMIT = 20
+STATISTIC_TYPES = {
+    "characters": "http://tolkien-kg.org/ontology/Character",
+    "locations": "http://tolkien-kg.org/ontology/Location",
+    "works": "http://schema.org/CreativeWork",
+}
+
+
+def _select(endpoint: str, name: str, query: str) -> list:
+    sparql = SPARQLWrapper(endpoint)
+    sparql.setQuery(query)
+    sparql.setReturnFormat(JSON)
+    started = time.perf_counter()
+    try:
+        bindings = sparql.query().convert()["results"]["bindings"]
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        record_query(name, elapsed, error=error_kind(e))
+        slow_queries.observe(name, query, None, elapsed, error=error_kind(e))
+        raise
+    elapsed = time.perf_counter() - started
+    record_query(name, elapsed, len(bindings))
+    slow_queries.observe(name, query, None, elapsed, len(bindings))
+    return bindings
+
+
+class KGIndex:
+    """Lookup tables answering the resolver, facet, statistics and browse queries."""
+
+    def __init__(self, names: list, subjects: list, types: list):
+        """names: [(s, p, name)], subjects: [s], types: [(s, type)]."""
+        self.labels = {}
+        self.names = {}
+        for s, p, name in names:
+            self.labels.setdefault(name.lower(), s)
+            if p == SCHEMA_NAME:
+                self.names.setdefault(s, []).append(name)
+
+        self.local_names = {}
+        for s in subjects:
+            for base in LOCAL_BASES:
+                if s.startswith(base):
+                    self.local_names.setdefault(s[len(base):].lower(), s)
+                    break
+
+        self.types = {}
+        for s, type_iri in types:
+            self.types.setdefault(s, []).append(type_iri)
+
+        counts = {}
+        for subject_types in self.types.values():
+            for type_iri in set(subject_types):
+                counts[type_iri] = counts.get(type_iri, 0) + 1
+        typed = [s for s, subject_types in self.types.items() if any(t.startswith(FACET_PREFIXES) for t in subject_types)]
+        self.statistics = {"total": len(typed)}
+        for key, type_iri in STATISTIC_TYPES.items():
+            self.statistics[key] = counts.get(type_iri, 0)
+        facets = [(type_iri, n) for type_iri, n in counts.items() if type_iri.startswith(FACET_PREFIXES)]
+        facets.sort(key=lambda item: (-item[1], item[0]))
+        self.facets = [{"type": type_iri, "count": n} for type_iri, n in facets[:FACET_LIMIT]]
+
+        self.rows = sorted(
+            (name, s, type_iri)
+            for s, subject_names in self.names.items()
+            for name in subject_names
+            for type_iri in self.types.get(s, ())
+        )
+
+    def resolve(self, label: str, local_name: str) -> Optional[str]:
+        """IRI whose name/label equals `label`, else whose local name equals `local_name` (case-insensitive)."""
+        return self.labels.get(label.lower()) or self.local_names.get(local_name.lower())
+
+    def browse(self, type_iri: str = "", search: str = "", limit: int = 20, offset: int = 0) -> tuple:
+        """(rows [{name, uri, type}] of the page, number of distinct matching subjects)."""
+        needle = search.lower() if search else ""
+        rows = [
+            row for row in self.rows
+            if (not type_iri or type_iri in self.types[row[1]]) and (not needle or needle in row[0].lower())
+        ]
+        total = len({s for _name, s, _type in rows})
+        page = [{"name": name, "uri": s, "type": t} for name, s, t in rows[offset:offset + limit]]
+        return page, total
+
+
+_index: Optional[KGIndex] = None
+
+
+def build_index(endpoint: str) -> KGIndex:
+    predicates = " ".join(f"<{p}>" for p in NAME_PREDICATES)
+    names = [
+        (b["s"]["value"], b["p"]["value"], b["name"]["value"])
+        for b in _select(endpoint, "index_names", f"SELECT ?s ?p ?name WHERE {{ VALUES ?p {{ {predicates} }} ?s ?p ?name }}")
+    ]
+    subjects = [
+        b["s"]["value"]
+        for b in _select(
+            endpoint,
+            "index_subjects",
+            'SELECT DISTINCT ?s WHERE { ?s ?p ?o . FILTER(STRSTARTS(STR(?s), "http://tolkien-kg.org/")) }',
+        )
+    ]
+    types = [
+        (b["s"]["value"], b["type"]["value"])
+        for b in _select(endpoint, "index_types", "SELECT DISTINCT ?s ?type WHERE { ?s a ?type }")
+    ]
+    return KGIndex(names, subjects, types)
+
+
+def load_index(endpoint: str) -> KGIndex:
+    """Builds the shared index (once per process tree) and returns it."""
+    global _index
+    if _index is None:
+        _index = build_index(endpoint)
+    return _index
+
+
+def current_index() -> Optional[KGIndex]:
+    """The loaded index, or None while it is not (queries then go to Fuseki)."""
+    return _index
+
+
+def index_summary() -> Dict[str, int]:
+    if _index is None:
+        return {}
+    return {"labels": len(_index.labels), "local_names": len(_index.local_names), "browse_rows": len(_index.rows)}
+
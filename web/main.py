@@ -1,3 +1,6 @@
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse, RedirectResponse
@@ -21,6 +24,8 @@ from web.html_renderer import (
     generate_turtle_for_property,
 )
 from web.home_renderer import generate_home_page, generate_browse_page
+from web import metrics, slow_queries, startup
+from web.cache import PAGE_CACHE
 
 """
 Tolkien Knowledge Graph API
@@ -40,6 +45,10 @@ Features:
     - Character detail lookup by name
     - Content negotiation (HTML, JSON, Turtle/RDF)
     - Error handling with appropriate HTTP status codes
+    - Liveness (/health) and readiness (/ready) probes; a worker is ready once
+      its shared KG index is loaded and its caches are warmed (see startup.py)
+    - Prometheus metrics (/metrics) and Server-Timing headers (see metrics.py)
+    - Query statistics by template (/metrics/queries) and slow-query log (see slow_queries.py)
 
 Configuration:
     - Fuseki Endpoint: http://localhost:3030/kg-tolkiengateway/sparql
@@ -52,10 +61,18 @@ Dependencies:
     - CORS Middleware: Cross-origin resource sharing support
 """
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.start(render_page)
+    yield
+
+
 app = FastAPI(
     title="Tolkien KG API",
     description="API pour interroger Fuseki avec FastAPI",
     version="1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -67,6 +84,19 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    """Times every request by route and reports its SPARQL queries in a Server-Timing header."""
+    started = time.perf_counter()
+    timings = metrics.start_request(request.scope)
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.record_request(request.method, route, response.status_code, elapsed)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+
 @app.get("/", tags=["Root"])
 def root():
     """Generate the home page with global statistics."""
@@ -206,20 +236,33 @@ async def get_resource(name: str, request: Request, format: str = Query(None, al
     return PlainTextResponse(content, media_type="text/turtle")
 
 
-@app.get("/page/{name}", tags=["Linked Data"])
-def get_page(name: str):
-    """HTML page endpoint (DBpedia-style)."""
+def render_page(name: str):
+    """HTML of the page of a resource (cached), None if it is unknown."""
+    html = PAGE_CACHE.get(name)
+    if html is not None:
+        return html
+
     resource_uri = get_resource_by_name_or_iri(name)
     if not resource_uri:
-        return HTMLResponse("<h1>Ressource non trouvee</h1>", status_code=404)
+        return None
 
     properties = get_resource_properties(resource_uri)
     if not properties:
-        return HTMLResponse("<h1>Ressource non trouvee</h1>", status_code=404)
+        return None
 
     related_cards = get_related_cards(resource_uri)
     resource = ResourceData(name=name, uri=resource_uri, properties=properties)
     html = generate_html_page(resource, related_cards=related_cards)
+    PAGE_CACHE.set(name, html)
+    return html
+
+
+@app.get("/page/{name}", tags=["Linked Data"])
+def get_page(name: str):
+    """HTML page endpoint (DBpedia-style)."""
+    html = render_page(name)
+    if html is None:
+        return HTMLResponse("<h1>Ressource non trouvee</h1>", status_code=404)
     return HTMLResponse(html)
 
 
@@ -253,6 +296,31 @@ def get_ontology_property(name: str, request: Request, format: str = Query(None,
     return HTMLResponse(html)
 
 
+@app.get("/health", tags=["Monitoring"])
+def health():
+    """Liveness probe: the worker answers requests."""
+    return {"status": "ok"}
+
+
+@app.get("/ready", tags=["Monitoring"])
+def ready():
+    """Readiness probe: 503 until the worker's shared indexes are loaded and its caches warmed."""
+    is_ready, status = startup.readiness()
+    return JSONResponse(status_code=200 if is_ready else 503, content={"ready": is_ready, **status})
+
+
+@app.get("/metrics", tags=["Monitoring"])
+def get_metrics():
+    """Query, route and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/queries", tags=["Monitoring"])
+def get_query_stats():
+    """SPARQL query statistics by template (calls, time, slow calls, errors), most expensive first."""
+    return JSONResponse(slow_queries.template_stats())
+
+
 @app.get("/favicon.ico")
 def favicon():
     return PlainTextResponse("", media_type="image/x-icon")
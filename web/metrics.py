@@ -0,0 +1,167 @@
+"""
+Request and SPARQL query instrumentation.
+Every Fuseki call of sparql_queries.py (and of the index build) is recorded
+with record_query(): latency and row-count histograms and error counts per
+query name. The HTTP middleware of main.py records the latency of every
+route (by path template, so /page/{name} is one series) and sends the query
+timings of the request back in a Server-Timing header, e.g.
+    Server-Timing: resolve_label;dur=1.9, properties;dur=35.2;desc="x2", app;dur=41.0
+GET /metrics renders everything, with the hit / miss counts of the caches
+(cache.py), in the Prometheus text format.
+
+Metrics live in the memory of each worker process: with several workers a
+scrape sees the worker that answered it (the worker_pid label tells which).
+"""
+import os
+import threading
+from contextvars import ContextVar
+
+from web.cache import PAGE_CACHE, QUERY_CACHE
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+_request: ContextVar = ContextVar("request", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label values."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, values: tuple, amount: float):
+        counts = self.series.setdefault(values, [0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                counts[i] += 1
+        counts[-2] += amount
+        counts[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for values, counts in sorted(self.series.items()):
+            labels = _labels(self.labels, values)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {counts[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, values: tuple, amount: float = 1):
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for values, count in sorted(self.series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, values)}}} {count}")
+        return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+_lock = threading.Lock()
+QUERY_SECONDS = Histogram("kg_sparql_query_duration_seconds", "Latency of SPARQL queries sent to Fuseki.", ("query",), LATENCY_BUCKETS)
+QUERY_ROWS = Histogram("kg_sparql_query_rows", "Result rows of successful SPARQL queries.", ("query",), ROW_BUCKETS)
+QUERY_ERRORS = Counter("kg_sparql_query_errors_total", "Failed SPARQL queries by error type.", ("query", "error"))
+REQUEST_SECONDS = Histogram(
+    "kg_http_request_duration_seconds", "Latency of HTTP requests by route.", ("method", "route", "status"), LATENCY_BUCKETS
+)
+
+
+def error_kind(error: Exception) -> str:
+    """Error label of a failed query: "timeout" or the exception class name."""
+    if isinstance(error, TimeoutError) or "timed out" in str(error).lower():
+        return "timeout"
+    return type(error).__name__
+
+
+def record_query(name: str, seconds: float, rows: int = 0, error: str = None):
+    """Records one Fuseki call, and adds it to the Server-Timing of the current request."""
+    with _lock:
+        QUERY_SECONDS.observe((name,), seconds)
+        if error:
+            QUERY_ERRORS.inc((name, error))
+        else:
+            QUERY_ROWS.observe((name,), rows)
+    request = _request.get()
+    if request is not None:
+        request[1].append((name, seconds))
+
+
+def start_request(scope: dict) -> list:
+    """Starts collecting the query timings of the request of this ASGI scope."""
+    timings = []
+    _request.set((scope, timings))
+    return timings
+
+
+def current_route():
+    """"METHOD /route/{template}" of the request being served, None outside requests."""
+    request = _request.get()
+    if request is None:
+        return None
+    scope = request[0]
+    return f'{scope.get("method")} {getattr(scope.get("route"), "path", scope.get("path"))}'
+
+
+def record_request(method: str, route: str, status: int, seconds: float):
+    with _lock:
+        REQUEST_SECONDS.observe((method, route, str(status)), seconds)
+
+
+def server_timing(timings: list, total: float) -> str:
+    """Server-Timing header value: the queries of a request grouped by name, then the whole request as "app"."""
+    grouped = {}
+    for name, seconds in timings:
+        entry = grouped.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for name, (seconds, count) in grouped.items():
+        part = f"{name};dur={1000 * seconds:.1f}"
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    parts.append(f"app;dur={1000 * total:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP kg_worker_info Worker process serving this scrape.",
+        "# TYPE kg_worker_info gauge",
+        f'kg_worker_info{{worker_pid="{os.getpid()}"}} 1',
+    ]
+    with _lock:
+        for metric in (QUERY_SECONDS, QUERY_ROWS, QUERY_ERRORS, REQUEST_SECONDS):
+            lines.extend(metric.render())
+    caches = {"query": QUERY_CACHE, "page": PAGE_CACHE}
+    for name, kind, help_text, attribute in (
+        ("kg_cache_hits_total", "counter", "Cache lookups answered from the cache.", "hits"),
+        ("kg_cache_misses_total", "counter", "Cache lookups not found or expired.", "misses"),
+        ("kg_cache_entries", "gauge", "Entries currently cached.", None),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache_name, cache in caches.items():
+            value = getattr(cache, attribute) if attribute else len(cache)
+            lines.append(f'{name}{{cache="{cache_name}"}} {value}')
+    return "\n".join(lines) + "\n"
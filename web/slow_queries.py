@@ -0,0 +1,156 @@
+"""
+Slow-query log and per-template statistics of the Fuseki calls.
+Every query run by sparql_queries.py (and by the index build) is passed to
+observe(). Queries are grouped by template: the query text with IRIs, string
+literals and numbers replaced by "?" and whitespace collapsed, fingerprinted
+by a short hash, so "/page/Gandalf" and "/page/Frodo" count as the same
+resolver query while a browse query with and without a type filter do not.
+
+- Calls taking at least SLOW_QUERY_MS milliseconds (WEB_SLOW_QUERY_MS, default
+  500; negative disables the log) are appended to SLOW_QUERY_LOG as one JSON
+  line: time, query name, template fingerprint, full query text, parameters,
+  duration, row count, error and calling route ("startup" outside requests).
+- GET /metrics/queries returns the statistics of every template seen by the
+  worker (calls, total / mean / max time, slow calls, errors, rows), most
+  expensive first.
+- Run as a module to aggregate a slow-query log (of all workers and restarts) by
+  template into data/logs/slow_query_templates.csv.
+
+Fuseki has no query-plan API over the SPARQL protocol: to see the plan of a
+logged query, run Fuseki with --set arq:logExec=info and replay the logged
+query text.
+
+Usage: python -m web.slow_queries [slow_queries.jsonl]
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from web.metrics import current_route
+
+LOG_DIR = Path(__file__).resolve().parents[1] / "data" / "logs"
+SLOW_QUERY_MS = float(os.environ.get("WEB_SLOW_QUERY_MS", 500))
+SLOW_QUERY_LOG = Path(os.environ.get("WEB_SLOW_QUERY_LOG", LOG_DIR / "slow_queries.jsonl"))
+TEMPLATES_CSV = LOG_DIR / "slow_query_templates.csv"
+
+_IRI_RE = re.compile(r"<[^<>\s]+>")
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+_NUMBER_RE = re.compile(r"(?<![\w?$])\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_templates = {}
+
+
+def query_template(query: str) -> str:
+    """Query text with its IRIs, literals and numbers replaced by "?"."""
+    template = _IRI_RE.sub("<?>", query)
+    template = _STRING_RE.sub('"?"', template)
+    template = _NUMBER_RE.sub("?", template)
+    return _SPACE_RE.sub(" ", template).strip()
+
+
+def fingerprint(template: str) -> str:
+    return hashlib.sha1(template.encode("utf-8")).hexdigest()[:12]
+
+
+def observe(name: str, query: str, params: dict, seconds: float, rows: int = 0, error: str = None):
+    """Adds one query to its template statistics, and to the slow-query log when it is slow."""
+    template = query_template(query)
+    key = fingerprint(template)
+    slow = SLOW_QUERY_MS >= 0 and 1000 * seconds >= SLOW_QUERY_MS
+    with _lock:
+        stats = _templates.setdefault(
+            key,
+            {"fingerprint": key, "name": name, "template": template, "calls": 0, "total_ms": 0.0,
+             "max_ms": 0.0, "slow": 0, "errors": 0, "rows": 0},
+        )
+        stats["calls"] += 1
+        stats["total_ms"] += 1000 * seconds
+        stats["max_ms"] = max(stats["max_ms"], 1000 * seconds)
+        stats["slow"] += slow
+        stats["errors"] += bool(error)
+        stats["rows"] += rows
+    if slow:
+        _write({
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "name": name,
+            "fingerprint": key,
+            "duration_ms": round(1000 * seconds, 1),
+            "rows": rows,
+            "error": error,
+            "route": current_route() or "startup",
+            "params": params or {},
+            "query": query,
+        })
+
+
+def _write(record: dict):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        SLOW_QUERY_LOG.parent.mkdir(parents=True, exist_ok=True)
+        # one write per line in append mode, so the lines of several workers do not interleave
+        with _lock, open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"Slow-query log not written ({SLOW_QUERY_LOG}): {e}")
+
+
+def template_stats() -> list:
+    """Statistics of every query template seen by this process, by total time."""
+    with _lock:
+        rows = [dict(stats) for stats in _templates.values()]
+    for stats in rows:
+        stats["mean_ms"] = round(stats["total_ms"] / stats["calls"], 1)
+        stats["total_ms"] = round(stats["total_ms"], 1)
+        stats["max_ms"] = round(stats["max_ms"], 1)
+    return sorted(rows, key=lambda stats: -stats["total_ms"])
+
+
+def summarize_log(path=SLOW_QUERY_LOG) -> list:
+    """[(fingerprint, name, calls, total ms, mean ms, max ms, errors, routes, template)] of a slow-query log, by total time."""
+    groups = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            group = groups.setdefault(record["fingerprint"], {
+                "name": record["name"], "durations": [], "errors": 0, "routes": set(),
+                "template": query_template(record["query"]),
+            })
+            group["durations"].append(record["duration_ms"])
+            group["errors"] += bool(record.get("error"))
+            group["routes"].add(record.get("route") or "")
+    rows = []
+    for key, group in groups.items():
+        durations = group["durations"]
+        rows.append((
+            key, group["name"], len(durations), round(sum(durations), 1), round(sum(durations) / len(durations), 1),
+            max(durations), group["errors"], " | ".join(sorted(group["routes"])), group["template"],
+        ))
+    return sorted(rows, key=lambda row: -row[3])
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else SLOW_QUERY_LOG
+    rows = summarize_log(path)
+    TEMPLATES_CSV.parent.mkdir(parents=True, exist_ok=True)
+    with open(TEMPLATES_CSV, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["fingerprint", "name", "calls", "total_ms", "mean_ms", "max_ms", "errors", "routes", "template"])
+        writer.writerows(rows)
+    print(f"OK. {sum(row[2] for row in rows)} slow queries, {len(rows)} templates: {TEMPLATES_CSV}")
+    for key, name, calls, total, mean, worst, errors, _routes, _template in rows[:20]:
+        print(f"  {key}  {name:<22} {calls:>6} calls  {total:>10.1f} ms  mean {mean:>8.1f}  max {worst:>8.1f}  errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,57 @@
 """
 SPARQL queries and Fuseki integration.
+Every query goes through _run_query(), which records its latency, row count
+or error in metrics.py and its template statistics / slow-query log entry in
+slow_queries.py; failed queries are logged instead of silently ignored.
 """
+import time
 from SPARQLWrapper import SPARQLWrapper, JSON
 from typing import Optional, Dict, List
 
+from web.cache import QUERY_CACHE, cached
+from web.kg_index import current_index
+from web.metrics import error_kind, record_query
+from web import slow_queries
 
 FUSEKI_URL = "http://localhost:3030/kg-tolkiengateway/sparql"
 
 
+def _run_query(name: str, query: str, params: dict = None) -> Optional[dict]:
+    """
+    Run a query against Fuseki, recording it under `name` with the
+    caller's `params` (inputs the query text was built from).
+    Returns the JSON results, None if the query failed.
+    """
+    sparql = SPARQLWrapper(FUSEKI_URL)
+    sparql.setQuery(query)
+    sparql.setReturnFormat(JSON)
+    started = time.perf_counter()
+    try:
+        results = sparql.query().convert()
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        record_query(name, elapsed, error=error_kind(e))
+        slow_queries.observe(name, query, params, elapsed, error=error_kind(e))
+        print(f"SPARQL query {name} failed: {type(e).__name__}: {e}")
+        return None
+    elapsed = time.perf_counter() - started
+    if "results" in results:
+        rows = len(results["results"]["bindings"])
+    else:
+        rows = int(bool(results.get("boolean")))
+    record_query(name, elapsed, rows)
+    slow_queries.observe(name, query, params, elapsed, rows)
+    return results
+
+
+def _first_value(results: Optional[dict], var: str) -> Optional[str]:
+    """Value of `var` in the first row of the results, None if there is none."""
+    if not results or not results["results"]["bindings"]:
+        return None
+    binding = results["results"]["bindings"][0].get(var)
+    return binding["value"] if binding else None
+
+
 def build_iri(name: str, base: str) -> str:
     """
     Build an IRI from a name by replacing spaces and dashes.
@@ -16,12 +60,21 @@ def build_iri(name: str, base: str) -> str:
     return f"{base}{safe}"
 
 
+@cached(QUERY_CACHE)
 def get_resource_by_name_or_iri(resource_name: str) -> Optional[str]:
     """
     Find a resource URI by name/label or direct IRI guess.
+    The startup index answers known names; names it misses (resources
+    loaded into Fuseki since) are looked up with SPARQL.
     Returns the resource URI if found, None otherwise.
     """
-    sparql = SPARQLWrapper(FUSEKI_URL)
+    index = current_index()
+    if index is not None:
+        label = resource_name.replace("_", " ").replace("-", " ")
+        found = index.resolve(label, resource_name.replace(" ", "_").replace("-", "_"))
+        if found:
+            return found
+
     name_predicates = [
         "http://schema.org/name",
         "http://www.w3.org/2000/01/rdf-schema#label",
@@ -39,15 +92,9 @@ def get_resource_by_name_or_iri(resource_name: str) -> Optional[str]:
             FILTER(LCASE(STR(?name)) = LCASE("{safe_label}"))
         }} LIMIT 1
     '''
-    sparql.setQuery(query_labels)
-    sparql.setReturnFormat(JSON)
-
-    try:
-        results = sparql.query().convert()
-        if results["results"]["bindings"]:
-            return results["results"]["bindings"][0]["s"]["value"]
-    except Exception:
-        pass
+    found = _first_value(_run_query("resolve_label", query_labels, {"resource_name": resource_name}), "s")
+    if found:
+        return found
 
     local_candidate = resource_name.replace(" ", "_").replace("-", "_")
     safe_local = local_candidate.replace('"', '\"')
@@ -61,14 +108,9 @@ def get_resource_by_name_or_iri(resource_name: str) -> Optional[str]:
             FILTER(LCASE(?local) = LCASE("{safe_local}"))
         }} LIMIT 1
     '''
-    sparql.setQuery(query_local)
-    sparql.setReturnFormat(JSON)
-    try:
-        results = sparql.query().convert()
-        if results["results"]["bindings"]:
-            return results["results"]["bindings"][0]["s"]["value"]
-    except Exception:
-        pass
+    found = _first_value(_run_query("resolve_local", query_local, {"resource_name": resource_name}), "s")
+    if found:
+        return found
 
     iri_guesses = [
         build_iri(resource_name, "http://tolkien-kg.org/resource/"),
@@ -77,22 +119,17 @@ def get_resource_by_name_or_iri(resource_name: str) -> Optional[str]:
     ]
 
     for iri in iri_guesses:
-        sparql.setQuery(f'''ASK {{ <{iri}> ?p ?o }}''')
-        try:
-            exists = sparql.query().convert().get('boolean', False)
-            if exists:
-                return iri
-        except Exception:
-            pass
+        results = _run_query("resolve_ask", f'''ASK {{ <{iri}> ?p ?o }}''', {"resource_name": resource_name, "iri": iri})
+        if results and results.get('boolean', False):
+            return iri
 
     return None
 
 
+@cached(QUERY_CACHE)
 def get_resource_properties(subject_uri: str) -> Optional[Dict[str, List[str]]]:
     """Fetch all properties of a resource by its URI (incoming + outgoing, sameAs-aware)."""
-    sparql = SPARQLWrapper(FUSEKI_URL)
-
-    sparql.setQuery(f"""
+    results = _run_query("properties", f"""
         PREFIX owl: <http://www.w3.org/2002/07/owl#>
         SELECT ?p ?o ?dir WHERE {{
             {{
@@ -108,31 +145,27 @@ def get_resource_properties(subject_uri: str) -> Optional[Dict[str, List[str]]]:
                 BIND("in" AS ?dir)
             }}
         }}
-    """)
-    sparql.setReturnFormat(JSON)
-
-    try:
-        results = sparql.query().convert()
-        props = {}
-
-        for binding in results["results"]["bindings"]:
-            pred = binding["p"]["value"]
-            obj = binding["o"]["value"]
-            if binding["o"].get("type") == "literal":
-                lang = binding["o"].get("xml:lang")
-                if lang:
-                    obj = f"{obj}||lang:{lang}"
-            direction = binding.get("dir", {}).get("value", "out")
-            if direction == "in":
-                pred = f"^{pred}"
-            if pred not in props:
-                props[pred] = []
-            props[pred].append(obj)
-
-        return props
-    except Exception:
+    """, {"subject_uri": subject_uri})
+    if results is None:
         return None
 
+    props = {}
+    for binding in results["results"]["bindings"]:
+        pred = binding["p"]["value"]
+        obj = binding["o"]["value"]
+        if binding["o"].get("type") == "literal":
+            lang = binding["o"].get("xml:lang")
+            if lang:
+                obj = f"{obj}||lang:{lang}"
+        direction = binding.get("dir", {}).get("value", "out")
+        if direction == "in":
+            pred = f"^{pred}"
+        if pred not in props:
+            props[pred] = []
+        props[pred].append(obj)
+
+    return props
+
 def get_ontology_property_info(name_or_uri: str) -> Optional[Dict[str, str]]:
     """Fetch ontology property info (label, comment, type, domain, range) from Fuseki.
     Accepts either local name (e.g., 'affiliation') or full URI.
@@ -142,8 +175,7 @@ def get_ontology_property_info(name_or_uri: str) -> Optional[Dict[str, str]]:
     else:
         iri = f"http://tolkien-kg.org/ontology/{name_or_uri}"
 
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    sparql.setQuery(f'''
+    results = _run_query("ontology_property", f'''
         SELECT ?type ?label ?comment ?domain ?range WHERE {{
             OPTIONAL {{ <{iri}> a ?type }}
             OPTIONAL {{ <{iri}> <http://www.w3.org/2000/01/rdf-schema#label> ?label }}
@@ -151,130 +183,88 @@ def get_ontology_property_info(name_or_uri: str) -> Optional[Dict[str, str]]:
             OPTIONAL {{ <{iri}> <http://www.w3.org/2000/01/rdf-schema#domain> ?domain }}
             OPTIONAL {{ <{iri}> <http://www.w3.org/2000/01/rdf-schema#range> ?range }}
         }} LIMIT 1
-    ''')
-    sparql.setReturnFormat(JSON)
-    try:
-        results = sparql.query().convert()
-        bindings = results["results"]["bindings"]
-        info = {"uri": iri}
-        if bindings:
-            b = bindings[0]
-            for key in ("type", "label", "comment", "domain", "range"):
-                if key in b:
-                    info[key] = b[key]["value"]
-        return info
-    except Exception:
+    ''', {"iri": iri})
+    if results is None:
         return None
 
+    bindings = results["results"]["bindings"]
+    info = {"uri": iri}
+    if bindings:
+        b = bindings[0]
+        for key in ("type", "label", "comment", "domain", "range"):
+            if key in b:
+                info[key] = b[key]["value"]
+    return info
+
 
 def get_characters_list(limit: int = 100) -> List[str]:
     """
     Returns a list of character names from the knowledge graph.
     """
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    sparql.setQuery(f'''
+    results = _run_query("characters_list", f'''
         SELECT ?name WHERE {{
             ?s <http://schema.org/name> ?name .
         }} LIMIT {limit}
-    ''')
-    sparql.setReturnFormat(JSON)
-    
-    try:
-        results = sparql.query().convert()
-        return [r["name"]["value"] for r in results["results"]["bindings"]]
-    except Exception:
+    ''', {"limit": limit})
+    if results is None:
         return []
+    return [r["name"]["value"] for r in results["results"]["bindings"]]
 
 
 def get_character_by_name(name: str) -> Optional[List[Dict]]:
     """Returns information about a character by their exact name."""
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    sparql.setQuery(f'''
+    results = _run_query("character_by_name", f'''
         SELECT ?p ?o WHERE {{
             ?s <http://schema.org/name> "{name}" .
             ?s ?p ?o .
         }}
-    ''')
-    sparql.setReturnFormat(JSON)
-    
-    try:
-        results = sparql.query().convert()
-        return [
-            {"property": r["p"]["value"], "value": r["o"]["value"]}
-            for r in results["results"]["bindings"]
-        ]
-    except Exception:
+    ''', {"name": name})
+    if results is None:
         return None
+    return [
+        {"property": r["p"]["value"], "value": r["o"]["value"]}
+        for r in results["results"]["bindings"]
+    ]
 
 
 def get_statistics() -> Dict[str, int]:
     """Returns global statistics of the knowledge graph."""
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    
-    stats = {
-        'total': 0,
-        'characters': 0,
-        'locations': 0,
-        'works': 0
+    index = current_index()
+    if index is not None:
+        return dict(index.statistics)
+
+    queries = {
+        'total': '''
+            SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
+                ?s a ?type .
+                FILTER(
+                    STRSTARTS(STR(?type), "http://tolkien-kg.org/ontology/") ||
+                    STRSTARTS(STR(?type), "http://schema.org/")
+                )
+            }
+        ''',
+        'characters': '''
+            SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
+                ?s a <http://tolkien-kg.org/ontology/Character> .
+            }
+        ''',
+        'locations': '''
+            SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
+                ?s a <http://tolkien-kg.org/ontology/Location> .
+            }
+        ''',
+        'works': '''
+            SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
+                ?s a <http://schema.org/CreativeWork> .
+            }
+        ''',
     }
-    
-    sparql.setQuery('''
-        SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
-            ?s a ?type .
-            FILTER(
-                STRSTARTS(STR(?type), "http://tolkien-kg.org/ontology/") ||
-                STRSTARTS(STR(?type), "http://schema.org/")
-            )
-        }
-    ''')
-    sparql.setReturnFormat(JSON)
-    
-    try:
-        results = sparql.query().convert()
-        count = results["results"]["bindings"][0]["count"]["value"]
-        stats['total'] = int(count)
-    except Exception:
-        pass
-    
-    sparql.setQuery('''
-        SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
-            ?s a <http://tolkien-kg.org/ontology/Character> .
-        }
-    ''')
-    
-    try:
-        results = sparql.query().convert()
-        count = results["results"]["bindings"][0]["count"]["value"]
-        stats['characters'] = int(count)
-    except Exception:
-        pass
-    
-    sparql.setQuery('''
-        SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
-            ?s a <http://tolkien-kg.org/ontology/Location> .
-        }
-    ''')
-    
-    try:
-        results = sparql.query().convert()
-        count = results["results"]["bindings"][0]["count"]["value"]
-        stats['locations'] = int(count)
-    except Exception:
-        pass
-    
-    sparql.setQuery('''
-        SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {
-            ?s a <http://schema.org/CreativeWork> .
-        }
-    ''')
-    
-    try:
-        results = sparql.query().convert()
-        count = results["results"]["bindings"][0]["count"]["value"]
-        stats['works'] = int(count)
-    except Exception:
-        pass
-    
+
+    stats = {}
+    for key, query in queries.items():
+        count = _first_value(_run_query(f"statistics_{key}", query), "count")
+        stats[key] = int(count) if count else 0
+
     return stats
 
 
@@ -303,8 +293,12 @@ def _resolve_type_iri(type_name: str) -> str:
 
 def get_entity_type_facets() -> list[dict]:
     """Return available entity types with counts for filter UI."""
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    sparql.setQuery(
+    index = current_index()
+    if index is not None:
+        return [dict(facet) for facet in index.facets]
+
+    results = _run_query(
+        "type_facets",
         """
         SELECT ?type (COUNT(DISTINCT ?s) AS ?count) WHERE {
             ?s a ?type .
@@ -316,13 +310,11 @@ def get_entity_type_facets() -> list[dict]:
         GROUP BY ?type
         ORDER BY DESC(?count)
         LIMIT 20
-        """
+        """,
     )
-    sparql.setReturnFormat(JSON)
 
     facets = []
-    try:
-        results = sparql.query().convert()
+    if results is not None:
         for row in results["results"]["bindings"]:
             facets.append(
                 {
@@ -330,8 +322,6 @@ def get_entity_type_facets() -> list[dict]:
                     "count": int(row["count"]["value"]),
                 }
             )
-    except Exception:
-        pass
 
     return facets
 
@@ -343,7 +333,11 @@ def get_entities_by_type(
     Returns: (entities_list, total_count, type_facets)
     entities_list: list of dicts {name, uri, type}
     """
-    sparql = SPARQLWrapper(FUSEKI_URL)
+    index = current_index()
+    if index is not None:
+        type_iri = _resolve_type_iri(entity_type) if entity_type else ""
+        entities, total_count = index.browse(type_iri, search_query, limit, offset)
+        return entities, total_count, get_entity_type_facets()
 
     type_filter = "?s a ?type ."
     type_iri = _resolve_type_iri(entity_type) if entity_type else ""
@@ -366,15 +360,11 @@ def get_entities_by_type(
         }}
     '''
 
-    sparql.setQuery(count_query)
-    sparql.setReturnFormat(JSON)
-
-    total_count = 0
-    try:
-        results = sparql.query().convert()
-        total_count = int(results["results"]["bindings"][0]["count"]["value"])
-    except Exception:
-        pass
+    browse_params = {
+        "entity_type": entity_type, "limit": limit, "offset": offset, "search_query": search_query,
+    }
+    count = _first_value(_run_query("browse_count", count_query, browse_params), "count")
+    total_count = int(count) if count else 0
 
     query = f'''
         SELECT DISTINCT ?s ?name ?type WHERE {{
@@ -387,12 +377,10 @@ def get_entities_by_type(
         OFFSET {offset}
     '''
 
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
+    results = _run_query("browse_page", query, browse_params)
 
     entities = []
-    try:
-        results = sparql.query().convert()
+    if results is not None:
         for binding in results["results"]["bindings"]:
             entity = {
                 "name": binding["name"]["value"],
@@ -400,8 +388,6 @@ def get_entities_by_type(
                 "type": binding["type"]["value"],
             }
             entities.append(entity)
-    except Exception:
-        pass
 
     type_facets = get_entity_type_facets()
 
@@ -410,8 +396,13 @@ def get_entities_by_type(
 
 def get_related_cards(subject_uri: str) -> List[Dict[str, str]]:
     """Return related METW card info (label, image) for a resource."""
-    sparql = SPARQLWrapper(FUSEKI_URL)
-    sparql.setQuery(f"""
+    return _related_cards(subject_uri) or []
+
+
+@cached(QUERY_CACHE)
+def _related_cards(subject_uri: str) -> Optional[List[Dict[str, str]]]:
+    """Related cards, None if the query failed (so the failure is not cached)."""
+    results = _run_query("related_cards", f"""
         PREFIX schema: <http://schema.org/>
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT DISTINCT ?card ?label ?image WHERE {{
@@ -428,20 +419,17 @@ def get_related_cards(subject_uri: str) -> List[Dict[str, str]]:
             }}
             OPTIONAL {{ ?card schema:image ?image . }}
         }}
-    """)
-    sparql.setReturnFormat(JSON)
+    """, {"subject_uri": subject_uri})
+    if results is None:
+        return None
 
     cards = {}
-    try:
-        results = sparql.query().convert()
-        for binding in results["results"]["bindings"]:
-            card_uri = binding["card"]["value"]
-            entry = cards.setdefault(card_uri, {"uri": card_uri, "label": None, "image": None})
-            if "label" in binding and not entry["label"]:
-                entry["label"] = binding["label"]["value"]
-            if "image" in binding and not entry["image"]:
-                entry["image"] = binding["image"]["value"]
-    except Exception:
-        return []
+    for binding in results["results"]["bindings"]:
+        card_uri = binding["card"]["value"]
+        entry = cards.setdefault(card_uri, {"uri": card_uri, "label": None, "image": None})
+        if "label" in binding and not entry["label"]:
+            entry["label"] = binding["label"]["value"]
+        if "image" in binding and not entry["image"]:
+            entry["image"] = binding["image"]["value"]
 
     return list(cards.values())
@@ -0,0 +1,81 @@
+"""
+Startup of the web application: shared indexes, cache warm-up and readiness.
+Every worker prepares itself in a background thread when the application
+starts: the KG index of kg_index.py is loaded, retrying while Fuseki is
+unreachable, then the most popular pages are rendered into the caches
+(warmup.py). Both steps are no-ops when the launcher already ran them before
+forking. GET /ready answers 503 until the worker is prepared, so probes and
+load balancers only send traffic to warm workers; requests served meanwhile
+fall back to plain SPARQL queries.
+"""
+import threading
+import time
+
+from web.kg_index import index_summary, load_index
+from web.sparql_queries import FUSEKI_URL
+from web.warmup import warm_up, warmup_targets
+
+RETRY_SECONDS = 5
+
+_ready = threading.Event()
+_status = {"index": "pending", "warmup": "pending"}
+
+
+def prepare_index() -> bool:
+    """Loads the KG index; False if Fuseki could not be queried."""
+    started = time.perf_counter()
+    try:
+        load_index(FUSEKI_URL)
+    except Exception as e:
+        _status["index"] = f"error: {e}"
+        print(f"KG index not loaded ({FUSEKI_URL}): {e}")
+        return False
+    if _status["index"] != "ready":
+        _status["index"] = "ready"
+        print(f"OK. KG index loaded in {time.perf_counter() - started:.1f}s: {index_summary()}")
+    return True
+
+
+def prepare_caches(render):
+    """Warms the page caches with render(name) for the top entities (once per process tree)."""
+    if _status["warmup"].startswith("done"):
+        return
+    started = time.perf_counter()
+    try:
+        names, source = warmup_targets()
+    except Exception as e:
+        print(f"Warm-up ranking failed: {e}")
+        names, source = [], "ranking failed"
+
+    def progress(done, total):
+        _status["warmup"] = f"{done}/{total}"
+
+    rendered, failed = warm_up(render, names, progress=progress)
+    _status["warmup"] = f"done ({rendered} pages from {source}, {failed} failed)"
+    print(f"OK. Cache warm-up: {rendered} pages ({source}), {failed} failed, {time.perf_counter() - started:.1f}s")
+
+
+def prepare(render) -> bool:
+    """Loads the index and warms the caches in the calling process; False if Fuseki is unreachable."""
+    if not prepare_index():
+        return False
+    prepare_caches(render)
+    return True
+
+
+def _prepare(render):
+    while not prepare_index():
+        time.sleep(RETRY_SECONDS)
+    prepare_caches(render)
+    _ready.set()
+
+
+def start(render):
+    """Prepares the worker in the background; readiness() turns true when done."""
+    if not _ready.is_set():
+        threading.Thread(target=_prepare, args=(render,), name="startup", daemon=True).start()
+
+
+def readiness() -> tuple:
+    """(ready, status details)."""
+    return _ready.is_set(), {**_status, **index_summary()}
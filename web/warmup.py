@@ -0,0 +1,118 @@
+"""
+Cache warm-up at startup.
+Renders the WARMUP_TOP_N most popular entity pages before a worker reports
+ready, so their resolver, properties and cards queries and the page HTML are
+already cached (cache.py) when the first users arrive. Popularity comes from
+an access log when WEB_ACCESS_LOG names one (the /page/ and /resource/ paths
+requested most often), else from the number of incoming links of each
+resource in data/rdf/kg_full.ttl.
+
+Pages are rendered by WARMUP_CONCURRENCY threads, started at no more than
+WARMUP_RATE pages per second so the warm-up does not overload Fuseki.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+from rdflib import URIRef
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts" / "rdf"))
+from rdf_stream import stream_triples
+
+KG_FILE = Path(__file__).resolve().parents[1] / "data" / "rdf" / "kg_full.ttl"
+RESOURCE_BASE = "http://tolkien-kg.org/resource/"
+
+WARMUP_TOP_N = int(os.environ.get("WEB_WARMUP_TOP_N", 200))
+ACCESS_LOG = os.environ.get("WEB_ACCESS_LOG")
+WARMUP_CONCURRENCY = 4
+WARMUP_RATE = 10.0
+
+_REQUEST_RE = re.compile(r'"GET /(?:page|resource)/([^\s?"/]+)')
+
+
+def top_by_degree(n: int, path=KG_FILE) -> list:
+    """Local names of the `n` resources with the most incoming links in the KG file."""
+    degree = Counter()
+
+    def count(triple):
+        s, _p, o = triple
+        if isinstance(o, URIRef) and o != s and str(o).startswith(RESOURCE_BASE):
+            degree[o] += 1
+
+    stream_triples(str(path), count)
+    ranked = sorted(degree.items(), key=lambda item: (-item[1], item[0]))
+    return [str(iri)[len(RESOURCE_BASE):] for iri, _count in ranked[:n]]
+
+
+def top_from_access_log(n: int, path: str) -> list:
+    """The `n` entity names requested most often in an access log (uvicorn or common log format)."""
+    requests = Counter()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _REQUEST_RE.search(line)
+            if match:
+                requests[unquote(match.group(1))] += 1
+    ranked = sorted(requests.items(), key=lambda item: (-item[1], item[0]))
+    return [name for name, _count in ranked[:n]]
+
+
+def warmup_targets(n: int = WARMUP_TOP_N, access_log: str = ACCESS_LOG) -> tuple:
+    """(entity names to warm, ranking source)."""
+    if n <= 0:
+        return [], "disabled"
+    if access_log and os.path.exists(access_log):
+        return top_from_access_log(n, access_log), access_log
+    if KG_FILE.exists():
+        return top_by_degree(n), "incoming links"
+    return [], "no ranking source"
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def warm_up(render, names, concurrency: int = WARMUP_CONCURRENCY, rate: float = WARMUP_RATE, progress=None) -> tuple:
+    """
+    Calls render(name) for every name; returns (pages rendered, failures).
+    render returns None for unknown entities, which count as failures.
+    progress(done, total) is called after each page.
+    """
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+    counts = {"done": 0, "rendered": 0}
+
+    def warm(name):
+        limiter.wait()
+        try:
+            ok = render(name) is not None
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            ok = False
+        with lock:
+            counts["done"] += 1
+            counts["rendered"] += ok
+            if progress:
+                progress(counts["done"], len(names))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(warm, names))
+    return counts["rendered"], counts["done"] - counts["rendered"]